@@ -0,0 +1,84 @@
+"""Commits per processed update for the profile lookups handlers make.
+
+Usage: python benchmarks/bench_commits.py [--users 200] [--updates 5000]
+
+Replays a stream of updates from existing users. Each update does what
+a typical handler does: main_keyboard_for -> ensure_user, and for every
+fifth update stats -> ensure_user again. It runs against the original
+ensure_user (INSERT ... ON CONFLICT + commit, no cache) and the current
+one, counting COMMIT statements via the SQLite trace callback.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fatcules.db import EntryRepository  # noqa: E402
+
+
+class LegacyRepository(EntryRepository):
+    async def ensure_user(self, user_id: int) -> dict[str, Any]:
+        conn = await self.connect()
+        await conn.execute(
+            "INSERT INTO users (id) VALUES (:user_id) ON CONFLICT(id) DO NOTHING",
+            {"user_id": user_id},
+        )
+        await conn.commit()
+        cursor = await conn.execute(
+            "SELECT id, height_cm, goal_weight_kg, goal_fat_pct, created_at FROM users WHERE id = :user_id",
+            {"user_id": user_id},
+        )
+        return dict(await cursor.fetchone())
+
+
+async def run(repo: EntryRepository, users: int, updates: int) -> tuple[int, int, float]:
+    await repo.connect()
+    for user_id in range(users):
+        await repo.set_user_height(user_id, 180.0)
+    statements: list[str] = []
+    conn = await repo.connect()
+    await conn.set_trace_callback(statements.append)
+    rng = random.Random(0)
+    started = time.perf_counter()
+    for idx in range(updates):
+        user_id = rng.randrange(users)
+        await repo.ensure_user(user_id)
+        if idx % 5 == 0:
+            await repo.ensure_user(user_id)
+    elapsed = time.perf_counter() - started
+    await conn.set_trace_callback(None)
+    commits = sum(1 for statement in statements if statement.strip().upper() == "COMMIT")
+    selects = sum(1 for statement in statements if statement.lstrip().upper().startswith("SELECT"))
+    await repo.close()
+    return commits, selects, elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=5000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        variants = {
+            "before (upsert + commit)": LegacyRepository(Path(tmpdir) / "legacy.db"),
+            "after, profile cache off": EntryRepository(Path(tmpdir) / "nocache.db", profile_cache_size=0),
+            "after (known users + cache)": EntryRepository(Path(tmpdir) / "current.db"),
+        }
+        for name, repo in variants.items():
+            commits, selects, elapsed = await run(repo, args.users, args.updates)
+            print(
+                f"{name}: {commits / args.updates:.2f} commits/update, "
+                f"{selects / args.updates:.2f} selects/update, {elapsed * 1e6 / args.updates:.0f} us/update"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
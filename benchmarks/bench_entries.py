@@ -0,0 +1,141 @@
+"""Memory and CPU of entry rows as dicts versus Entry/SeriesPoint records.
+
+Usage: python benchmarks/bench_entries.py [--entries 5000] [--rounds 20]
+
+Loads one user's full history the way the edit list and stats do:
+list_recent_entries (formatted like the edit keyboard) and the fat weight
+series (parsed and fed to compute_fat_loss_rate). The "before" variant
+returns dict(row) copies of aiosqlite.Row and parses ISO strings in every
+consumer, as the repository did before the record types. Memory is the
+tracemalloc size of the loaded rows.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fatcules.db import EntryRepository  # noqa: E402
+from fatcules.formatting import format_entry_line  # noqa: E402
+from fatcules.stats import compute_fat_loss_rate, parse_series  # noqa: E402
+
+
+class LegacyRepository(EntryRepository):
+    async def list_recent_entries(self, user_id: int, limit: int = 10) -> list[dict[str, Any]]:  # type: ignore[override]
+        conn = await self.connect()
+        cursor = await conn.execute(
+            """
+            SELECT id, user_id, recorded_at, weight_kg, fat_pct, fat_weight_kg
+            FROM entries WHERE user_id = :user_id ORDER BY recorded_at DESC LIMIT :limit
+            """,
+            {"user_id": user_id, "limit": limit},
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+    async def get_fat_weight_series(self, user_id: int, since: Optional[date] = None) -> list[dict[str, Any]]:  # type: ignore[override]
+        conn = await self.connect()
+        cursor = await conn.execute(
+            """
+            SELECT local_day || 'T00:00:00+00:00' AS recorded_at,
+                   fat_weight_sum / fat_samples AS fat_weight_kg, weight_sum / samples AS weight_kg
+            FROM daily_rollups WHERE user_id = :user_id AND fat_samples > 0 ORDER BY local_day
+            """,
+            {"user_id": user_id},
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+
+def legacy_entry_line(entry: dict[str, Any]) -> str:
+    recorded_at = datetime.fromisoformat(entry["recorded_at"]).date().isoformat()
+    fat_text = f", fat {entry['fat_pct']:.1f}%" if entry["fat_pct"] is not None else ""
+    return f"{recorded_at}: {entry['weight_kg']:.1f} kg{fat_text}"
+
+
+def legacy_parse_series(raw_entries: list[dict[str, Any]]) -> list[tuple[datetime, float]]:
+    return [(datetime.fromisoformat(item["recorded_at"]), float(item["fat_weight_kg"])) for item in raw_entries]
+
+
+def legacy_fat_loss_rate(raw_entries: list[dict[str, Any]], target_days: int) -> float | None:
+    # compute_fat_loss_rate as it was for dict rows.
+    parsed: list[tuple[datetime, float, float]] = []
+    for item in raw_entries:
+        if item.get("fat_weight_kg") is None or item.get("weight_kg") is None:
+            continue
+        try:
+            recorded_at = datetime.fromisoformat(item["recorded_at"])
+        except Exception:
+            continue
+        parsed.append((recorded_at, float(item["fat_weight_kg"]), float(item["weight_kg"])))
+    if len(parsed) < 2:
+        return None
+    parsed.sort(key=lambda x: x[0])
+    latest_dt, latest_fat, latest_weight = parsed[-1]
+    target_dt = latest_dt - timedelta(days=target_days)
+    closest_idx = None
+    closest_delta = None
+    for idx, (dt, _, _) in enumerate(parsed[:-1]):
+        delta = abs((dt - target_dt).total_seconds())
+        if closest_delta is None or delta < closest_delta:
+            closest_delta = delta
+            closest_idx = idx
+    if closest_idx is None:
+        return None
+    prev_dt, prev_fat, prev_weight = parsed[closest_idx]
+    if prev_dt == latest_dt or prev_weight == latest_weight:
+        return None
+    return (prev_fat - latest_fat) / (prev_weight - latest_weight)
+
+
+async def run(repo: EntryRepository, entries: int, rounds: int, legacy: bool) -> tuple[float, int]:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = await repo.list_recent_entries(1, limit=entries)
+    series = await repo.get_fat_weight_series(1)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del rows, series
+    started = time.perf_counter()
+    for _ in range(rounds):
+        rows = await repo.list_recent_entries(1, limit=entries)
+        series = await repo.get_fat_weight_series(1)
+        if legacy:
+            labels = [legacy_entry_line(row) for row in rows]  # type: ignore[arg-type]
+            legacy_parse_series(series)  # type: ignore[arg-type]
+            legacy_fat_loss_rate(series, 30)  # type: ignore[arg-type]
+        else:
+            labels = [format_entry_line(row) for row in rows]
+            parse_series(series)
+            compute_fat_loss_rate(series, 30)
+        assert len(labels) == entries
+    return (time.perf_counter() - started) / rounds, held
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    start = datetime(2010, 1, 1, 7, tzinfo=timezone.utc)
+    history = [(start + timedelta(days=day), 90.0 - day * 0.002, 25.0 - day * 0.001) for day in range(args.entries)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, repo, legacy in (
+            ("before (dict rows)", LegacyRepository(Path(tmpdir) / "legacy.db"), True),
+            ("after (records)", EntryRepository(Path(tmpdir) / "current.db"), False),
+        ):
+            await repo.connect()
+            await repo.import_entries_chunk(1, history)
+            elapsed, held = await run(repo, args.entries, args.rounds, legacy)
+            await repo.close()
+            print(f"{name}: {elapsed * 1000:.1f} ms per load+format, {held / 1024:.0f} KiB held for {args.entries} entries")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
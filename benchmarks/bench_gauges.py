@@ -0,0 +1,61 @@
+"""Dashboard render time with matplotlib gauges versus the Pillow fast path.
+
+Usage: python benchmarks/bench_gauges.py [--renders 20] [--days 180]
+
+Renders the full dashboard (two gauges plus the fat weight chart) and a
+gauges-only dashboard with each GAUGE_STYLE. Rates change on every render
+so the Pillow path pays for its per-call drawing, not just the cached
+template. It also reports the mean pixel difference between the two
+outputs.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import statistics
+import sys
+import time
+import warnings
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fatcules.stats import GAUGE_STYLES, build_dashboard  # noqa: E402
+
+
+def run(style: str, renders: int, series: list[tuple[datetime, float]] | None) -> tuple[float, io.BytesIO]:
+    build_dashboard({7: 0.5, 30: 0.5}, series, gauge_style=style)  # warm fonts and templates
+    timings = []
+    image = io.BytesIO()
+    for idx in range(renders):
+        rates = {7: (idx % 10) / 10, 30: 1 - (idx % 7) / 10}
+        started = time.perf_counter()
+        image = build_dashboard(rates, series, gauge_style=style)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), image
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=20)
+    parser.add_argument("--days", type=int, default=180)
+    args = parser.parse_args()
+    # The gauge axes are not tight_layout compatible; that warning is expected.
+    warnings.simplefilter("ignore", UserWarning)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    series = [(start + timedelta(days=day), 20.0 - 0.03 * day) for day in range(args.days)]
+    for name, data in (("full dashboard", series), ("gauges only", None)):
+        results = {style: run(style, args.renders, data) for style in GAUGE_STYLES}
+        baseline = results["matplotlib"][0]
+        images = [np.asarray(Image.open(image).convert("RGB"), dtype=float) for _, image in results.values()]
+        for style, (elapsed, _) in results.items():
+            print(f"{name}, {style}: {elapsed * 1000:.1f} ms median ({baseline / elapsed:.2f}x)")
+        print(f"{name}: mean pixel difference {np.abs(images[0] - images[1]).mean():.2f}/255")
+
+
+if __name__ == "__main__":
+    main()
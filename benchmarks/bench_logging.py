@@ -0,0 +1,64 @@
+"""Caller-side cost of a log call with basicConfig versus the queued setup.
+
+Usage: python benchmarks/bench_logging.py [--records 5000] [--write-delay-ms 0.2]
+
+Logs one "Update handled" style record per iteration and times only the
+caller, which is what the event loop pays. The stream sleeps for
+--write-delay-ms on every write to stand in for a slow or back-pressured
+stderr (a pipe to a log shipper, a terminal). The queued variant stops its
+listener after the timed loop, so its writes finish off the clock.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fatcules.config import Settings  # noqa: E402
+from fatcules.logs import setup_logging  # noqa: E402
+
+
+class SlowStream(io.StringIO):
+    def __init__(self, delay_s: float):
+        super().__init__()
+        self.delay_s = delay_s
+
+    def write(self, text: str) -> int:
+        time.sleep(self.delay_s)
+        return super().write(text)
+
+
+def log_records(records: int) -> float:
+    logger = logging.getLogger("fatcules.bench")
+    started = time.perf_counter()
+    for idx in range(records):
+        logger.info("Update handled", extra={"user_id": idx, "handler": "show_stats", "latency_ms": 12.5})
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--write-delay-ms", type=float, default=0.2)
+    args = parser.parse_args()
+    delay = args.write_delay_ms / 1000
+
+    logging.basicConfig(level=logging.INFO, stream=SlowStream(delay), force=True)
+    elapsed = log_records(args.records)
+    print(f"basicConfig: {elapsed / args.records * 1e6:.1f} us per call")
+
+    # No sampling or rate limiting, so every record is queued and written.
+    settings = Settings(bot_token="0:bench", database_path=Path("unused.db"), log_rate_limit=0, log_update_sample=1.0)
+    logs = setup_logging(settings, stream=SlowStream(delay))
+    elapsed = log_records(args.records)
+    logs.stop()
+    print(f"queued: {elapsed / args.records * 1e6:.1f} us per call, dropped {logs.handler.dropped}")
+
+
+if __name__ == "__main__":
+    main()
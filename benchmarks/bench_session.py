@@ -0,0 +1,111 @@
+"""Latency of mixed text/photo Bot API traffic against a local stub server.
+
+Usage: python benchmarks/bench_session.py [--requests 400] [--concurrency 20]
+
+Compares aiogram's default AiohttpSession with TunedAiohttpSession built from
+the current Settings defaults. The stub answers every method with a fake
+Message after a small artificial delay (longer for uploads).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram import Bot  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.types import BufferedInputFile  # noqa: E402
+
+from fatcules.config import Settings  # noqa: E402
+from fatcules.session import build_session  # noqa: E402
+
+TOKEN = "42:stub-token"
+FAKE_MESSAGE = {"message_id": 1, "date": 0, "chat": {"id": 1, "type": "private"}}
+PHOTO = random.Random(0).randbytes(150_000)
+
+
+async def handle(request: web.Request) -> web.Response:
+    await request.read()
+    method = request.match_info["method"]
+    await asyncio.sleep(0.02 if method == "sendPhoto" else 0.003)
+    return web.json_response({"ok": True, "result": FAKE_MESSAGE})
+
+
+async def start_stub() -> tuple[web.AppRunner, str]:
+    app = web.Application(client_max_size=10 * 1024 * 1024)
+    app.router.add_post("/bot{token}/{method}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def run(bot: Bot, requests: int, concurrency: int, photo_share: float) -> dict[str, list[float]]:
+    rng = random.Random(1)
+    kinds = ["photo" if rng.random() < photo_share else "text" for _ in range(requests)]
+    latencies: dict[str, list[float]] = {"text": [], "photo": []}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(kind: str) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            if kind == "photo":
+                await bot.send_photo(chat_id=1, photo=BufferedInputFile(PHOTO, filename="chart.png"))
+            else:
+                await bot.send_message(chat_id=1, text="hello")
+            latencies[kind].append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one(kind) for kind in kinds))
+    return latencies
+
+
+def report(name: str, latencies: dict[str, list[float]], elapsed: float) -> None:
+    total = sum(len(values) for values in latencies.values())
+    print(f"{name}: {total} requests in {elapsed:.2f}s ({total / elapsed:.0f} req/s)")
+    for kind, values in latencies.items():
+        if not values:
+            continue
+        values.sort()
+        p95 = values[int(len(values) * 0.95) - 1]
+        print(f"  {kind:5s} n={len(values):4d} p50={statistics.median(values):7.1f}ms p95={p95:7.1f}ms max={values[-1]:7.1f}ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--photo-share", type=float, default=0.2)
+    args = parser.parse_args()
+
+    runner, base_url = await start_stub()
+    api = TelegramAPIServer.from_base(base_url)
+    settings = Settings(bot_token=TOKEN, database_path=Path("unused.db"))
+    sessions = {
+        "default AiohttpSession": AiohttpSession(api=api),
+        "TunedAiohttpSession": build_session(settings, api=api),
+    }
+    try:
+        for name, session in sessions.items():
+            bot = Bot(token=TOKEN, session=session)
+            await run(bot, 20, args.concurrency, args.photo_share)  # warm up connections
+            started = time.perf_counter()
+            latencies = await run(bot, args.requests, args.concurrency, args.photo_share)
+            report(name, latencies, time.perf_counter() - started)
+            await session.close()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+from .cache import TTLCache
+from .formatting import now_utc
+from .repository import Repository
+
+ANALYTICS_DAYS = 14
+ANALYTICS_MAX_DAYS = 90
+ANALYTICS_CACHE_TTL = 300.0
+# Upper bounds (in entries) of the history length buckets; anything longer lands in the last one.
+HISTORY_BUCKETS = (1, 7, 30, 90, 365)
+
+
+@dataclass
+class UsageStats:
+    since: date
+    days: list[dict] = field(default_factory=list)
+    history: list[tuple[str, int]] = field(default_factory=list)
+    total_users: int = 0
+    total_entries: int = 0
+    db_size_bytes: Optional[int] = None
+    computed_at: float = 0.0
+
+
+def bucket_history(history_counts: dict[int, int], total_users: int) -> list[tuple[str, int]]:
+    labels: list[str] = ["0"]
+    lower = 1
+    for upper in HISTORY_BUCKETS:
+        labels.append(str(upper) if upper == lower else f"{lower}-{upper}")
+        lower = upper + 1
+    labels.append(f"{lower}+")
+    counts = [0] * len(labels)
+    for entries, users in history_counts.items():
+        index = next((idx for idx, upper in enumerate(HISTORY_BUCKETS, start=1) if entries <= upper), len(labels) - 1)
+        counts[index] += users
+    counts[0] = max(0, total_users - sum(counts))
+    return list(zip(labels, counts))
+
+
+class UsageAnalytics:
+    # Aggregates scan every entry, so results are cached and concurrent requests share one computation.
+    def __init__(
+        self,
+        repo: Repository,
+        ttl_s: float = ANALYTICS_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.repo = repo
+        self._clock = clock
+        self._cache: TTLCache[int, UsageStats] = TTLCache(maxsize=8, ttl_s=ttl_s, clock=clock)
+        self._lock = asyncio.Lock()
+
+    async def get(self, days: int = ANALYTICS_DAYS, refresh: bool = False) -> UsageStats:
+        days = max(1, min(days, ANALYTICS_MAX_DAYS))
+        if not refresh:
+            cached = self._cache.get(days)
+            if cached is not None:
+                return cached
+        async with self._lock:
+            cached = None if refresh else self._cache.get(days)
+            if cached is not None:
+                return cached
+            since = now_utc().date() - timedelta(days=days - 1)
+            raw = await self.repo.usage_stats(since)
+            stats = UsageStats(
+                since=since,
+                days=raw["days"],
+                history=bucket_history(raw["history_counts"], raw["total_users"]),
+                total_users=raw["total_users"],
+                total_entries=raw["total_entries"],
+                db_size_bytes=raw["db_size_bytes"],
+                computed_at=self._clock(),
+            )
+            self._cache.set(days, stats)
+            return stats
@@ -1,7 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 import os
-from typing import Iterable
+from typing import Any, Iterable
 
 
 def _load_env_file(path: Path) -> None:
@@ -15,10 +15,70 @@ def _load_env_file(path: Path) -> None:
         os.environ.setdefault(key.strip(), value.strip())
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _parse_ids(value: str) -> frozenset[int]:
+    return frozenset(int(item) for item in value.replace(" ", "").split(",") if item)
+
+
+def _parse_method_timeouts(value: str) -> dict[str, float]:
+    # "sendMessage=10,answerCallbackQuery=5" -> {"sendMessage": 10.0, "answerCallbackQuery": 5.0}
+    timeouts: dict[str, float] = {}
+    for item in value.split(","):
+        name, sep, seconds = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
 @dataclass
 class Settings:
     bot_token: str
     database_path: Path
+    backup_dir: Path = Path("./data/backups")
+    backup_interval_minutes: float = 0
+    backup_keep: int = 7
+    backup_compress: bool = True
+    rate_limit_global: float = 30.0
+    rate_limit_per_chat: float = 1.0
+    http_pool_size: int = 100
+    http_pool_per_host: int = 0
+    http_keepalive_s: float = 15.0
+    http_dns_cache_s: int = 3600
+    http_timeout_s: float = 60.0
+    http_upload_timeout_s: float = 120.0
+    http_method_timeouts: dict[str, float] = field(default_factory=dict)
+    workers: int = 1
+    storage_backend: str = "sqlite"
+    profile_cache_size: int = 10_000
+    profile_cache_ttl_s: float = 300.0
+    notifications_enabled: bool = True
+    notify_send_rate: float = 20.0
+    weekly_report_hour: int = 9
+    admin_ids: frozenset[int] = frozenset()
+    dashboard_cache_size: int = 256
+    dashboard_prerender: bool = True
+    prerender_active_days: int = 7
+    prerender_max_users: int = 128
+    gauge_style: str = "matplotlib"
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_queue_size: int = 10_000
+    log_update_sample: float = 0.1
+    log_slow_update_ms: float = 1000.0
+    log_rate_limit: int = 20
+    log_rate_window_s: float = 60.0
+
+    def repository_options(self) -> dict[str, Any]:
+        if self.storage_backend == "sqlite":
+            return {"profile_cache_size": self.profile_cache_size, "profile_cache_ttl": self.profile_cache_ttl_s}
+        return {}
 
     @classmethod
     def from_env(cls) -> "Settings":
@@ -27,4 +87,40 @@ class Settings:
         if not token:
             raise RuntimeError("BOT_TOKEN is not set")
         db_path = Path(os.getenv("DATABASE_PATH", "./data/fatcules.db"))
-        return cls(bot_token=token, database_path=db_path)
+        return cls(
+            bot_token=token,
+            database_path=db_path,
+            backup_dir=Path(os.getenv("BACKUP_DIR", str(db_path.parent / "backups"))),
+            backup_interval_minutes=float(os.getenv("BACKUP_INTERVAL_MINUTES", "0")),
+            backup_keep=int(os.getenv("BACKUP_KEEP", "7")),
+            backup_compress=_env_bool("BACKUP_COMPRESS", True),
+            rate_limit_global=float(os.getenv("RATE_LIMIT_GLOBAL", "30")),
+            rate_limit_per_chat=float(os.getenv("RATE_LIMIT_PER_CHAT", "1")),
+            http_pool_size=int(os.getenv("HTTP_POOL_SIZE", "100")),
+            http_pool_per_host=int(os.getenv("HTTP_POOL_PER_HOST", "0")),
+            http_keepalive_s=float(os.getenv("HTTP_KEEPALIVE_SECONDS", "15")),
+            http_dns_cache_s=int(os.getenv("HTTP_DNS_CACHE_SECONDS", "3600")),
+            http_timeout_s=float(os.getenv("HTTP_TIMEOUT_SECONDS", "60")),
+            http_upload_timeout_s=float(os.getenv("HTTP_UPLOAD_TIMEOUT_SECONDS", "120")),
+            http_method_timeouts=_parse_method_timeouts(os.getenv("HTTP_METHOD_TIMEOUTS", "")),
+            workers=max(1, int(os.getenv("WORKERS", "1"))),
+            storage_backend=os.getenv("STORAGE_BACKEND", "sqlite").strip().lower(),
+            profile_cache_size=int(os.getenv("PROFILE_CACHE_SIZE", "10000")),
+            profile_cache_ttl_s=float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300")),
+            notifications_enabled=_env_bool("NOTIFICATIONS_ENABLED", True),
+            notify_send_rate=float(os.getenv("NOTIFY_SEND_RATE", "20")),
+            weekly_report_hour=int(os.getenv("WEEKLY_REPORT_HOUR", "9")),
+            admin_ids=_parse_ids(os.getenv("ADMIN_IDS", "")),
+            dashboard_cache_size=int(os.getenv("DASHBOARD_CACHE_SIZE", "256")),
+            dashboard_prerender=_env_bool("DASHBOARD_PRERENDER", True),
+            prerender_active_days=int(os.getenv("PRERENDER_ACTIVE_DAYS", "7")),
+            prerender_max_users=int(os.getenv("PRERENDER_MAX_USERS", "128")),
+            gauge_style=os.getenv("GAUGE_STYLE", "matplotlib").strip().lower(),
+            log_level=os.getenv("LOG_LEVEL", "INFO").strip().upper(),
+            log_format=os.getenv("LOG_FORMAT", "json").strip().lower(),
+            log_queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            log_update_sample=float(os.getenv("LOG_UPDATE_SAMPLE", "0.1")),
+            log_slow_update_ms=float(os.getenv("LOG_SLOW_UPDATE_MS", "1000")),
+            log_rate_limit=int(os.getenv("LOG_RATE_LIMIT", "20")),
+            log_rate_window_s=float(os.getenv("LOG_RATE_WINDOW_SECONDS", "60")),
+        )
@@ -0,0 +1,425 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Any, Callable, Optional, TypeVar
+
+from .cache import TTLCache
+from .config import Settings
+from .formatting import format_goal_projection, format_stats_summary, format_trend_text, local_today, now_utc
+from .repository import Repository, SeriesPoint
+from .stats import (
+    GAUGE_STYLES,
+    PROJECTION_WINDOW_DAYS,
+    GoalProjection,
+    build_dashboard,
+    build_metric_chart,
+    compute_fat_loss_rate,
+    parse_series,
+    project_goal_date,
+    project_goal_range,
+    trend_overlay,
+    weekly_deltas,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Days plotted per range button; None plots the whole history.
+CHART_RANGES: dict[str, Optional[int]] = {"1M": 30, "3M": 91, "6M": 182, "1Y": 365, "All": None}
+DEFAULT_CHART_RANGE = "All"
+SPARKLINE_POINTS = 20
+RENDER_TIMEOUT = 10.0
+RENDER_THREADS = 4
+# Rendered PNGs are ~100-200 KB each.
+DASHBOARD_CACHE_SIZE = 256
+DASHBOARD_CACHE_TTL = 6 * 3600.0
+# The 30-day rate and the goal projection need this much history whatever range is plotted.
+MIN_FETCH_DAYS = max(31, PROJECTION_WINDOW_DAYS)
+PREWARM_INTERVAL = 300.0
+PREWARM_ACTIVE_DAYS = 7
+# Keep well below the cache size so prerenders do not evict each other.
+PREWARM_MAX_USERS = DASHBOARD_CACHE_SIZE // 2
+PREWARM_IDLE_S = 2.0
+# Album charts in sending order: title, y-axis label and line colour.
+ALBUM_CHARTS: dict[str, tuple[str, str, str]] = {
+    "weight": ("Weight", "Weight (kg)", "#1f77b4"),
+    "fat_pct": ("Body fat", "Body fat (%)", "#d62728"),
+    "fat_weight": ("Fat weight", "Fat weight (kg)", "#ff7f0e"),
+    "bmi": ("BMI", "BMI (kg/m²)", "#2ca02c"),
+}
+
+
+@dataclass(frozen=True)
+class StatsSummary:
+    text: str
+    fat_loss_rates: dict[int, float | None]
+    series: list[tuple[datetime, float]]
+    goal_fat_weight: float | None
+    trend: list[tuple[datetime, float]]
+    projection: GoalProjection | None
+
+    def report_text(self) -> str:
+        # Text-only stats: summary, sparkline of recent fat weight and weekly changes.
+        values = [value for _, value in self.series[-SPARKLINE_POINTS:]]
+        return f"{self.text}\n\n{format_trend_text(values, weekly_deltas(self.series))}"
+
+
+@dataclass(frozen=True)
+class Dashboard:
+    range_key: str
+    caption: str
+    # None when the render failed or timed out; `text` is the fallback then.
+    image: bytes | None
+    text: str
+
+
+@dataclass(frozen=True)
+class Chart:
+    name: str
+    title: str
+    image: bytes
+
+
+class RenderPool:
+    # Runs renders on a fixed number of threads. A timeout only abandons a render: the thread cannot be
+    # cancelled, so it finishes in the background and keeps its slot until then. When every slot is busy
+    # new renders time out waiting for one instead of queueing up behind abandoned work.
+    def __init__(self, threads: int = RENDER_THREADS):
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="render")
+        self._slots = asyncio.Semaphore(threads)
+
+    async def run(self, timeout: float, func: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        await asyncio.wait_for(self._slots.acquire(), timeout)
+        try:
+            # Copies the context like asyncio.to_thread, so logs from the render keep the update's fields.
+            future = self._executor.submit(contextvars.copy_context().run, func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: _release_soon(loop, self._slots))
+        return await asyncio.wait_for(asyncio.wrap_future(future), max(0.0, deadline - loop.time()))
+
+
+def _release_soon(loop: asyncio.AbstractEventLoop, slots: asyncio.Semaphore) -> None:
+    # Called on the render thread once it is really done, not when the caller stopped waiting.
+    try:
+        loop.call_soon_threadsafe(slots.release)
+    except RuntimeError:  # loop already closed
+        pass
+
+
+ChartSeries = tuple[list[tuple[datetime, float]], Optional[float]]
+
+
+def album_series(rows: list[SeriesPoint], user: dict) -> dict[str, ChartSeries]:
+    # Splits one daily series fetch into per-chart points and goal lines; charts without data are left out.
+    weight: list[tuple[datetime, float]] = []
+    fat_pct: list[tuple[datetime, float]] = []
+    fat_weight: list[tuple[datetime, float]] = []
+    bmi: list[tuple[datetime, float]] = []
+    height_m = float(user["height_cm"]) / 100 if user.get("height_cm") else None
+    for recorded_at, weight_kg, fat_weight_kg in rows:
+        weight.append((recorded_at, weight_kg))
+        if fat_weight_kg is not None:
+            fat_weight.append((recorded_at, fat_weight_kg))
+            fat_pct.append((recorded_at, 100 * fat_weight_kg / weight_kg))
+        if height_m:
+            bmi.append((recorded_at, weight_kg / (height_m * height_m)))
+    goal_weight = user.get("goal_weight_kg")
+    goal_fat_pct = user.get("goal_fat_pct")
+    goal_fat_weight = goal_weight * goal_fat_pct / 100 if goal_weight is not None and goal_fat_pct is not None else None
+    charts: dict[str, ChartSeries] = {
+        "weight": (weight, goal_weight),
+        "fat_pct": (fat_pct, goal_fat_pct),
+        "fat_weight": (fat_weight, goal_fat_weight),
+        "bmi": (bmi, None),
+    }
+    return {name: charts[name] for name in ALBUM_CHARTS if charts[name][0]}
+
+
+async def build_summary(repo: Repository, user_id: int, since: date | None = None) -> StatsSummary | None:
+    # `since` bounds the series query; rates and projection only look at the last MIN_FETCH_DAYS anyway.
+    raw_series = await repo.get_fat_weight_series(user_id, since=since)
+    if not raw_series:
+        return None
+    series = parse_series(raw_series)
+    latest = await repo.get_latest_fat_weight(user_id=user_id)
+    user = await repo.ensure_user(user_id)
+    latest_weight = await repo.get_latest_weight(user_id=user_id)
+    latest_bmi = None
+    height_cm = user.get("height_cm")
+    if height_cm and latest_weight:
+        height_m = float(height_cm) / 100
+        if height_m > 0:
+            latest_bmi = float(latest_weight) / (height_m * height_m)
+    goal_tuple = None
+    goal_fat_weight = None
+    if user.get("goal_weight_kg") is not None and user.get("goal_fat_pct") is not None:
+        goal_weight = float(user["goal_weight_kg"])
+        goal_fat_pct = float(user["goal_fat_pct"])
+        goal_fat_weight = goal_weight * goal_fat_pct / 100
+        goal_tuple = (goal_weight, goal_fat_pct, goal_fat_weight)
+    goal_projection_text = None
+    projection = None
+    if goal_fat_weight is not None:
+        projected_date, reason = project_goal_date(series, goal_fat_weight, trend=await repo.get_trend(user_id))
+        # The smoothed trend gives the date; the robust regression over a longer window gives the range.
+        projection = project_goal_range(series, goal_fat_weight)
+        goal_projection_text = format_goal_projection(projected_date, reason, projection)
+    fat_loss_rates = {days: compute_fat_loss_rate(raw_series, days) for days in (7, 30)}
+    summary_text = format_stats_summary(latest, latest_bmi, fat_loss_rates, goal_tuple, goal_projection_text)
+    since_dt = datetime.combine(since, dt_time.min, tzinfo=timezone.utc) if since is not None else None
+    trend = trend_overlay(await repo.get_trend_series(user_id, since=since_dt))
+    return StatsSummary(summary_text, fat_loss_rates, series, goal_fat_weight, trend, projection)
+
+
+class DashboardRenderer:
+    # Renders stats dashboards per chart range. Results are cached under the user's entry version,
+    # goal and height, so any change to what the dashboard shows misses the cache. Concurrent
+    # requests for the same dashboard share one render.
+    def __init__(
+        self,
+        repo: Repository,
+        cache_size: int = DASHBOARD_CACHE_SIZE,
+        ttl_s: float = DASHBOARD_CACHE_TTL,
+        render_timeout: float = RENDER_TIMEOUT,
+        render_threads: int = RENDER_THREADS,
+        clock: Callable[[], float] = time.monotonic,
+        gauge_style: str = "matplotlib",
+    ):
+        if gauge_style not in GAUGE_STYLES:
+            raise ValueError(f"Unknown gauge style: {gauge_style}")
+        self.repo = repo
+        self.render_timeout = render_timeout
+        self._renders = RenderPool(render_threads)
+        self.gauge_style = gauge_style
+        self._clock = clock
+        self._cache: TTLCache[tuple, Dashboard | Chart] = TTLCache(cache_size, ttl_s, clock=clock)
+        self._inflight: dict[tuple, asyncio.Task[Optional[Dashboard]]] = {}
+        self._background: set[asyncio.Task[bool]] = set()
+        self._last_request = float("-inf")
+        self.prerendered = 0
+
+    async def _cache_key(self, user_id: int, range_key: str) -> tuple[tuple, date]:
+        user = await self.repo.ensure_user(user_id)
+        today = local_today(user)
+        key = (
+            user_id,
+            range_key,
+            await self.repo.entries_version(user_id),
+            today,
+            user.get("goal_weight_kg"),
+            user.get("goal_fat_pct"),
+            user.get("height_cm"),
+        )
+        return key, today
+
+    def idle_for(self) -> float:
+        # Seconds since a user last asked for a dashboard.
+        return self._clock() - self._last_request
+
+    async def render(self, user_id: int, range_key: str = DEFAULT_CHART_RANGE) -> Dashboard | None:
+        # None when there is no fat % data in the range.
+        self._last_request = self._clock()
+        dashboard, _ = await self._get(user_id, range_key)
+        return dashboard
+
+    async def prerender(self, user_id: int, range_key: str = DEFAULT_CHART_RANGE) -> bool:
+        # Fills the cache without counting as a user request; True if a dashboard had to be rendered.
+        dashboard, rendered = await self._get(user_id, range_key)
+        if not rendered or dashboard is None:
+            return False
+        self.prerendered += 1
+        return True
+
+    def schedule(self, user_id: int) -> None:
+        # Fire-and-forget prerender, e.g. right after a new entry when Stats is the likely next tap.
+        task = asyncio.create_task(self.prerender(user_id))
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Task[bool]) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Dashboard prerender failed", exc_info=task.exception())
+
+    async def _get(self, user_id: int, range_key: str) -> tuple[Optional[Dashboard], bool]:
+        if range_key not in CHART_RANGES:
+            raise ValueError(f"Unknown chart range: {range_key}")
+        key, today = await self._cache_key(user_id, range_key)
+        cached = self._cache.get(key)
+        if isinstance(cached, Dashboard):
+            return cached, False
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._render(user_id, range_key, today))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one cancelled waiter does not cancel the render others are waiting on.
+        dashboard = await asyncio.shield(task)
+        if dashboard is not None and dashboard.image is not None:
+            self._cache.set(key, dashboard)
+        return dashboard, True
+
+    async def render_album(self, user_id: int, range_key: str = DEFAULT_CHART_RANGE) -> list[Chart]:
+        # Weight, fat %, fat weight and BMI charts, each cached on its own. Missing charts share one
+        # series fetch and render in parallel threads; charts that fail to render are left out.
+        if range_key not in CHART_RANGES:
+            raise ValueError(f"Unknown chart range: {range_key}")
+        self._last_request = self._clock()
+        key, today = await self._cache_key(user_id, range_key)
+        charts: dict[str, Optional[Chart]] = {}
+        for name in ALBUM_CHARTS:
+            cached = self._cache.get(key + (name,))
+            charts[name] = cached if isinstance(cached, Chart) else None
+        if all(charts.values()):
+            return list(charts.values())  # type: ignore[arg-type]
+        user = await self.repo.ensure_user(user_id)
+        series = album_series(await self.repo.get_daily_series(user_id, since=_range_start(range_key, today)), user)
+        missing = [name for name in series if charts[name] is None]
+        rendered = await asyncio.gather(*(self._render_chart(name, *series[name]) for name in missing))
+        for name, chart in zip(missing, rendered):
+            if chart is not None:
+                self._cache.set(key + (name,), chart)
+                charts[name] = chart
+        return [chart for name, chart in charts.items() if name in series and chart is not None]
+
+    async def _render_chart(
+        self, name: str, points: list[tuple[datetime, float]], goal: Optional[float]
+    ) -> Optional[Chart]:
+        title, ylabel, color = ALBUM_CHARTS[name]
+        try:
+            image = await self._renders.run(self.render_timeout, build_metric_chart, points, title, ylabel, goal, color)
+        except Exception:
+            logger.warning("Album chart %s failed to render", name, exc_info=True)
+            return None
+        return Chart(name, title, image.getvalue())
+
+    async def _render(self, user_id: int, range_key: str, today: date) -> Optional[Dashboard]:
+        start = _range_start(range_key, today)
+        fetch_since = min(start, today - timedelta(days=MIN_FETCH_DAYS)) if start is not None else None
+        summary = await build_summary(self.repo, user_id, since=fetch_since)
+        if summary is None:
+            return None
+        series = summary.series
+        trend = summary.trend
+        if start is not None:
+            start_dt = datetime.combine(start, dt_time.min, tzinfo=timezone.utc)
+            series = [point for point in series if point[0] >= start_dt]
+            trend = [point for point in trend if point[0] >= start_dt]
+            if not series:
+                return None
+        try:
+            image = await self._renders.run(
+                self.render_timeout,
+                build_dashboard,
+                summary.fat_loss_rates,
+                series,
+                summary.goal_fat_weight,
+                trend,
+                summary.projection,
+                self.gauge_style,
+            )
+        except Exception:
+            # Rendering is slow, broken or out of threads; the text report still answers the question.
+            logger.warning("Dashboard render failed, falling back to text stats", exc_info=True)
+            return Dashboard(range_key, summary.text, None, summary.report_text())
+        return Dashboard(range_key, summary.text, image.getvalue(), summary.report_text())
+
+
+def _range_start(range_key: str, today: date) -> Optional[date]:
+    days = CHART_RANGES[range_key]
+    return today - timedelta(days=days) if days is not None else None
+
+
+class DashboardPrewarmer:
+    # Keeps the default dashboard of recently active users rendered, so the Stats burst after the
+    # morning weigh-in is served from cache. Renders one at a time and only once users have stopped
+    # asking for dashboards for `idle_s`, so it never competes with interactive renders.
+    def __init__(
+        self,
+        renderer: DashboardRenderer,
+        interval_s: float = PREWARM_INTERVAL,
+        active_days: int = PREWARM_ACTIVE_DAYS,
+        max_users: int = PREWARM_MAX_USERS,
+        idle_s: float = PREWARM_IDLE_S,
+        shards: int = 1,
+        shard: int = 0,
+        clock: Callable[[], datetime] = now_utc,
+    ):
+        self.renderer = renderer
+        self.interval_s = interval_s
+        self.active_days = active_days
+        self.max_users = max_users
+        self.idle_s = idle_s
+        self.shards = shards
+        self.shard = shard
+        self.clock = clock
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def _wait_idle(self) -> None:
+        while (idle := self.renderer.idle_for()) < self.idle_s:
+            await asyncio.sleep(self.idle_s - idle)
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        now = now or self.clock()
+        user_ids = await self.renderer.repo.active_users(
+            now - timedelta(days=self.active_days), limit=self.max_users, shards=self.shards, shard=self.shard
+        )
+        rendered = 0
+        for user_id in user_ids:
+            await self._wait_idle()
+            if await self.renderer.prerender(user_id):
+                rendered += 1
+        return rendered
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                rendered = await self.run_once()
+                if rendered:
+                    logger.info("Prerendered %s dashboards", rendered)
+            except Exception:
+                logger.exception("Dashboard prerender run failed")
+            await asyncio.sleep(self.interval_s)
+
+    def start(self) -> asyncio.Task[None]:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever(), name="dashboard-prewarm")
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+def start_dashboards(bot: Any, repo: Repository, settings: Settings, shard: int = 0) -> Optional[DashboardPrewarmer]:
+    # Each process caches dashboards for the users it serves, so a worker only prerenders its own shard.
+    renderer = DashboardRenderer(repo, cache_size=settings.dashboard_cache_size, gauge_style=settings.gauge_style)
+    setattr(bot, "dashboards", renderer)
+    if not settings.dashboard_prerender:
+        return None
+    prewarmer = DashboardPrewarmer(
+        renderer,
+        active_days=settings.prerender_active_days,
+        max_users=min(settings.prerender_max_users, settings.dashboard_cache_size),
+        shards=settings.workers,
+        shard=shard,
+    )
+    prewarmer.start()
+    return prewarmer
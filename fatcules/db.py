@@ -1,15 +1,107 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
+import sqlite3
+
 import aiosqlite
 from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
+
+from .cache import TTLCache
+from .formatting import user_timezone
+from .repository import EXPORT_CHUNK_SIZE, DuplicateDayError, Entry, SeriesPoint
+from .trend import TrendState, replay_trend
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CACHE_SIZE = 10_000
+PROFILE_CACHE_TTL = 300.0
+ENTRY_DAYS_CACHE_SIZE = 10_000
+TREND_REPLAY_BATCH = 1000
+_ENTRY_COLUMNS = "id, user_id, recorded_at, weight_kg, fat_pct, fat_weight_kg"
+
+
+# Cursor row factories: records are built straight from the sqlite3 tuples, skipping aiosqlite.Row and dict copies.
+def _entry_row(cursor: sqlite3.Cursor, row: tuple) -> Entry:
+    entry_id, user_id, recorded_at, weight_kg, fat_pct, fat_weight_kg = row
+    return Entry(entry_id, user_id, datetime.fromisoformat(recorded_at), weight_kg, fat_pct, fat_weight_kg)
+
+
+def _series_row(cursor: sqlite3.Cursor, row: tuple) -> SeriesPoint:
+    recorded_at, weight_kg, fat_weight_kg = row
+    return SeriesPoint(datetime.fromisoformat(recorded_at), weight_kg, fat_weight_kg)
+
+# Recomputes daily_rollups rows from the raw measurements matching {where}.
+_ROLLUP_REBUILD = """
+INSERT INTO daily_rollups (
+    user_id, local_day, samples, weight_min, weight_sum, weight_last, last_at,
+    fat_samples, fat_weight_min, fat_weight_sum, fat_weight_last, fat_last_at
+)
+SELECT
+    m.user_id,
+    m.local_day,
+    COUNT(*),
+    MIN(m.weight_kg),
+    SUM(m.weight_kg),
+    (
+        SELECT l.weight_kg FROM measurements l
+        WHERE l.user_id = m.user_id AND l.local_day = m.local_day
+        ORDER BY l.measured_at DESC, l.id DESC LIMIT 1
+    ),
+    MAX(m.measured_at),
+    COUNT(m.fat_weight_kg),
+    MIN(m.fat_weight_kg),
+    SUM(m.fat_weight_kg),
+    (
+        SELECT l.fat_weight_kg FROM measurements l
+        WHERE l.user_id = m.user_id AND l.local_day = m.local_day AND l.fat_weight_kg IS NOT NULL
+        ORDER BY l.measured_at DESC, l.id DESC LIMIT 1
+    ),
+    MAX(CASE WHEN m.fat_weight_kg IS NOT NULL THEN m.measured_at END)
+FROM measurements m
+WHERE {where}
+GROUP BY m.user_id, m.local_day
+"""
+
+
+def _entry_params(user_id: int, recorded_at: datetime, weight_kg: float, fat_pct: Optional[float]) -> dict[str, Any]:
+    # local_day is the calendar day the entry belongs to: the wall-clock date of recorded_at as given.
+    return {
+        "user_id": user_id,
+        "recorded_at": recorded_at.isoformat(),
+        "local_day": recorded_at.date().isoformat(),
+        "weight_kg": weight_kg,
+        "fat_pct": fat_pct,
+        "fat_weight_kg": weight_kg * fat_pct / 100 if fat_pct is not None else None,
+    }
 
 
 class EntryRepository:
-    def __init__(self, db_path: Path):
+    def __init__(
+        self,
+        db_path: Path,
+        profile_cache_size: int = PROFILE_CACHE_SIZE,
+        profile_cache_ttl: float = PROFILE_CACHE_TTL,
+    ):
         self.db_path = db_path
         self._conn: aiosqlite.Connection | None = None
+        # Profiles are read on nearly every update (keyboard choice, stats); writes go through
+        # set_user_height/set_user_goal below, which keep cached rows current.
+        self._profiles: TTLCache[int, dict[str, Any]] = TTLCache(profile_cache_size, profile_cache_ttl)
+        # Days with an entry per (user, first day of month) for the date picker; entry writes below drop the months they touch.
+        self._entry_days: TTLCache[tuple[int, date], frozenset[int]] = TTLCache(ENTRY_DAYS_CACHE_SIZE, profile_cache_ttl)
+        # Entry writes per user made through this instance. Each user is served by one process,
+        # so the counter is a cheap "has anything changed" stamp for render caches.
+        self._entry_versions: dict[int, int] = {}
+        # Ids of users known to have a row; loaded on connect so ensure_user only writes for new users.
+        self._known_users: set[int] = set()
+        # Every write shares the one connection, so a transaction spanning several awaits would take in
+        # (and a rollback would discard) statements of other coroutines. Writers hold this lock from their
+        # first statement to the commit.
+        self._write_lock = asyncio.Lock()
 
     async def connect(self) -> aiosqlite.Connection:
         if self._conn is None:
@@ -45,35 +137,272 @@ class EntryRepository:
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id INTEGER NOT NULL,
                     recorded_at TEXT NOT NULL,
+                    local_day TEXT,
                     weight_kg REAL NOT NULL,
                     fat_pct REAL,
                     fat_weight_kg REAL,
+                    trend_state TEXT,
                     created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
                 )
                 """
             )
+            for stmt in (
+                "ALTER TABLE entries ADD COLUMN trend_state TEXT",
+                "ALTER TABLE entries ADD COLUMN local_day TEXT",
+                "ALTER TABLE users ADD COLUMN timezone TEXT",
+            ):
+                try:
+                    await self._conn.execute(stmt)
+                except aiosqlite.OperationalError as exc:
+                    if "duplicate column name" not in str(exc):
+                        raise
+            await self._migrate_local_day()
             await self._conn.execute(
                 "CREATE INDEX IF NOT EXISTS idx_entries_user_time ON entries (user_id, recorded_at)"
             )
+            await self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_entries_user_day ON entries (user_id, local_day)"
+            )
+            # Covers the per-day admin aggregates, which group across users by recorded day.
+            await self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_time_user ON entries (recorded_at, user_id)"
+            )
+            await self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS notifications (
+                    user_id INTEGER PRIMARY KEY,
+                    reminder_hour INTEGER,
+                    weekly_report INTEGER NOT NULL DEFAULT 0,
+                    last_reminder_on TEXT,
+                    last_report_on TEXT
+                )
+                """
+            )
+            await self._create_measurements()
             await self._conn.commit()
+            async with self._conn.execute("SELECT id FROM users") as cursor:
+                self._known_users = {row["id"] async for row in cursor}
         return self._conn
 
+    async def _migrate_local_day(self) -> None:
+        # Rows from before local_day existed were all recorded at UTC midnight of their day.
+        assert self._conn is not None
+        await self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries_conflicts (
+                id INTEGER PRIMARY KEY,
+                entry_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                recorded_at TEXT NOT NULL,
+                local_day TEXT NOT NULL,
+                weight_kg REAL NOT NULL,
+                fat_pct REAL,
+                fat_weight_kg REAL,
+                created_at TEXT
+            )
+            """
+        )
+        cursor = await self._conn.execute(
+            "UPDATE entries SET local_day = substr(recorded_at, 1, 10) WHERE local_day IS NULL"
+        )
+        if cursor.rowcount <= 0:
+            return
+        # The old check-then-insert flow could race into two rows for one day. The newest row stays the
+        # day's entry; the others are moved to entries_conflicts (id = their old id, entry_id = the kept
+        # entry), and _create_measurements turns them into extra samples of that day.
+        cursor = await self._conn.execute(
+            """
+            INSERT INTO entries_conflicts (
+                id, entry_id, user_id, recorded_at, local_day, weight_kg, fat_pct, fat_weight_kg, created_at
+            )
+            SELECT e.id, kept.id, e.user_id, e.recorded_at, e.local_day, e.weight_kg, e.fat_pct, e.fat_weight_kg, e.created_at
+            FROM entries e
+            JOIN (SELECT user_id, local_day, MAX(id) AS id FROM entries GROUP BY user_id, local_day) kept
+              ON kept.user_id = e.user_id AND kept.local_day = e.local_day
+            WHERE e.id <> kept.id
+            """
+        )
+        moved = cursor.rowcount
+        if moved <= 0:
+            return
+        await self._conn.execute("DELETE FROM entries WHERE id IN (SELECT id FROM entries_conflicts)")
+        # Their trends were computed with the duplicates in them.
+        await self._conn.execute(
+            "UPDATE entries SET trend_state = NULL WHERE user_id IN (SELECT user_id FROM entries_conflicts)"
+        )
+        logger.warning("Moved %s same-day duplicate entries to entries_conflicts", moved)
+
+    async def _create_measurements(self) -> None:
+        # Every entry has one or more raw samples; daily_rollups keeps per-day aggregates of them
+        # up to date through the triggers below, so charts read one row per day.
+        # Samples are only ever inserted or deleted, never updated.
+        assert self._conn is not None
+        cursor = await self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'measurements'"
+        )
+        existed = await cursor.fetchone() is not None
+        await self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS measurements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                entry_id INTEGER NOT NULL REFERENCES entries (id) ON DELETE CASCADE,
+                user_id INTEGER NOT NULL,
+                local_day TEXT NOT NULL,
+                measured_at TEXT NOT NULL,
+                weight_kg REAL NOT NULL,
+                fat_pct REAL,
+                fat_weight_kg REAL
+            )
+            """
+        )
+        await self._conn.execute("CREATE INDEX IF NOT EXISTS idx_measurements_entry ON measurements (entry_id)")
+        await self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_measurements_user_day ON measurements (user_id, local_day, measured_at)"
+        )
+        await self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS daily_rollups (
+                user_id INTEGER NOT NULL,
+                local_day TEXT NOT NULL,
+                samples INTEGER NOT NULL,
+                weight_min REAL NOT NULL,
+                weight_sum REAL NOT NULL,
+                weight_last REAL NOT NULL,
+                last_at TEXT NOT NULL,
+                fat_samples INTEGER NOT NULL,
+                fat_weight_min REAL,
+                fat_weight_sum REAL,
+                fat_weight_last REAL,
+                fat_last_at TEXT,
+                PRIMARY KEY (user_id, local_day)
+            ) WITHOUT ROWID
+            """
+        )
+        if not existed:
+            # Existing entries become one sample each, plus their same-day duplicates from the local_day
+            # migration, which only ever runs on databases from before this table. Duplicates go first
+            # so on equal timestamps the kept entry is still the day's last sample.
+            await self._conn.execute(
+                """
+                INSERT INTO measurements (entry_id, user_id, local_day, measured_at, weight_kg, fat_pct, fat_weight_kg)
+                SELECT entry_id, user_id, local_day, recorded_at, weight_kg, fat_pct, fat_weight_kg
+                FROM entries_conflicts
+                ORDER BY id
+                """
+            )
+            await self._conn.execute(
+                """
+                INSERT INTO measurements (entry_id, user_id, local_day, measured_at, weight_kg, fat_pct, fat_weight_kg)
+                SELECT id, user_id, local_day, recorded_at, weight_kg, fat_pct, fat_weight_kg FROM entries
+                """
+            )
+            await self._conn.execute("DELETE FROM daily_rollups")
+            await self._conn.execute(_ROLLUP_REBUILD.format(where="1"))
+        # A new sample folds into its day in O(1); a removed one rebuilds just that day.
+        await self._conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS measurements_rollup_insert AFTER INSERT ON measurements
+            BEGIN
+                INSERT INTO daily_rollups (
+                    user_id, local_day, samples, weight_min, weight_sum, weight_last, last_at,
+                    fat_samples, fat_weight_min, fat_weight_sum, fat_weight_last, fat_last_at
+                )
+                VALUES (
+                    NEW.user_id, NEW.local_day, 1, NEW.weight_kg, NEW.weight_kg, NEW.weight_kg, NEW.measured_at,
+                    NEW.fat_weight_kg IS NOT NULL, NEW.fat_weight_kg, NEW.fat_weight_kg, NEW.fat_weight_kg,
+                    CASE WHEN NEW.fat_weight_kg IS NOT NULL THEN NEW.measured_at END
+                )
+                ON CONFLICT (user_id, local_day) DO UPDATE SET
+                    samples = samples + 1,
+                    weight_min = MIN(weight_min, excluded.weight_min),
+                    weight_sum = weight_sum + excluded.weight_sum,
+                    weight_last = CASE WHEN excluded.last_at >= last_at THEN excluded.weight_last ELSE weight_last END,
+                    last_at = MAX(last_at, excluded.last_at),
+                    fat_samples = fat_samples + excluded.fat_samples,
+                    fat_weight_min = COALESCE(MIN(fat_weight_min, excluded.fat_weight_min), fat_weight_min, excluded.fat_weight_min),
+                    fat_weight_sum = COALESCE(fat_weight_sum + excluded.fat_weight_sum, fat_weight_sum, excluded.fat_weight_sum),
+                    fat_weight_last = CASE
+                        WHEN excluded.fat_last_at >= COALESCE(fat_last_at, '') THEN excluded.fat_weight_last
+                        ELSE fat_weight_last
+                    END,
+                    fat_last_at = COALESCE(MAX(fat_last_at, excluded.fat_last_at), fat_last_at, excluded.fat_last_at);
+            END
+            """
+        )
+        await self._conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS measurements_rollup_delete AFTER DELETE ON measurements
+            BEGIN
+                DELETE FROM daily_rollups WHERE user_id = OLD.user_id AND local_day = OLD.local_day;
+                {_ROLLUP_REBUILD.format(where="m.user_id = OLD.user_id AND m.local_day = OLD.local_day")};
+            END
+            """
+        )
+
+    async def _reset_samples(self, conn: aiosqlite.Connection, entry_ids: list[int]) -> None:
+        # The entry's own values replace whatever intraday samples it had.
+        params = {"ids": json.dumps(entry_ids)}
+        await conn.execute(
+            "DELETE FROM measurements WHERE entry_id IN (SELECT value FROM json_each(:ids))", params
+        )
+        await conn.execute(
+            """
+            INSERT INTO measurements (entry_id, user_id, local_day, measured_at, weight_kg, fat_pct, fat_weight_kg)
+            SELECT id, user_id, local_day, recorded_at, weight_kg, fat_pct, fat_weight_kg
+            FROM entries
+            WHERE id IN (SELECT value FROM json_each(:ids))
+            """,
+            params,
+        )
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    def _update_cached_profile(self, user_id: int, **fields: Any) -> None:
+        cached = self._profiles.get(user_id)
+        if cached is not None:
+            self._profiles.set(user_id, {**cached, **fields})
+
+    def _entries_changed(self, user_id: int, *days: date) -> None:
+        self._entry_versions[user_id] = self._entry_versions.get(user_id, 0) + 1
+        for day in days:
+            self._entry_days.invalidate((user_id, day.replace(day=1)))
+
     async def get_user(self, user_id: int) -> Optional[dict[str, Any]]:
+        cached = self._profiles.get(user_id)
+        if cached is not None:
+            return dict(cached)
         conn = await self.connect()
         cursor = await conn.execute(
-            "SELECT id, height_cm, goal_weight_kg, goal_fat_pct, created_at FROM users WHERE id = :user_id",
+            "SELECT id, height_cm, goal_weight_kg, goal_fat_pct, timezone, created_at FROM users WHERE id = :user_id",
             {"user_id": user_id},
         )
         row = await cursor.fetchone()
-        return dict(row) if row else None
+        if row is None:
+            return None
+        user = dict(row)
+        self._profiles.set(user_id, user)
+        self._known_users.add(user_id)
+        return dict(user)
 
     async def ensure_user(self, user_id: int) -> dict[str, Any]:
+        cached = self._profiles.get(user_id)
+        if cached is not None:
+            return dict(cached)
         conn = await self.connect()
-        await conn.execute(
-            "INSERT INTO users (id) VALUES (:user_id) ON CONFLICT(id) DO NOTHING",
-            {"user_id": user_id},
-        )
-        await conn.commit()
+        if user_id in self._known_users:
+            user = await self.get_user(user_id)
+            if user is not None:
+                return user
+        async with self._write_lock:
+            await conn.execute(
+                "INSERT INTO users (id) VALUES (:user_id) ON CONFLICT(id) DO NOTHING",
+                {"user_id": user_id},
+            )
+            await conn.commit()
+        self._known_users.add(user_id)
         user = await self.get_user(user_id)
         if user is None:
             raise RuntimeError("Failed to ensure user row")
@@ -81,104 +410,403 @@ class EntryRepository:
 
     async def set_user_height(self, user_id: int, height_cm: float) -> None:
         conn = await self.connect()
-        await conn.execute(
-            """
-            INSERT INTO users (id, height_cm) VALUES (:user_id, :height_cm)
-            ON CONFLICT(id) DO UPDATE SET height_cm = excluded.height_cm
-            """,
-            {"user_id": user_id, "height_cm": height_cm},
-        )
-        await conn.commit()
+        async with self._write_lock:
+            await conn.execute(
+                """
+                INSERT INTO users (id, height_cm) VALUES (:user_id, :height_cm)
+                ON CONFLICT(id) DO UPDATE SET height_cm = excluded.height_cm
+                """,
+                {"user_id": user_id, "height_cm": height_cm},
+            )
+            await conn.commit()
+            self._known_users.add(user_id)
+            self._update_cached_profile(user_id, height_cm=height_cm)
 
     async def set_user_goal(self, user_id: int, weight_kg: float, fat_pct: float) -> None:
         conn = await self.connect()
-        await conn.execute(
+        async with self._write_lock:
+            await conn.execute(
+                """
+                INSERT INTO users (id, goal_weight_kg, goal_fat_pct)
+                VALUES (:user_id, :weight, :fat_pct)
+                ON CONFLICT(id) DO UPDATE SET goal_weight_kg = excluded.goal_weight_kg, goal_fat_pct = excluded.goal_fat_pct
+                """,
+                {"user_id": user_id, "weight": weight_kg, "fat_pct": fat_pct},
+            )
+            await conn.commit()
+            self._known_users.add(user_id)
+            self._update_cached_profile(user_id, goal_weight_kg=weight_kg, goal_fat_pct=fat_pct)
+
+    async def _insert_entry(
+        self, conn: aiosqlite.Connection, user_id: int, recorded_at: datetime, weight_kg: float, fat_pct: Optional[float]
+    ) -> Optional[int]:
+        cursor = await conn.execute(
             """
-            INSERT INTO users (id, goal_weight_kg, goal_fat_pct)
-            VALUES (:user_id, :weight, :fat_pct)
-            ON CONFLICT(id) DO UPDATE SET goal_weight_kg = excluded.goal_weight_kg, goal_fat_pct = excluded.goal_fat_pct
+            INSERT INTO entries (user_id, recorded_at, local_day, weight_kg, fat_pct, fat_weight_kg)
+            VALUES (:user_id, :recorded_at, :local_day, :weight_kg, :fat_pct, :fat_weight_kg)
+            ON CONFLICT(user_id, local_day) DO NOTHING
+            RETURNING id
             """,
-            {"user_id": user_id, "weight": weight_kg, "fat_pct": fat_pct},
+            _entry_params(user_id, recorded_at, weight_kg, fat_pct),
         )
-        await conn.commit()
+        row = await cursor.fetchone()
+        return row["id"] if row else None
+
+    async def set_user_timezone(self, user_id: int, tz_name: Optional[str]) -> None:
+        conn = await self.connect()
+        async with self._write_lock:
+            await conn.execute(
+                """
+                INSERT INTO users (id, timezone) VALUES (:user_id, :timezone)
+                ON CONFLICT(id) DO UPDATE SET timezone = excluded.timezone
+                """,
+                {"user_id": user_id, "timezone": tz_name},
+            )
+            await conn.commit()
+            self._known_users.add(user_id)
+            self._update_cached_profile(user_id, timezone=tz_name)
 
     async def add_entry(
         self, user_id: int, recorded_at: datetime, weight_kg: float, fat_pct: Optional[float]
     ) -> int:
+        # Check-and-insert in one statement; the UNIQUE (user_id, local_day) key decides.
         conn = await self.connect()
-        fat_weight = weight_kg * fat_pct / 100 if fat_pct is not None else None
-        cursor = await conn.execute(
-            """
-            INSERT INTO entries (user_id, recorded_at, weight_kg, fat_pct, fat_weight_kg)
-            VALUES (:user_id, :recorded_at, :weight_kg, :fat_pct, :fat_weight_kg)
-            """,
-            {
-                "user_id": user_id,
-                "recorded_at": recorded_at.isoformat(),
-                "weight_kg": weight_kg,
-                "fat_pct": fat_pct,
-                "fat_weight_kg": fat_weight,
-            },
-        )
-        await conn.commit()
-        return cursor.lastrowid
+        async with self._write_lock:
+            entry_id = await self._insert_entry(conn, user_id, recorded_at, weight_kg, fat_pct)
+            if entry_id is None:
+                # DO NOTHING wrote nothing, so there is nothing to roll back.
+                existing = await self.get_entry_by_date(user_id, recorded_at.date())
+                raise DuplicateDayError(existing)
+            await self._reset_samples(conn, [entry_id])
+            await self._refresh_trend(conn, user_id, recorded_at.isoformat())
+            await conn.commit()
+            self._entries_changed(user_id, recorded_at.date())
+            return entry_id
+
+    async def upsert_entry(
+        self, user_id: int, recorded_at: datetime, weight_kg: float, fat_pct: Optional[float]
+    ) -> int:
+        # Inserts the day's entry or overwrites the existing one in place (keeping its id).
+        conn = await self.connect()
+        async with self._write_lock:
+            previous = await self._day_recorded_at(conn, user_id, recorded_at.date())
+            cursor = await conn.execute(
+                """
+                INSERT INTO entries (user_id, recorded_at, local_day, weight_kg, fat_pct, fat_weight_kg)
+                VALUES (:user_id, :recorded_at, :local_day, :weight_kg, :fat_pct, :fat_weight_kg)
+                ON CONFLICT(user_id, local_day) DO UPDATE SET
+                    recorded_at = excluded.recorded_at,
+                    weight_kg = excluded.weight_kg,
+                    fat_pct = excluded.fat_pct,
+                    fat_weight_kg = excluded.fat_weight_kg
+                RETURNING id
+                """,
+                _entry_params(user_id, recorded_at, weight_kg, fat_pct),
+            )
+            row = await cursor.fetchone()
+            await self._reset_samples(conn, [row["id"]])
+            since = recorded_at.isoformat() if previous is None else min(previous, recorded_at.isoformat())
+            await self._refresh_trend(conn, user_id, since)
+            await conn.commit()
+            self._entries_changed(user_id, recorded_at.date())
+            return row["id"]
+
+    async def add_measurement(
+        self,
+        user_id: int,
+        recorded_at: datetime,
+        weight_kg: float,
+        fat_pct: Optional[float],
+        measured_at: Optional[datetime] = None,
+    ) -> int:
+        # Records another sample for recorded_at's day; the day's entry is created if needed and
+        # otherwise takes the values of the day's latest sample. Returns the entry id.
+        conn = await self.connect()
+        async with self._write_lock:
+            entry_id = await self._insert_entry(conn, user_id, recorded_at, weight_kg, fat_pct)
+            day = recorded_at.date()
+            if entry_id is None:
+                cursor = await conn.execute(
+                    "SELECT id FROM entries WHERE user_id = :user_id AND local_day = :day",
+                    {"user_id": user_id, "day": day.isoformat()},
+                )
+                entry_id = (await cursor.fetchone())["id"]
+            sample = _entry_params(user_id, recorded_at, weight_kg, fat_pct)
+            await conn.execute(
+                """
+                INSERT INTO measurements (entry_id, user_id, local_day, measured_at, weight_kg, fat_pct, fat_weight_kg)
+                VALUES (:entry_id, :user_id, :local_day, :measured_at, :weight_kg, :fat_pct, :fat_weight_kg)
+                """,
+                {**sample, "entry_id": entry_id, "measured_at": (measured_at or datetime.now(timezone.utc)).isoformat()},
+            )
+            await conn.execute(
+                """
+                UPDATE entries
+                SET (weight_kg, fat_pct, fat_weight_kg) = (
+                    SELECT weight_kg, fat_pct, fat_weight_kg
+                    FROM measurements
+                    WHERE entry_id = :entry_id
+                    ORDER BY measured_at DESC, id DESC
+                    LIMIT 1
+                )
+                WHERE id = :entry_id
+                """,
+                {"entry_id": entry_id},
+            )
+            await self._refresh_trend(conn, user_id, await self._entry_recorded_at(conn, entry_id, user_id))
+            await conn.commit()
+            self._entries_changed(user_id, day)
+            return entry_id
+
+    async def import_entries_chunk(
+        self,
+        user_id: int,
+        rows: list[tuple[datetime, float, Optional[float]]],
+        replace: bool = False,
+        refresh_trend: bool = True,
+    ) -> tuple[int, int, int]:
+        # Rows must be unique per day; returns (inserted, replaced, skipped) for the chunk. With
+        # refresh_trend=False the trend is left stale until finish_import replays it.
+        if not rows:
+            return 0, 0, 0
+        conn = await self.connect()
+        async with self._write_lock:
+            days = [recorded_at.date() for recorded_at, _, _ in rows]
+            try:
+                cursor = await conn.execute(
+                    """
+                    SELECT local_day
+                    FROM entries
+                    WHERE user_id = :user_id
+                      AND local_day >= :start
+                      AND local_day <= :end
+                    """,
+                    {"user_id": user_id, "start": min(days).isoformat(), "end": max(days).isoformat()},
+                )
+                existing = {date.fromisoformat(row["local_day"]) for row in await cursor.fetchall()}
+                to_write = [row for row in rows if replace or row[0].date() not in existing]
+                replaced = sum(1 for row in to_write if row[0].date() in existing)
+                conflict = (
+                    """
+                    ON CONFLICT(user_id, local_day) DO UPDATE SET
+                        recorded_at = excluded.recorded_at,
+                        weight_kg = excluded.weight_kg,
+                        fat_pct = excluded.fat_pct,
+                        fat_weight_kg = excluded.fat_weight_kg
+                    """
+                    if replace
+                    else "ON CONFLICT(user_id, local_day) DO NOTHING"
+                )
+                await conn.executemany(
+                    f"""
+                    INSERT INTO entries (user_id, recorded_at, local_day, weight_kg, fat_pct, fat_weight_kg)
+                    VALUES (:user_id, :recorded_at, :local_day, :weight_kg, :fat_pct, :fat_weight_kg)
+                    {conflict}
+                    """,
+                    [_entry_params(user_id, recorded_at, weight_kg, fat_pct) for recorded_at, weight_kg, fat_pct in to_write],
+                )
+                if to_write:
+                    cursor = await conn.execute(
+                        """
+                        SELECT id FROM entries
+                        WHERE user_id = :user_id AND local_day IN (SELECT value FROM json_each(:days))
+                        """,
+                        {"user_id": user_id, "days": json.dumps([row[0].date().isoformat() for row in to_write])},
+                    )
+                    await self._reset_samples(conn, [row["id"] for row in await cursor.fetchall()])
+                    if refresh_trend:
+                        await self._refresh_trend(conn, user_id, min(row[0] for row in to_write).isoformat())
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+            self._entries_changed(user_id, *{row[0].date().replace(day=1) for row in to_write})
+            return len(to_write) - replaced, replaced, len(rows) - len(to_write)
+
+    async def finish_import(self, user_id: int, since: date) -> None:
+        # One trend replay from the earliest imported day, instead of one per chunk: an unsorted
+        # file would otherwise rewrite the whole tail of the history for every chunk.
+        conn = await self.connect()
+        async with self._write_lock:
+            await self._refresh_trend(conn, user_id, since.isoformat())
+            await conn.commit()
+        self._entries_changed(user_id)
 
     async def update_entry(
-        self, entry_id: int, user_id: int, recorded_at: datetime, weight_kg: float, fat_pct: Optional[float]
+        self,
+        entry_id: int,
+        user_id: int,
+        recorded_at: datetime,
+        weight_kg: float,
+        fat_pct: Optional[float],
+        replace: bool = False,
     ) -> bool:
+        # Moving onto a day that already has an entry raises DuplicateDayError, unless
+        # replace=True, in which case that entry is dropped by the same UPDATE OR REPLACE statement.
         conn = await self.connect()
-        fat_weight = weight_kg * fat_pct / 100 if fat_pct is not None else None
+        async with self._write_lock:
+            previous = await self._entry_recorded_at(conn, entry_id, user_id)
+            if previous is None:
+                return False
+            try:
+                cursor = await conn.execute(
+                    f"""
+                    UPDATE {"OR REPLACE" if replace else ""} entries
+                    SET recorded_at = :recorded_at,
+                        local_day = :local_day,
+                        weight_kg = :weight_kg,
+                        fat_pct = :fat_pct,
+                        fat_weight_kg = :fat_weight_kg
+                    WHERE id = :entry_id AND user_id = :user_id
+                    """,
+                    {"entry_id": entry_id, **_entry_params(user_id, recorded_at, weight_kg, fat_pct)},
+                )
+            except sqlite3.IntegrityError:
+                # SQLite aborts just the failed statement; the transaction holds nothing of ours yet.
+                existing = await self.get_entry_by_date(user_id, recorded_at.date())
+                raise DuplicateDayError(existing) from None
+            await self._reset_samples(conn, [entry_id])
+            await self._refresh_trend(conn, user_id, min(previous, recorded_at.isoformat()))
+            await conn.commit()
+            self._entries_changed(user_id, datetime.fromisoformat(previous).date(), recorded_at.date())
+            return cursor.rowcount > 0
+
+    async def _day_recorded_at(self, conn: aiosqlite.Connection, user_id: int, day: date) -> Optional[str]:
         cursor = await conn.execute(
-            """
-            UPDATE entries
-            SET recorded_at = :recorded_at, weight_kg = :weight_kg, fat_pct = :fat_pct, fat_weight_kg = :fat_weight_kg
-            WHERE id = :entry_id AND user_id = :user_id
-            """,
-            {
-                "entry_id": entry_id,
-                "user_id": user_id,
-                "recorded_at": recorded_at.isoformat(),
-                "weight_kg": weight_kg,
-                "fat_pct": fat_pct,
-                "fat_weight_kg": fat_weight,
-            },
+            "SELECT recorded_at FROM entries WHERE user_id = :user_id AND local_day = :day",
+            {"user_id": user_id, "day": day.isoformat()},
         )
-        await conn.commit()
-        return cursor.rowcount > 0
+        row = await cursor.fetchone()
+        return row["recorded_at"] if row else None
+
+    async def _entry_recorded_at(self, conn: aiosqlite.Connection, entry_id: int, user_id: int) -> Optional[str]:
+        cursor = await conn.execute(
+            "SELECT recorded_at FROM entries WHERE id = :entry_id AND user_id = :user_id",
+            {"entry_id": entry_id, "user_id": user_id},
+        )
+        row = await cursor.fetchone()
+        return row["recorded_at"] if row else None
+
+    async def _refresh_trend(self, conn: aiosqlite.Connection, user_id: int, since: Optional[str]) -> None:
+        # Replays the trend filter from the entry before `since` (None = whole history) and stores
+        # each entry's state. Appending today's entry therefore only touches that one row.
+        state: Optional[TrendState] = None
+        if since is not None:
+            cursor = await conn.execute(
+                """
+                SELECT trend_state
+                FROM entries
+                WHERE user_id = :user_id AND recorded_at < :since
+                ORDER BY recorded_at DESC, id DESC
+                LIMIT 1
+                """,
+                {"user_id": user_id, "since": since},
+            )
+            row = await cursor.fetchone()
+            if row is not None:
+                if row["trend_state"] is None:
+                    # Rows written before trends existed: rebuild from the first entry.
+                    since = None
+                else:
+                    state = TrendState.loads(row["trend_state"])
+        # The tail is replayed in keyset batches carrying the state over, so a back-dated edit in a long
+        # history never holds every later row in memory at once.
+        after: tuple[str, int] = (since or "", -1)
+        while True:
+            cursor = await conn.execute(
+                """
+                SELECT id, recorded_at, weight_kg, fat_weight_kg
+                FROM entries
+                WHERE user_id = :user_id AND (recorded_at, id) > (:after_time, :after_id)
+                ORDER BY recorded_at, id
+                LIMIT :limit
+                """,
+                {"user_id": user_id, "after_time": after[0], "after_id": after[1], "limit": TREND_REPLAY_BATCH},
+            )
+            batch = await cursor.fetchall()
+            await cursor.close()
+            if not batch:
+                return
+            rows = [
+                (row["id"], datetime.fromisoformat(row["recorded_at"]), row["weight_kg"], row["fat_weight_kg"])
+                for row in batch
+            ]
+            states = replay_trend(state, rows)
+            await conn.executemany(
+                "UPDATE entries SET trend_state = :state WHERE id = :entry_id",
+                [{"entry_id": entry_id, "state": trend.dumps()} for entry_id, trend in states],
+            )
+            state = states[-1][1]
+            after = (batch[-1]["recorded_at"], batch[-1]["id"])
 
-    async def get_entry_by_date(self, user_id: int, recorded_date: date) -> Optional[dict[str, Any]]:
+    async def get_trend(self, user_id: int) -> Optional[TrendState]:
         conn = await self.connect()
-        start = datetime.combine(recorded_date, datetime.min.time(), tzinfo=timezone.utc)
-        end = start + timedelta(days=1)
         cursor = await conn.execute(
             """
-            SELECT id, user_id, recorded_at, weight_kg, fat_pct, fat_weight_kg
+            SELECT trend_state
             FROM entries
             WHERE user_id = :user_id
-              AND recorded_at >= :start
-              AND recorded_at < :end
-            ORDER BY recorded_at DESC
+            ORDER BY recorded_at DESC, id DESC
             LIMIT 1
             """,
-            {"user_id": user_id, "start": start.isoformat(), "end": end.isoformat()},
+            {"user_id": user_id},
         )
         row = await cursor.fetchone()
-        return dict(row) if row else None
+        if row is None:
+            return None
+        if row["trend_state"] is None:
+            trends = await self.get_trend_series(user_id)
+            return trends[-1] if trends else None
+        return TrendState.loads(row["trend_state"])
 
-    async def delete_entry(self, entry_id: int, user_id: int) -> bool:
+    async def get_trend_series(self, user_id: int, since: Optional[datetime] = None) -> list[TrendState]:
+        conn = await self.connect()
+        query = """
+            SELECT trend_state
+            FROM entries
+            WHERE user_id = :user_id AND (:since IS NULL OR recorded_at >= :since)
+            ORDER BY recorded_at, id
+        """
+        params = {"user_id": user_id, "since": since.isoformat() if since is not None else None}
+        cursor = await conn.execute(query, params)
+        rows = await cursor.fetchall()
+        if any(row["trend_state"] is None for row in rows):
+            async with self._write_lock:
+                await self._refresh_trend(conn, user_id, None)
+                await conn.commit()
+            cursor = await conn.execute(query, params)
+            rows = await cursor.fetchall()
+        return [TrendState.loads(row["trend_state"]) for row in rows]
+
+    async def get_entry_by_date(self, user_id: int, recorded_date: date) -> Optional[Entry]:
         conn = await self.connect()
         cursor = await conn.execute(
-            "DELETE FROM entries WHERE id = :entry_id AND user_id = :user_id",
-            {"entry_id": entry_id, "user_id": user_id},
+            f"SELECT {_ENTRY_COLUMNS} FROM entries WHERE user_id = :user_id AND local_day = :day",
+            {"user_id": user_id, "day": recorded_date.isoformat()},
         )
-        await conn.commit()
-        return cursor.rowcount > 0
+        cursor.row_factory = _entry_row
+        return await cursor.fetchone()
+
+    async def delete_entry(self, entry_id: int, user_id: int) -> bool:
+        conn = await self.connect()
+        async with self._write_lock:
+            previous = await self._entry_recorded_at(conn, entry_id, user_id)
+            if previous is None:
+                return False
+            cursor = await conn.execute(
+                "DELETE FROM entries WHERE id = :entry_id AND user_id = :user_id",
+                {"entry_id": entry_id, "user_id": user_id},
+            )
+            await self._refresh_trend(conn, user_id, previous)
+            await conn.commit()
+            self._entries_changed(user_id, datetime.fromisoformat(previous).date())
+            return cursor.rowcount > 0
 
-    async def list_recent_entries(self, user_id: int, limit: int = 10) -> list[dict[str, Any]]:
+    async def list_recent_entries(self, user_id: int, limit: int = 10) -> list[Entry]:
         conn = await self.connect()
         cursor = await conn.execute(
-            """
-            SELECT id, user_id, recorded_at, weight_kg, fat_pct, fat_weight_kg
+            f"""
+            SELECT {_ENTRY_COLUMNS}
             FROM entries
             WHERE user_id = :user_id
             ORDER BY recorded_at DESC
@@ -186,22 +814,82 @@ class EntryRepository:
             """,
             {"user_id": user_id, "limit": limit},
         )
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        cursor.row_factory = _entry_row
+        return list(await cursor.fetchall())
 
-    async def get_fat_weight_series(self, user_id: int) -> list[dict[str, Any]]:
+    async def get_entry_days(self, user_id: int, month: date) -> frozenset[int]:
+        # Day numbers in `month` that already have an entry; one range scan per cold month.
+        start = month.replace(day=1)
+        cached = self._entry_days.get((user_id, start))
+        if cached is not None:
+            return cached
+        end = (start + timedelta(days=32)).replace(day=1)
         conn = await self.connect()
         cursor = await conn.execute(
             """
-            SELECT recorded_at, fat_weight_kg, weight_kg
+            SELECT local_day
             FROM entries
-            WHERE user_id = :user_id AND fat_weight_kg IS NOT NULL
-            ORDER BY recorded_at ASC
+            WHERE user_id = :user_id AND local_day >= :start AND local_day < :end
             """,
-            {"user_id": user_id},
+            {"user_id": user_id, "start": start.isoformat(), "end": end.isoformat()},
         )
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        days = frozenset(date.fromisoformat(row["local_day"]).day for row in await cursor.fetchall())
+        self._entry_days.set((user_id, start), days)
+        return days
+
+    async def list_entries_between(self, user_id: int, start: date, end: date) -> list[Entry]:
+        # Range scan over the (user_id, local_day) key; newest first like list_recent_entries.
+        conn = await self.connect()
+        cursor = await conn.execute(
+            f"""
+            SELECT {_ENTRY_COLUMNS}
+            FROM entries
+            WHERE user_id = :user_id AND local_day >= :start AND local_day <= :end
+            ORDER BY local_day DESC
+            """,
+            {"user_id": user_id, "start": start.isoformat(), "end": end.isoformat()},
+        )
+        cursor.row_factory = _entry_row
+        return list(await cursor.fetchall())
+
+    async def entries_version(self, user_id: int) -> int:
+        return self._entry_versions.get(user_id, 0)
+
+    async def get_fat_weight_series(self, user_id: int, since: Optional[date] = None) -> list[SeriesPoint]:
+        # One row per day from daily_rollups; `since` bounds it to a primary key range scan.
+        conn = await self.connect()
+        cursor = await conn.execute(
+            """
+            SELECT
+                local_day || 'T00:00:00+00:00' AS recorded_at,
+                weight_sum / samples AS weight_kg,
+                fat_weight_sum / fat_samples AS fat_weight_kg
+            FROM daily_rollups
+            WHERE user_id = :user_id AND local_day >= :since AND fat_samples > 0
+            ORDER BY local_day ASC
+            """,
+            {"user_id": user_id, "since": since.isoformat() if since is not None else ""},
+        )
+        cursor.row_factory = _series_row
+        return list(await cursor.fetchall())
+
+    async def get_daily_series(self, user_id: int, since: Optional[date] = None) -> list[SeriesPoint]:
+        # Daily means for every day with a weigh-in; fat_weight_kg is NULL on days without fat %.
+        conn = await self.connect()
+        cursor = await conn.execute(
+            """
+            SELECT
+                local_day || 'T00:00:00+00:00' AS recorded_at,
+                weight_sum / samples AS weight_kg,
+                CASE WHEN fat_samples > 0 THEN fat_weight_sum / fat_samples END AS fat_weight_kg
+            FROM daily_rollups
+            WHERE user_id = :user_id AND local_day >= :since
+            ORDER BY local_day ASC
+            """,
+            {"user_id": user_id, "since": since.isoformat() if since is not None else ""},
+        )
+        cursor.row_factory = _series_row
+        return list(await cursor.fetchall())
 
     async def get_latest_fat_weight(self, user_id: int) -> Optional[float]:
         conn = await self.connect()
@@ -232,3 +920,242 @@ class EntryRepository:
         )
         row = await cursor.fetchone()
         return row["weight_kg"] if row else None
+
+    async def iter_users(
+        self, user_id: Optional[int] = None, chunk_size: int = EXPORT_CHUNK_SIZE
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        # user_id=None walks every user (admin dumps)
+        conn = await self.connect()
+        async with conn.execute(
+            """
+            SELECT id, height_cm, goal_weight_kg, goal_fat_pct, created_at
+            FROM users
+            WHERE :user_id IS NULL OR id = :user_id
+            ORDER BY id
+            """,
+            {"user_id": user_id},
+        ) as cursor:
+            while rows := await cursor.fetchmany(chunk_size):
+                yield [dict(row) for row in rows]
+
+    async def iter_entries(
+        self,
+        user_id: Optional[int] = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+        include_profile: bool = False,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        # Steps a single cursor and yields fetchmany() chunks so the full history is never held in memory.
+        profile_columns = ", u.height_cm, u.goal_weight_kg, u.goal_fat_pct" if include_profile else ""
+        profile_join = "LEFT JOIN users u ON u.id = e.user_id" if include_profile else ""
+        user_filter = "WHERE e.user_id = :user_id" if user_id is not None else ""
+        order = "e.recorded_at" if user_id is not None else "e.user_id, e.recorded_at"
+        conn = await self.connect()
+        async with conn.execute(
+            f"""
+            SELECT e.id, e.user_id, e.recorded_at, e.weight_kg, e.fat_pct, e.fat_weight_kg{profile_columns}
+            FROM entries e
+            {profile_join}
+            {user_filter}
+            ORDER BY {order}
+            """,
+            {"user_id": user_id},
+        ) as cursor:
+            while rows := await cursor.fetchmany(chunk_size):
+                yield [dict(row) for row in rows]
+
+    async def get_notification_settings(self, user_id: int) -> Optional[dict[str, Any]]:
+        conn = await self.connect()
+        cursor = await conn.execute(
+            """
+            SELECT user_id, reminder_hour, weekly_report, last_reminder_on, last_report_on
+            FROM notifications
+            WHERE user_id = :user_id
+            """,
+            {"user_id": user_id},
+        )
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+    async def set_reminder_hour(self, user_id: int, hour: Optional[int]) -> None:
+        conn = await self.connect()
+        async with self._write_lock:
+            await conn.execute(
+                """
+                INSERT INTO notifications (user_id, reminder_hour) VALUES (:user_id, :hour)
+                ON CONFLICT(user_id) DO UPDATE SET reminder_hour = excluded.reminder_hour
+                """,
+                {"user_id": user_id, "hour": hour},
+            )
+            await conn.commit()
+
+    async def set_weekly_report(self, user_id: int, enabled: bool) -> None:
+        conn = await self.connect()
+        async with self._write_lock:
+            await conn.execute(
+                """
+                INSERT INTO notifications (user_id, weekly_report) VALUES (:user_id, :enabled)
+                ON CONFLICT(user_id) DO UPDATE SET weekly_report = excluded.weekly_report
+                """,
+                {"user_id": user_id, "enabled": int(enabled)},
+            )
+            await conn.commit()
+
+    async def disable_notifications(self, user_id: int) -> None:
+        conn = await self.connect()
+        async with self._write_lock:
+            await conn.execute(
+                "UPDATE notifications SET reminder_hour = NULL, weekly_report = 0 WHERE user_id = :user_id",
+                {"user_id": user_id},
+            )
+            await conn.commit()
+
+    async def due_reminders(self, now: datetime, limit: int = 500) -> list[tuple[int, date]]:
+        # Users whose reminder hour has passed in their own time zone, who were not reminded on their
+        # local today and have no entry for it, with that local day. One query per time zone in use.
+        conn = await self.connect()
+        cursor = await conn.execute(
+            """
+            SELECT DISTINCT u.timezone
+            FROM notifications n
+            LEFT JOIN users u ON u.id = n.user_id
+            WHERE n.reminder_hour IS NOT NULL
+            """
+        )
+        zones = [row["timezone"] for row in await cursor.fetchall()]
+        due: list[tuple[int, date]] = []
+        for zone in zones:
+            local = now.astimezone(user_timezone({"timezone": zone}))
+            today = local.date()
+            cursor = await conn.execute(
+                """
+                SELECT n.user_id
+                FROM notifications n
+                LEFT JOIN users u ON u.id = n.user_id
+                WHERE n.reminder_hour IS NOT NULL
+                  AND u.timezone IS :zone
+                  AND n.reminder_hour <= :hour
+                  AND (n.last_reminder_on IS NULL OR n.last_reminder_on < :today)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM entries e WHERE e.user_id = n.user_id AND e.local_day = :today
+                  )
+                ORDER BY n.user_id
+                LIMIT :limit
+                """,
+                {"zone": zone, "hour": local.hour, "today": today.isoformat(), "limit": limit},
+            )
+            due.extend((row["user_id"], today) for row in await cursor.fetchall())
+        return sorted(due)[:limit]
+
+    async def mark_reminded(self, user_ids: list[int], day: date) -> None:
+        conn = await self.connect()
+        async with self._write_lock:
+            await conn.executemany(
+                "UPDATE notifications SET last_reminder_on = :day WHERE user_id = :user_id",
+                [{"user_id": user_id, "day": day.isoformat()} for user_id in user_ids],
+            )
+            await conn.commit()
+
+    async def iter_weekly_report_rows(
+        self, since: date, until: date, chunk_size: int = EXPORT_CHUNK_SIZE
+    ) -> AsyncIterator[list[Entry]]:
+        # Rows in [since, until) for every subscriber not yet reported on `until`, ordered by user. Each chunk
+        # is its own keyset query, fetched completely before it is yielded: the caller sends messages
+        # between chunks for minutes, and an open read cursor that long would hold back WAL checkpoints.
+        conn = await self.connect()
+        after: tuple[int, str, int] = (-1, "", -1)
+        while True:
+            cursor = await conn.execute(
+                """
+                SELECT e.id, e.user_id, e.recorded_at, e.weight_kg, e.fat_pct, e.fat_weight_kg
+                FROM notifications n
+                JOIN entries e ON e.user_id = n.user_id
+                WHERE n.weekly_report = 1
+                  AND (n.last_report_on IS NULL OR n.last_report_on < :until_day)
+                  AND e.local_day >= :since_day
+                  AND e.local_day < :until_day
+                  AND (e.user_id, e.recorded_at, e.id) > (:after_user, :after_time, :after_id)
+                ORDER BY e.user_id, e.recorded_at, e.id
+                LIMIT :limit
+                """,
+                {
+                    "since_day": since.isoformat(),
+                    "until_day": until.isoformat(),
+                    "after_user": after[0],
+                    "after_time": after[1],
+                    "after_id": after[2],
+                    "limit": chunk_size,
+                },
+            )
+            cursor.row_factory = _entry_row
+            rows: list[Entry] = list(await cursor.fetchall())
+            await cursor.close()
+            if not rows:
+                return
+            last = rows[-1]
+            after = (last.user_id, last.recorded_at.isoformat(), last.id)
+            yield rows
+
+    async def mark_reported(self, user_ids: list[int], day: date) -> None:
+        conn = await self.connect()
+        async with self._write_lock:
+            await conn.executemany(
+                "UPDATE notifications SET last_report_on = :day WHERE user_id = :user_id",
+                [{"user_id": user_id, "day": day.isoformat()} for user_id in user_ids],
+            )
+            await conn.commit()
+
+    async def active_users(self, since: datetime, limit: int = 500, shards: int = 1, shard: int = 0) -> list[int]:
+        # Users with an entry recorded since `since`, most recent first; scans idx_entries_time_user.
+        conn = await self.connect()
+        cursor = await conn.execute(
+            """
+            SELECT user_id, MAX(recorded_at) AS last_recorded_at
+            FROM entries
+            WHERE recorded_at >= :since AND user_id % :shards = :shard
+            GROUP BY user_id
+            ORDER BY last_recorded_at DESC
+            LIMIT :limit
+            """,
+            {"since": since.isoformat(), "shards": shards, "shard": shard, "limit": limit},
+        )
+        return [row["user_id"] for row in await cursor.fetchall()]
+
+    async def usage_stats(self, since: date) -> dict[str, Any]:
+        # Runs on its own read-only connection so the aggregates never queue behind (or block)
+        # the bot's connection; WAL lets it read while handlers write.
+        start = datetime.combine(since, datetime.min.time(), tzinfo=timezone.utc)
+        uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        async with aiosqlite.connect(uri, uri=True) as conn:
+            conn.row_factory = aiosqlite.Row
+            cursor = await conn.execute(
+                """
+                SELECT substr(recorded_at, 1, 10) AS day, COUNT(DISTINCT user_id) AS users, COUNT(*) AS entries
+                FROM entries
+                WHERE recorded_at >= :start
+                GROUP BY day
+                ORDER BY day
+                """,
+                {"start": start.isoformat()},
+            )
+            days = [dict(row) for row in await cursor.fetchall()]
+            cursor = await conn.execute(
+                """
+                SELECT n AS entries, COUNT(*) AS users
+                FROM (SELECT COUNT(*) AS n FROM entries GROUP BY user_id)
+                GROUP BY n
+                """
+            )
+            history_counts = {row["entries"]: row["users"] for row in await cursor.fetchall()}
+            cursor = await conn.execute("SELECT COUNT(*) FROM users")
+            total_users = (await cursor.fetchone())[0]
+            cursor = await conn.execute("PRAGMA page_count")
+            page_count = (await cursor.fetchone())[0]
+            cursor = await conn.execute("PRAGMA page_size")
+            page_size = (await cursor.fetchone())[0]
+        return {
+            "days": days,
+            "history_counts": history_counts,
+            "total_users": total_users,
+            "total_entries": sum(n * users for n, users in history_counts.items()),
+            "db_size_bytes": page_count * page_size,
+        }
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+from typing import Any, AsyncIterator, BinaryIO, Optional, Sequence
+
+from .repository import Repository
+
+EXPORT_FORMATS = ("csv", "json")
+ENTRY_FIELDS = ("user_id", "recorded_at", "weight_kg", "fat_pct", "fat_weight_kg")
+PROFILE_FIELDS = ("height_cm", "goal_weight_kg", "goal_fat_pct")
+
+RowChunks = AsyncIterator[list[dict[str, Any]]]
+
+
+async def write_csv(chunks: RowChunks, fields: Sequence[str], out: BinaryIO) -> int:
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fieldnames=list(fields), extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    count = 0
+    async for rows in chunks:
+        writer.writerows(rows)
+        count += len(rows)
+        out.write(text.getvalue().encode("utf-8"))
+        text.seek(0)
+        text.truncate()
+    out.write(text.getvalue().encode("utf-8"))
+    return count
+
+
+async def write_json(sections: dict[str, RowChunks], out: BinaryIO) -> dict[str, int]:
+    # Writes {"section": [...], ...} one chunk at a time instead of building the document in memory.
+    counts: dict[str, int] = {}
+    out.write(b"{")
+    for section_idx, (name, chunks) in enumerate(sections.items()):
+        prefix = "," if section_idx else ""
+        out.write(f"{prefix}{json.dumps(name)}: [".encode("utf-8"))
+        first = True
+        counts[name] = 0
+        async for rows in chunks:
+            if not rows:
+                continue
+            body = ",\n".join(json.dumps(row, ensure_ascii=False) for row in rows)
+            out.write((("\n" if first else ",\n") + body).encode("utf-8"))
+            first = False
+            counts[name] += len(rows)
+        out.write(b"\n]")
+    out.write(b"}\n")
+    return counts
+
+
+async def export_data(repo: Repository, out: BinaryIO, fmt: str = "csv", user_id: Optional[int] = None) -> int:
+    # user_id=None exports every user (admin dumps); returns the number of entries written.
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    with gzip.GzipFile(fileobj=out, mode="wb") as compressed:
+        if fmt == "csv":
+            return await write_csv(
+                repo.iter_entries(user_id, include_profile=True), (*ENTRY_FIELDS, *PROFILE_FIELDS), compressed
+            )
+        counts = await write_json(
+            {"users": repo.iter_users(user_id), "entries": repo.iter_entries(user_id)},
+            compressed,
+        )
+        return counts["entries"]
@@ -1,7 +1,16 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Optional
+from datetime import date, datetime, timezone, tzinfo
+from typing import TYPE_CHECKING, Optional, Sequence
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+if TYPE_CHECKING:
+    from .analytics import UsageStats
+    from .importer import ImportResult
+    from .repository import Entry
+    from .stats import GoalProjection
+
+SPARK_BARS = "▁▂▃▄▅▆▇█"
 
 
 def parse_float(value: str) -> Optional[float]:
@@ -25,12 +34,35 @@ def now_utc() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def format_entry_line(entry: dict, index: int | None = None) -> str:
-    recorded_at = datetime.fromisoformat(entry["recorded_at"]).date().isoformat()
+def parse_timezone(value: str) -> Optional[str]:
+    # Returns the canonical IANA name, or None when the zone is unknown.
+    name = value.strip()
+    if name.upper() in {"UTC", "GMT", "Z"}:
+        return "UTC"
+    try:
+        return ZoneInfo(name).key
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def user_timezone(user: dict | None) -> tzinfo:
+    name = (user or {}).get("timezone")
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone.utc
+
+
+def local_today(user: dict | None) -> date:
+    return now_utc().astimezone(user_timezone(user)).date()
+
+
+def format_entry_line(entry: Entry, index: int | None = None) -> str:
     prefix = f"{index}. " if index is not None else ""
-    fat_pct = entry["fat_pct"]
-    fat_text = f", fat {fat_pct:.1f}%" if fat_pct is not None else ""
-    return f"{prefix}{recorded_at}: {entry['weight_kg']:.1f} kg{fat_text}"
+    fat_text = f", fat {entry.fat_pct:.1f}%" if entry.fat_pct is not None else ""
+    return f"{prefix}{entry.day.isoformat()}: {entry.weight_kg:.1f} kg{fat_text}"
 
 
 def format_stats_summary(
@@ -65,3 +97,96 @@ def format_stats_summary(
             else:
                 lines.append(f"- {days}d: {rate:.3f} fat kg per kg weight")
     return "\n".join(lines)
+
+
+def format_goal_projection(expected: date | None, reason: str | None, projection: GoalProjection | None = None) -> str:
+    prefix = "Expected day of achieving goal"
+    if expected is None:
+        return f"{prefix}: {reason or 'not enough data'}."
+    text = f"{prefix}: {expected.isoformat()}"
+    if projection is not None and projection.optimistic is not None and projection.optimistic != projection.pessimistic:
+        slowest = projection.pessimistic.isoformat() if projection.pessimistic else "not at the slowest pace"
+        text += f" (likely {projection.optimistic.isoformat()} – {slowest})"
+    return text
+
+
+def sparkline(values: Sequence[float]) -> str:
+    if not values:
+        return ""
+    low = min(values)
+    high = max(values)
+    span = high - low
+    if span == 0:
+        return SPARK_BARS[len(SPARK_BARS) // 2] * len(values)
+    last = len(SPARK_BARS) - 1
+    return "".join(SPARK_BARS[round((value - low) / span * last)] for value in values)
+
+
+def format_trend_text(values: Sequence[float], weekly_deltas: Sequence[tuple[date, float]] | None = None) -> str:
+    if not values:
+        return "Fat weight trend: no data yet"
+    lines = [
+        f"Fat weight trend ({len(values)} pts): {sparkline(values)}",
+        f"{values[0]:.2f} → {values[-1]:.2f} kg",
+    ]
+    if weekly_deltas:
+        lines.append("Weekly change:")
+        for week_start, delta in weekly_deltas:
+            lines.append(f"- week of {week_start.isoformat()}: {delta:+.2f} kg")
+    return "\n".join(lines)
+
+
+def format_import_result(result: ImportResult) -> str:
+    lines = [
+        f"Import finished: {result.rows} rows read.",
+        f"Added {result.inserted}, replaced {result.replaced}, skipped {result.skipped} duplicates.",
+    ]
+    if result.error_count:
+        lines.append(f"{result.error_count} rows had errors:")
+        lines.extend(f"- {error}" for error in result.errors)
+        if result.error_count > len(result.errors):
+            lines.append(f"- ... and {result.error_count - len(result.errors)} more")
+    return "\n".join(lines)
+
+
+def format_weekly_report(since: date, until: date, entries: Sequence[Entry]) -> str:
+    # `entries` are one user's rows for the week, oldest first.
+    lines = [f"Weekly report {since.isoformat()} – {until.isoformat()}", f"Entries logged: {len(entries)}"]
+    weights = [entry.weight_kg for entry in entries]
+    if len(weights) > 1:
+        lines.append(f"Weight: {weights[0]:.1f} → {weights[-1]:.1f} kg ({weights[-1] - weights[0]:+.1f})")
+    elif weights:
+        lines.append(f"Weight: {weights[0]:.1f} kg")
+    fat = [entry.fat_weight_kg for entry in entries if entry.fat_weight_kg is not None]
+    if len(fat) > 1:
+        lines.append(f"Fat weight: {fat[0]:.2f} → {fat[-1]:.2f} kg ({fat[-1] - fat[0]:+.2f})")
+    elif fat:
+        lines.append(f"Fat weight: {fat[0]:.2f} kg")
+    return "\n".join(lines)
+
+
+def format_size(size_bytes: int) -> str:
+    size = float(size_bytes)
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def format_usage_days(stats: UsageStats) -> str:
+    lines = [f"Activity since {stats.since.isoformat()} (active users / entries):"]
+    if not stats.days:
+        lines.append("- no entries in this period")
+    for row in stats.days:
+        lines.append(f"- {row['day']}: {row['users']} / {row['entries']}")
+    return "\n".join(lines)
+
+
+def format_usage_totals(stats: UsageStats) -> str:
+    lines = [f"Users: {stats.total_users}", f"Entries: {stats.total_entries}"]
+    if stats.db_size_bytes is not None:
+        lines.append(f"Database size: {format_size(stats.db_size_bytes)}")
+    lines.append("History length (entries: users):")
+    lines.extend(f"- {label}: {users}" for label, users in stats.history)
+    return "\n".join(lines)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+
+from matplotlib import font_manager
+from PIL import Image, ImageDraw, ImageFont
+
+# Pillow version of stats._draw_gauge for the dashboard fast path. The geometry and colours mirror it:
+# angles are matplotlib degrees (counter-clockwise from 3 o'clock) and lengths are in gauge radii.
+START_ANGLE = 310
+ARC_SPAN = 280
+RED_ZONE = 0.25
+GREEN_CAP = 0.75
+ZONE_WIDTH = 0.36
+VALUE_INSET = 0.06
+VALUE_WIDTH = 0.24
+NEEDLE_DEGREES = 2
+NEEDLE_WIDTH = 0.9
+# Value label centre below the gauge centre.
+TEXT_OFFSET = 0.8
+ZONE_COLORS = ("#7dff8a51", "#fa847751")
+VALUE_COLORS = ("#C50000FF", "#00B415FD")
+NEEDLE_COLOR = "#111111BB"
+TEXT_COLOR = "#333333"
+# Arcs are drawn this many times larger and scaled down, since Pillow does not antialias shapes.
+SUPERSAMPLE = 3
+
+
+def _arc_span(theta1: float, theta2: float) -> float:
+    # Same unwrapping as matplotlib's Wedge: the arc always runs counter-clockwise from theta1.
+    if theta1 == theta2:
+        return 0.0
+    span = (theta2 - theta1) % 360
+    return span or 360.0
+
+
+def _pil_angles(theta1: float, theta2: float) -> tuple[float, float] | None:
+    span = _arc_span(theta1, theta2)
+    if span <= 0:
+        return None
+    # Pillow angles run clockwise with y pointing down, so the matplotlib arc is mirrored.
+    start = -(theta1 + span) % 360
+    return start, start + span
+
+
+def _draw_ring(
+    draw: ImageDraw.ImageDraw, center: float, radius: float, width: float, theta1: float, theta2: float, fill: str
+) -> None:
+    angles = _pil_angles(theta1, theta2)
+    if angles is None:
+        return
+    start, end = angles
+    outer = [center - radius, center - radius, center + radius, center + radius]
+    inner_radius = radius - width
+    inner = [center - inner_radius, center - inner_radius, center + inner_radius, center + inner_radius]
+    draw.pieslice(outer, start, end, fill=fill)
+    # Drawing without blending punches the hole back to transparent.
+    draw.pieslice(inner, start - 1, end + 1, fill=(0, 0, 0, 0))
+
+
+def _supersampled(size: int, *rings: tuple[float, float, float, float, str]) -> Image.Image:
+    # Draws (inset, width, theta1, theta2, colour) rings in radii of a `size` tile, antialiased by downscaling.
+    layer = Image.new("RGBA", (size * SUPERSAMPLE, size * SUPERSAMPLE), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    center = layer.width / 2
+    radius = (size - 2) / 2 * SUPERSAMPLE
+    for inset, width, theta1, theta2, fill in rings:
+        _draw_ring(draw, center, radius * (1 - inset), radius * width, theta1, theta2, fill)
+    return layer.reduce(SUPERSAMPLE)
+
+
+@dataclass(frozen=True)
+class GaugeTemplate:
+    # Everything that does not depend on the value, drawn once per tile size: the background zones and
+    # the full-length value rings, which a call only has to clip to its angle.
+    zones: Image.Image
+    red: Image.Image
+    green: Image.Image
+    blank: Image.Image
+
+
+@lru_cache(maxsize=8)
+def gauge_template(radius_px: int) -> GaugeTemplate:
+    size = 2 * radius_px + 2
+    start, end = START_ANGLE, START_ANGLE + ARC_SPAN
+    red_end = START_ANGLE + ARC_SPAN * RED_ZONE
+    return GaugeTemplate(
+        zones=_supersampled(
+            size, (0, ZONE_WIDTH, red_end, end, ZONE_COLORS[0]), (0, ZONE_WIDTH, start, red_end, ZONE_COLORS[1])
+        ),
+        red=_supersampled(size, (VALUE_INSET, VALUE_WIDTH, 0, 360, VALUE_COLORS[0])),
+        green=_supersampled(size, (VALUE_INSET, VALUE_WIDTH, 0, 360, VALUE_COLORS[1])),
+        blank=Image.new("RGBA", (size, size), (0, 0, 0, 0)),
+    )
+
+
+@lru_cache(maxsize=8)
+def _font(size_px: int) -> ImageFont.FreeTypeFont:
+    # The font matplotlib uses, so both renderers print the same label.
+    path = font_manager.findfont(font_manager.FontProperties(family="DejaVu Sans", weight="bold"))
+    return ImageFont.truetype(path, size_px)
+
+
+def _clip(template: GaugeTemplate, ring: Image.Image, theta1: float, theta2: float) -> Image.Image:
+    # The ring's curved edges come antialiased from the template; only the radial cut is drawn here.
+    mask = Image.new("L", ring.size, 0)
+    angles = _pil_angles(theta1, theta2)
+    if angles is not None:
+        ImageDraw.Draw(mask).pieslice([0, 0, ring.width - 1, ring.height - 1], *angles, fill=255)
+    return Image.composite(ring, template.blank, mask)
+
+
+def _needle(tile: Image.Image, radius: float, angle: float) -> None:
+    # A thin wedge is a quad at this size; drawn supersampled on its own bounding box only.
+    center = tile.width / 2
+    inner = radius * (1 - NEEDLE_WIDTH)
+    points = []
+    for r, theta in ((inner, angle - NEEDLE_DEGREES), (radius, angle - NEEDLE_DEGREES), (radius, angle), (inner, angle)):
+        points.append((center + r * math.cos(math.radians(theta)), center - r * math.sin(math.radians(theta))))
+    left = math.floor(min(x for x, _ in points))
+    top = math.floor(min(y for _, y in points))
+    width = math.ceil(max(x for x, _ in points)) - left + 1
+    height = math.ceil(max(y for _, y in points)) - top + 1
+    layer = Image.new("RGBA", (width * SUPERSAMPLE, height * SUPERSAMPLE), (0, 0, 0, 0))
+    ImageDraw.Draw(layer).polygon(
+        [((x - left) * SUPERSAMPLE, (y - top) * SUPERSAMPLE) for x, y in points], fill=NEEDLE_COLOR
+    )
+    tile.alpha_composite(layer.reduce(SUPERSAMPLE), dest=(left, top))
+
+
+def gauge_tile(rate: float | None, radius_px: int) -> Image.Image:
+    # One gauge without its label: template zones plus value arcs and needle for `rate`.
+    template = gauge_template(radius_px)
+    tile = template.zones.copy()
+    if rate is None:
+        return tile
+    end_angle = START_ANGLE + ARC_SPAN
+    value_start = START_ANGLE + ARC_SPAN * (1 - min(1, rate))
+    green_start = START_ANGLE + ARC_SPAN * (1 - min(GREEN_CAP, rate))
+    tile.alpha_composite(_clip(template, template.red, value_start, end_angle))
+    tile.alpha_composite(_clip(template, template.green, green_start, end_angle))
+    _needle(tile, radius_px, value_start)
+    return tile
+
+
+def draw_gauge(image: Image.Image, center: tuple[float, float], radius: float, rate: float | None, font_px: float) -> None:
+    # Blends a gauge onto the opaque `image` around `center`, with the value label underneath like _draw_gauge.
+    radius_px = max(1, round(radius))
+    tile = gauge_tile(rate, radius_px)
+    cx, cy = center
+    image.paste(tile, (round(cx - tile.width / 2), round(cy - tile.height / 2)), mask=tile)
+    label = "{:.2f}".format(rate * 100) + "%" if rate is not None else "n/a"
+    text_y = cy + TEXT_OFFSET * radius
+    ImageDraw.Draw(image).text((cx, text_y), label, fill=TEXT_COLOR, font=_font(round(font_px)), anchor="mm")
@@ -1,18 +1,49 @@
 from __future__ import annotations
 
-from datetime import date, datetime, timezone
+import io
+import logging
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
 
 from aiogram import F, Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command, CommandStart, StateFilter
 from aiogram.fsm.context import FSMContext
-from aiogram.types import BufferedInputFile, CallbackQuery, Message, ReplyKeyboardMarkup
+from aiogram.types import (
+    BufferedInputFile,
+    CallbackQuery,
+    FSInputFile,
+    InlineKeyboardMarkup,
+    InputMediaPhoto,
+    Message,
+    ReplyKeyboardMarkup,
+)
 
-from .db import EntryRepository
-from .formatting import format_entry_line, format_stats_summary, parse_float, parse_height_cm
+from .analytics import ANALYTICS_DAYS, UsageAnalytics, UsageStats
+from .dashboard import CHART_RANGES, DEFAULT_CHART_RANGE, DashboardRenderer, build_summary
+from .repository import DuplicateDayError, Entry, Repository
+from .formatting import (
+    format_entry_line,
+    format_import_result,
+    format_usage_days,
+    format_usage_totals,
+    local_today,
+    now_utc,
+    parse_float,
+    parse_height_cm,
+    parse_timezone,
+)
+from .exporter import EXPORT_FORMATS, export_data
+from .importer import IMPORT_POLICIES, ImportResult, import_entries
 from .keyboards import (
     ADD_ENTRY,
     ADD_GOAL,
     CANCEL,
+    CHART_RANGE_PREFIX,
+    CHARTS,
     DATEPICKER_PREFIX,
     DUPLICATE_PREFIX,
     EDIT_PAGE_SIZE,
@@ -20,40 +51,79 @@ from .keyboards import (
     EDIT_GOAL,
     SKIP_FAT,
     STATS,
+    STATS_TEXT,
     cancel_keyboard,
+    chart_range_keyboard,
     fat_pct_keyboard,
     main_keyboard,
     datepicker_keyboard,
     duplicate_date_keyboard,
     edit_entries_keyboard,
+    parse_chart_range,
     parse_datepicker_data,
     parse_duplicate_decision,
     parse_edit_selection_text,
 )
-from .states import AddEntryState, EditEntryState, GoalState, SetHeightState
-from .stats import build_dashboard, compute_fat_loss_rate, parse_series, project_goal_date
+from .states import AddEntryState, EditEntryState, GoalState, ImportState, SetHeightState
 
+logger = logging.getLogger(__name__)
 router = Router()
 
+IMPORT_PROGRESS_INTERVAL = 2.0
+IMPORT_SPOOL_SIZE = 1024 * 1024
+
 
 def _goal_set(user: dict) -> bool:
     return user.get("goal_weight_kg") is not None and user.get("goal_fat_pct") is not None
 
 
-def get_repo(message: Message) -> EntryRepository:
+def get_repo(message: Message) -> Repository:
     repo = getattr(message.bot, "repo", None)
-    if not isinstance(repo, EntryRepository):
+    if not isinstance(repo, Repository):
         raise RuntimeError("Repository is not configured")
     return repo
 
 
+def _is_admin(message: Message) -> bool:
+    admin_ids = getattr(message.bot, "admin_ids", ())
+    return message.from_user is not None and message.from_user.id in admin_ids
+
+
+def get_dashboards(message: Message) -> DashboardRenderer:
+    dashboards = getattr(message.bot, "dashboards", None)
+    if dashboards is None:
+        dashboards = DashboardRenderer(get_repo(message))
+        setattr(message.bot, "dashboards", dashboards)
+    return dashboards
+
+
+def get_analytics(message: Message) -> UsageAnalytics:
+    analytics = getattr(message.bot, "analytics", None)
+    if analytics is None:
+        analytics = UsageAnalytics(get_repo(message))
+        setattr(message.bot, "analytics", analytics)
+    return analytics
+
+
+def _entries_to_state(entries: list[Entry]) -> list[dict[str, Any]]:
+    # FSM data has to survive a JSON round trip, so entries are stored as plain dicts.
+    return [{**entry._asdict(), "recorded_at": entry.recorded_at.isoformat()} for entry in entries]
+
+
+def _entries_from_state(data: dict[str, Any]) -> list[Entry]:
+    return [
+        Entry(**{**item, "recorded_at": datetime.fromisoformat(item["recorded_at"])})
+        for item in data.get("entries") or []
+    ]
+
+
 async def _show_edit_entries(
     message: Message,
     state: FSMContext,
-    repo: EntryRepository,
+    repo: Repository,
     page: int = 0,
     prefix: str = "Pick an entry to edit or delete",
-    entries: list[dict] | None = None,
+    entries: list[Entry] | None = None,
 ) -> None:
     if entries is None:
         entries = await repo.list_recent_entries(user_id=message.from_user.id)  # type: ignore[arg-type]
@@ -65,7 +135,7 @@ async def _show_edit_entries(
     page = max(0, min(total_pages - 1, page))
     await state.clear()
     await state.set_state(EditEntryState.choosing_entry)
-    await state.update_data(entries=entries, edit_page=page)
+    await state.update_data(entries=_entries_to_state(entries), edit_page=page)
     await message.answer(
         f"{prefix} (page {page + 1}/{total_pages}):",
         reply_markup=edit_entries_keyboard(entries, page=page),
@@ -227,8 +297,9 @@ async def add_entry_fat(message: Message, state: FSMContext) -> None:
     await state.update_data(fat_pct=fat_pct)
     await state.set_state(AddEntryState.date)
     await message.answer(
-        "Pick a date (today is default). Use the calendar below or type Cancel.",
-        reply_markup=datepicker_keyboard(prefix="add", month=date.today()),
+        "Pick a date (today is default; • marks days that already have an entry). "
+        "Use the calendar below or type Cancel.",
+        reply_markup=await _datepicker(get_repo(message), message.from_user.id, "add"),  # type: ignore[union-attr]
     )
 
 
@@ -241,7 +312,7 @@ async def edit_entry_start(message: Message, state: FSMContext) -> None:
 @router.message(EditEntryState.choosing_entry)
 async def edit_entry_choose(message: Message, state: FSMContext) -> None:
     data = await state.get_data()
-    entries = data.get("entries") or []
+    entries = _entries_from_state(data)
     page = int(data.get("edit_page") or 0)
     parsed = parse_edit_selection_text(message.text or "")
     total_pages = max(1, (len(entries) + EDIT_PAGE_SIZE - 1) // EDIT_PAGE_SIZE)
@@ -264,13 +335,23 @@ async def edit_entry_choose(message: Message, state: FSMContext) -> None:
             reply_markup=edit_entries_keyboard(entries, page=page),
         )
         return
+    if action == "jump":
+        await state.set_state(EditEntryState.jumping)
+        await message.answer("Jumping to a date…", reply_markup=cancel_keyboard())
+        await message.answer(
+            "Pick a day to edit its entry (• marks days with one), or tap the month to list all of its entries.",
+            reply_markup=await _datepicker(
+                get_repo(message), message.from_user.id, "jump", list_month=True  # type: ignore[union-attr]
+            ),
+        )
+        return
     if action == "delete":
         if value < 0 or value >= len(entries):
             await message.answer("Out of range. Try again.", reply_markup=edit_entries_keyboard(entries, page=page))
             return
         entry = entries[value]
         repo = get_repo(message)
-        deleted = await repo.delete_entry(entry_id=entry["id"], user_id=message.from_user.id)  # type: ignore[arg-type]
+        deleted = await repo.delete_entry(entry_id=entry.id, user_id=message.from_user.id)  # type: ignore[arg-type]
         if not deleted:
             await message.answer("Could not delete entry.", reply_markup=edit_entries_keyboard(entries, page=page))
             return
@@ -281,13 +362,14 @@ async def edit_entry_choose(message: Message, state: FSMContext) -> None:
             page=page,
             prefix=f"Deleted: {format_entry_line(entry)}. Pick an entry to edit or delete",
         )
+        get_dashboards(message).schedule(message.from_user.id)  # type: ignore[union-attr]
         return
     if action == "pick":
         if value < 0 or value >= len(entries):
             await message.answer("Out of range. Try again.", reply_markup=edit_entries_keyboard(entries, page=page))
             return
         entry = entries[value]
-        await state.update_data(entry_id=entry["id"], entry_recorded_at=entry["recorded_at"], entry_index=value)
+        await state.update_data(entry_id=entry.id, entry_recorded_at=entry.recorded_at.isoformat(), entry_index=value)
         await state.set_state(EditEntryState.weight)
         await message.answer(
             f"Send new weight for {format_entry_line(entry)}",
@@ -296,6 +378,38 @@ async def edit_entry_choose(message: Message, state: FSMContext) -> None:
         return
 
 
+@router.message(EditEntryState.jumping)
+async def edit_entry_jump_text(message: Message, state: FSMContext) -> None:
+    try:
+        day = date.fromisoformat((message.text or "").strip())
+    except ValueError:
+        await message.answer("Pick a day in the calendar, send a date like 2024-03-15, or type Cancel.")
+        return
+    await _jump_to_day(message, state, get_repo(message), message.from_user.id, day)  # type: ignore[union-attr]
+
+
+async def _jump_to_day(message: Message, state: FSMContext, repo: Repository, user_id: int, day: date) -> None:
+    # Point lookup on the (user_id, local_day) key; falls back to the rest of that month.
+    entry = await repo.get_entry_by_date(user_id, day)
+    if entry is not None:
+        await _show_edit_entries(message, state, repo, prefix=f"Entry on {day.isoformat()}", entries=[entry])
+        return
+    await _show_month_entries(message, state, repo, user_id, day, prefix=f"No entry on {day.isoformat()}. ")
+
+
+async def _show_month_entries(
+    message: Message, state: FSMContext, repo: Repository, user_id: int, day: date, prefix: str = ""
+) -> None:
+    start = day.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    entries = await repo.list_entries_between(user_id, start, end)
+    month_label = start.strftime("%B %Y")
+    if not entries:
+        await message.answer(f"{prefix}No entries in {month_label}. Pick another day or month.")
+        return
+    await _show_edit_entries(message, state, repo, prefix=f"{prefix}Entries in {month_label}", entries=entries)
+
+
 @router.message(EditEntryState.weight)
 async def edit_entry_weight(message: Message, state: FSMContext) -> None:
     weight = parse_float(message.text or "")
@@ -327,57 +441,319 @@ async def edit_entry_fat(message: Message, state: FSMContext) -> None:
     default_date = datetime.fromisoformat(data["entry_recorded_at"]).date()
     await message.answer(
         "Pick a date (defaults to the entry's current date). Use the calendar or type Cancel.",
-        reply_markup=datepicker_keyboard(prefix="edit", month=default_date, default_date=default_date),
+        reply_markup=await _datepicker(
+            get_repo(message), message.from_user.id, "edit", month=default_date, default_date=default_date  # type: ignore[union-attr]
+        ),
     )
 
 
 @router.message(F.text == STATS)
 async def stats(message: Message, state: FSMContext) -> None:
     await state.clear()
-    repo = get_repo(message)
-    raw_series = await repo.get_fat_weight_series(user_id=message.from_user.id)  # type: ignore[arg-type]
-    if not raw_series:
+    dashboard = await get_dashboards(message).render(message.from_user.id)  # type: ignore[union-attr]
+    if dashboard is None:
         await message.answer("Need at least one entry with fat % to show stats.", reply_markup=await main_keyboard_for(message))
         return
-    series = parse_series(raw_series)
-    latest = await repo.get_latest_fat_weight(user_id=message.from_user.id)  # type: ignore[arg-type]
-    user = await repo.ensure_user(message.from_user.id)  # type: ignore[arg-type]
-    latest_weight = await repo.get_latest_weight(user_id=message.from_user.id)  # type: ignore[arg-type]
-    latest_bmi = None
-    height_cm = user.get("height_cm")
-    if height_cm and latest_weight:
-        height_m = float(height_cm) / 100
-        if height_m > 0:
-            latest_bmi = float(latest_weight) / (height_m * height_m)
-    goal_tuple = None
-    goal_fat_weight = None
-    if user.get("goal_weight_kg") is not None and user.get("goal_fat_pct") is not None:
-        goal_weight = float(user["goal_weight_kg"])
-        goal_fat_pct = float(user["goal_fat_pct"])
-        goal_fat_weight = goal_weight * goal_fat_pct / 100
-        goal_tuple = (goal_weight, goal_fat_pct, goal_fat_weight)
-    goal_projection_text = None
-    if goal_fat_weight is not None:
-        projected_date, reason = project_goal_date(series, goal_fat_weight)
-        if projected_date:
-            goal_projection_text = f"Expected day of achieving goal: {projected_date.isoformat()}"
-        elif reason:
-            goal_projection_text = f"Expected day of achieving goal: {reason}."
-    fat_loss_rates = {days: compute_fat_loss_rate(raw_series, days) for days in (7, 30)}
-    summary_text = format_stats_summary(latest, latest_bmi, fat_loss_rates, goal_tuple, goal_projection_text)
-    plot_image = build_dashboard(fat_loss_rates, series, goal_fat_weight)
-    photo = BufferedInputFile(plot_image.getvalue(), filename="fat-weight.png")
+    if dashboard.image is None:
+        await message.answer(dashboard.text, reply_markup=await main_keyboard_for(message))
+        return
     await message.answer_photo(
-        photo=photo,
-        caption=summary_text,
+        photo=BufferedInputFile(dashboard.image, filename="fat-weight.png"),
+        caption=dashboard.caption,
+        reply_markup=chart_range_keyboard(tuple(CHART_RANGES), dashboard.range_key),
+    )
+
+
+@router.callback_query(F.data.startswith(f"{CHART_RANGE_PREFIX}|"))
+async def stats_range(callback: CallbackQuery) -> None:
+    range_key = parse_chart_range(callback.data or "")
+    if range_key not in CHART_RANGES or callback.message is None:
+        await callback.answer()
+        return
+    # Re-renders in place: only the photo is swapped, the summary caption stays the same.
+    dashboard = await get_dashboards(callback.message).render(callback.from_user.id, range_key)
+    if dashboard is None:
+        await callback.answer("No fat % entries in this range.", show_alert=True)
+        return
+    if dashboard.image is None:
+        await callback.answer("Chart is busy, try again in a moment.", show_alert=True)
+        return
+    try:
+        await callback.message.edit_media(
+            media=InputMediaPhoto(
+                media=BufferedInputFile(dashboard.image, filename=f"fat-weight-{range_key.lower()}.png"),
+                caption=dashboard.caption,
+            ),
+            reply_markup=chart_range_keyboard(tuple(CHART_RANGES), range_key),
+        )
+    except TelegramBadRequest as exc:
+        # Tapping the range that is already shown.
+        if "message is not modified" not in str(exc):
+            raise
+    await callback.answer()
+
+
+@router.message(Command("stats_text"))
+@router.message(F.text == STATS_TEXT)
+async def stats_text(message: Message, state: FSMContext) -> None:
+    await state.clear()
+    summary = await build_summary(get_repo(message), message.from_user.id)  # type: ignore[union-attr]
+    if summary is None:
+        await message.answer("Need at least one entry with fat % to show stats.", reply_markup=await main_keyboard_for(message))
+        return
+    await message.answer(summary.report_text(), reply_markup=await main_keyboard_for(message))
+
+
+@router.message(Command("charts"))
+@router.message(F.text == CHARTS)
+async def charts(message: Message, state: FSMContext) -> None:
+    await state.clear()
+    parts = (message.text or "").split(maxsplit=1)
+    ranges = {key.lower(): key for key in CHART_RANGES}
+    range_key = ranges.get(parts[1].strip().lower()) if len(parts) > 1 else DEFAULT_CHART_RANGE
+    if range_key is None:
+        await message.answer(
+            f"Usage: /charts [{'|'.join(CHART_RANGES)}]", reply_markup=await main_keyboard_for(message)
+        )
+        return
+    album = await get_dashboards(message).render_album(message.from_user.id, range_key)  # type: ignore[union-attr]
+    if not album:
+        await message.answer("No entries to chart yet.", reply_markup=await main_keyboard_for(message))
+        return
+    media = [
+        InputMediaPhoto(media=BufferedInputFile(chart.image, filename=f"{chart.name}.png"), caption=chart.title)
+        for chart in album
+    ]
+    if len(media) == 1:
+        # Albums need at least two items.
+        await message.answer_photo(photo=media[0].media, caption=media[0].caption)
+        return
+    await message.answer_media_group(media=media)  # type: ignore[arg-type]
+
+
+@router.message(Command("import"))
+async def import_start(message: Message, state: FSMContext) -> None:
+    await state.clear()
+    parts = (message.text or "").split(maxsplit=1)
+    policy = parts[1].strip().lower() if len(parts) > 1 else "skip"
+    if policy not in IMPORT_POLICIES:
+        await message.answer(
+            "Usage: /import [skip|replace]. 'skip' keeps existing days, 'replace' overwrites them.",
+            reply_markup=await main_keyboard_for(message),
+        )
+        return
+    await state.set_state(ImportState.waiting_file)
+    await state.update_data(import_policy=policy)
+    existing_text = "replaced" if policy == "replace" else "kept"
+    await message.answer(
+        "Send a CSV or JSON file with columns date, weight_kg and optional fat_pct. "
+        f"Days that already have an entry will be {existing_text}.",
+        reply_markup=cancel_keyboard(),
+    )
+
+
+@router.message(ImportState.waiting_file, F.document)
+async def import_file(message: Message, state: FSMContext) -> None:
+    data = await state.get_data()
+    policy = data.get("import_policy") or "skip"
+    await state.clear()
+    repo = get_repo(message)
+    document = message.document
+    file_name = (document.file_name or "").lower()  # type: ignore[union-attr]
+    fmt = "json" if file_name.endswith((".json", ".jsonl", ".ndjson")) else "csv"
+    progress_message = await message.answer("Importing...")
+    last_report = time.monotonic()
+
+    async def report(result: ImportResult) -> None:
+        nonlocal last_report
+        now = time.monotonic()
+        if now - last_report < IMPORT_PROGRESS_INTERVAL:
+            return
+        last_report = now
+        await progress_message.edit_text(
+            f"Importing... {result.rows} rows read, {result.inserted + result.replaced} saved."
+        )
+
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as raw:
+        await message.bot.download(document, destination=raw)  # type: ignore[arg-type, union-attr]
+        raw.seek(0)
+        stream = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")  # type: ignore[arg-type]
+        try:
+            result = await import_entries(
+                repo,
+                message.from_user.id,  # type: ignore[union-attr]
+                stream,
+                fmt=fmt,
+                policy=policy,
+                progress=report,
+            )
+        finally:
+            stream.detach()
+    await message.answer(format_import_result(result), reply_markup=await main_keyboard_for(message))
+    get_dashboards(message).schedule(message.from_user.id)  # type: ignore[union-attr]
+
+
+@router.message(ImportState.waiting_file)
+async def import_waiting(message: Message, state: FSMContext) -> None:
+    await message.answer("Please send a CSV or JSON file, or tap Cancel.", reply_markup=cancel_keyboard())
+
+
+@router.message(Command("export"))
+async def export_command(message: Message, state: FSMContext) -> None:
+    await state.clear()
+    parts = (message.text or "").split(maxsplit=1)
+    fmt = parts[1].strip().lower() if len(parts) > 1 else "csv"
+    if fmt not in EXPORT_FORMATS:
+        await message.answer("Usage: /export [csv|json]", reply_markup=await main_keyboard_for(message))
+        return
+    repo = get_repo(message)
+    user_id = message.from_user.id  # type: ignore[union-attr]
+    # Stamped with the user's local day, like the dates they pick in the calendar.
+    today = await _user_today(repo, user_id)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = f"fatcules-{user_id}-{today.isoformat()}.{fmt}.gz"
+        path = os.path.join(tmpdir, filename)
+        with open(path, "wb") as out:
+            count = await export_data(repo, out, fmt=fmt, user_id=user_id)
+        await message.answer_document(
+            FSInputFile(path, filename=filename),
+            caption=f"Exported {count} entries.",
+            reply_markup=await main_keyboard_for(message),
+        )
+
+
+@router.message(Command("remind"))
+async def remind_command(message: Message, state: FSMContext) -> None:
+    await state.clear()
+    repo = get_repo(message)
+    user_id = message.from_user.id  # type: ignore[union-attr]
+    parts = (message.text or "").split(maxsplit=1)
+    arg = parts[1].strip().lower() if len(parts) > 1 else ""
+    if arg == "off":
+        await repo.set_reminder_hour(user_id, None)
+        await message.answer("Daily reminders are off.", reply_markup=await main_keyboard_for(message))
+        return
+    hour = int(arg) if arg.isdigit() else None
+    if hour is None or hour > 23:
+        settings = await repo.get_notification_settings(user_id)
+        current = settings.get("reminder_hour") if settings else None
+        status = f"currently at {current:02d}:00" if current is not None else "currently off"
+        await message.answer(
+            f"Usage: /remind <hour 0-23, in your /timezone> or /remind off ({status}).",
+            reply_markup=await main_keyboard_for(message),
+        )
+        return
+    await repo.set_reminder_hour(user_id, hour)
+    user = await repo.ensure_user(user_id)
+    await message.answer(
+        f"I'll remind you after {hour:02d}:00 {user.get('timezone') or 'UTC'} time on days without an entry.",
+        reply_markup=await main_keyboard_for(message),
+    )
+
+
+@router.message(Command("timezone"))
+async def timezone_command(message: Message, state: FSMContext) -> None:
+    await state.clear()
+    repo = get_repo(message)
+    user_id = message.from_user.id  # type: ignore[union-attr]
+    parts = (message.text or "").split(maxsplit=1)
+    if len(parts) < 2:
+        user = await repo.ensure_user(user_id)
+        await message.answer(
+            f"Your time zone is {user.get('timezone') or 'UTC'}. Change it with /timezone <Area/City>, e.g. /timezone Europe/Berlin.",
+            reply_markup=await main_keyboard_for(message),
+        )
+        return
+    tz_name = parse_timezone(parts[1])
+    if tz_name is None:
+        await message.answer(
+            "Unknown time zone. Use a name like Europe/Berlin or America/New_York.",
+            reply_markup=await main_keyboard_for(message),
+        )
+        return
+    await repo.set_user_timezone(user_id, tz_name)
+    await message.answer(
+        f"Time zone set to {tz_name}. Today is {await _user_today(repo, user_id)} there.",
         reply_markup=await main_keyboard_for(message),
     )
 
 
+@router.message(Command("weekly"))
+async def weekly_command(message: Message, state: FSMContext) -> None:
+    await state.clear()
+    parts = (message.text or "").split(maxsplit=1)
+    arg = parts[1].strip().lower() if len(parts) > 1 else "on"
+    if arg not in ("on", "off"):
+        await message.answer("Usage: /weekly [on|off]", reply_markup=await main_keyboard_for(message))
+        return
+    await get_repo(message).set_weekly_report(message.from_user.id, arg == "on")  # type: ignore[union-attr]
+    # The send time is a UTC hour for everyone; the reported days are the user's own calendar days.
+    text = "Weekly reports are on; they arrive on Mondays (UTC)." if arg == "on" else "Weekly reports are off."
+    await message.answer(text, reply_markup=await main_keyboard_for(message))
+
+
+async def _admin_usage(message: Message) -> UsageStats | None:
+    if not _is_admin(message):
+        return None
+    parts = (message.text or "").split()
+    args = [part.lower() for part in parts[1:]]
+    days = next((int(arg) for arg in args if arg.isdigit()), ANALYTICS_DAYS)
+    return await get_analytics(message).get(days, refresh="refresh" in args)
+
+
+def _computed_note(stats: UsageStats) -> str:
+    age = max(0, int(time.monotonic() - stats.computed_at))
+    return f"\n(computed {age}s ago; add 'refresh' to recompute)"
+
+
+@router.message(Command("admin_usage"))
+async def admin_usage(message: Message, state: FSMContext) -> None:
+    await state.clear()
+    stats = await _admin_usage(message)
+    if stats is None:
+        return
+    await message.answer(format_usage_days(stats) + _computed_note(stats))
+
+
+@router.message(Command("admin_db"))
+async def admin_db(message: Message, state: FSMContext) -> None:
+    await state.clear()
+    stats = await _admin_usage(message)
+    if stats is None:
+        return
+    await message.answer(format_usage_totals(stats) + _computed_note(stats))
+
+
 def _combine_date(selected: date) -> datetime:
+    # Entries are day records: the picked local day is stored at 00:00 UTC so its date is the local_day key.
     return datetime.combine(selected, datetime.min.time(), tzinfo=timezone.utc)
 
 
+async def _user_today(repo: Repository, user_id: int) -> date:
+    return local_today(await repo.ensure_user(user_id))
+
+
+async def _datepicker(
+    repo: Repository,
+    user_id: int,
+    prefix: str,
+    month: date | None = None,
+    default_date: date | None = None,
+    list_month: bool = False,
+) -> InlineKeyboardMarkup:
+    # Marks days that already have an entry so conflicting picks are visible up front.
+    today = await _user_today(repo, user_id)
+    month = month or today
+    return datepicker_keyboard(
+        prefix,
+        month=month,
+        default_date=default_date,
+        today=today,
+        list_month=list_month,
+        marked_days=await repo.get_entry_days(user_id, month),
+    )
+
+
 def _selected_date_from_state(data: dict) -> date:
     stored = data.get("selected_date")
     if not stored:
@@ -401,7 +777,9 @@ async def add_entry_datepicker(callback: CallbackQuery, state: FSMContext) -> No
         return
     if action == "nav":
         target_month = date.fromisoformat(payload)
-        await callback.message.edit_reply_markup(reply_markup=datepicker_keyboard(prefix="add", month=target_month))
+        await callback.message.edit_reply_markup(
+            reply_markup=await _datepicker(get_repo(callback.message), callback.from_user.id, "add", month=target_month)  # type: ignore[arg-type]
+        )
         await callback.answer()
         return
     if action != "pick":
@@ -415,34 +793,37 @@ async def add_entry_datepicker(callback: CallbackQuery, state: FSMContext) -> No
         await callback.answer("Something went wrong. Please start again.", show_alert=True)
         return
     repo = get_repo(callback.message)
-    existing = await repo.get_entry_by_date(callback.from_user.id, selected_date)  # type: ignore[arg-type]
-    if existing:
+    fat_pct = data.get("fat_pct")
+    recorded_at = _combine_date(selected_date)
+    try:
+        await repo.add_entry(
+            user_id=callback.from_user.id,  # type: ignore[arg-type]
+            recorded_at=recorded_at,
+            weight_kg=float(weight),
+            fat_pct=fat_pct if fat_pct is not None else None,
+        )
+    except DuplicateDayError as exc:
+        existing = exc.existing
         await state.update_data(
             selected_date=selected_date.isoformat(),
-            conflict_entry_id=existing["id"],
+            conflict_entry_id=existing.id,  # type: ignore[union-attr]
         )
         await state.set_state(AddEntryState.confirm_existing)
         await callback.message.answer(
             f"An entry already exists for {selected_date.isoformat()}:\n{format_entry_line(existing)}\n"
-            "Replace it, pick another date, or keep the old data?",
-            reply_markup=duplicate_date_keyboard(prefix="add"),
+            "Replace it, add this as another measurement for the day, pick another date, or keep the old data?",
+            reply_markup=duplicate_date_keyboard(prefix="add", allow_sample=True),
         )
         await callback.answer()
         return
-    fat_pct = data.get("fat_pct")
-    recorded_at = _combine_date(selected_date)
-    await repo.add_entry(
-        user_id=callback.from_user.id,  # type: ignore[arg-type]
-        recorded_at=recorded_at,
-        weight_kg=float(weight),
-        fat_pct=fat_pct if fat_pct is not None else None,
-    )
     await state.clear()
     fat_info = "" if fat_pct is None else f" and fat {fat_pct:.1f}%"
     await callback.message.answer(
         f"Entry saved: {recorded_at.date()} {float(weight):.1f} kg{fat_info}",
         reply_markup=await main_keyboard_for(callback),
     )
+    # Stats is the usual next tap after a weigh-in; have the dashboard ready by then.
+    get_dashboards(callback.message).schedule(callback.from_user.id)
     await callback.answer("Saved")
 
 
@@ -464,7 +845,13 @@ async def edit_entry_datepicker(callback: CallbackQuery, state: FSMContext) -> N
         target_month = date.fromisoformat(payload)
         default_date = datetime.fromisoformat((await state.get_data())["entry_recorded_at"]).date()
         await callback.message.edit_reply_markup(
-            reply_markup=datepicker_keyboard(prefix="edit", month=target_month, default_date=default_date)
+            reply_markup=await _datepicker(
+                get_repo(callback.message),  # type: ignore[arg-type]
+                callback.from_user.id,
+                "edit",
+                month=target_month,
+                default_date=default_date,
+            )
         )
         await callback.answer()
         return
@@ -485,11 +872,20 @@ async def edit_entry_datepicker(callback: CallbackQuery, state: FSMContext) -> N
         await state.clear()
         await callback.answer("Missing weight. Please restart edit.", show_alert=True)
         return
-    conflict = await repo.get_entry_by_date(callback.from_user.id, selected_date)  # type: ignore[arg-type]
-    if conflict and conflict["id"] != data["entry_id"]:
+    recorded_at = _combine_date(selected_date)
+    try:
+        updated = await repo.update_entry(
+            entry_id=int(data["entry_id"]),
+            user_id=callback.from_user.id,  # type: ignore[arg-type]
+            recorded_at=recorded_at,
+            weight_kg=float(weight),
+            fat_pct=fat_pct if fat_pct is not None else None,
+        )
+    except DuplicateDayError as exc:
+        conflict = exc.existing
         await state.update_data(
             selected_date=selected_date.isoformat(),
-            conflict_entry_id=conflict["id"],
+            conflict_entry_id=conflict.id,  # type: ignore[union-attr]
         )
         await state.set_state(EditEntryState.confirm_existing)
         await callback.message.answer(
@@ -499,28 +895,13 @@ async def edit_entry_datepicker(callback: CallbackQuery, state: FSMContext) -> N
         )
         await callback.answer()
         return
-    recorded_at = _combine_date(selected_date)
-    updated = await repo.update_entry(
-        entry_id=int(data["entry_id"]),
-        user_id=callback.from_user.id,  # type: ignore[arg-type]
-        recorded_at=recorded_at,
-        weight_kg=float(weight),
-        fat_pct=fat_pct if fat_pct is not None else None,
-    )
-    updated_entries = data.get("entries") or []
+    updated_entries = _entries_from_state(data)
     if updated_entries:
         # Replace the edited entry in the local list and keep ordering by recorded_at desc
-        updated_entry_payload = {
-            "id": int(data["entry_id"]),
-            "user_id": callback.from_user.id,
-            "recorded_at": recorded_at.isoformat(),
-            "weight_kg": float(weight),
-            "fat_pct": fat_pct if fat_pct is not None else None,
-            "fat_weight_kg": (float(weight) * float(fat_pct) / 100) if fat_pct is not None else None,
-        }
-        updated_entries = [e for e in updated_entries if int(e["id"]) != int(data["entry_id"])]
-        updated_entries.append(updated_entry_payload)
-        updated_entries.sort(key=lambda e: e.get("recorded_at"), reverse=True)
+        updated_entry = Entry.create(int(data["entry_id"]), callback.from_user.id, recorded_at, float(weight), fat_pct)
+        updated_entries = [e for e in updated_entries if e.id != updated_entry.id]
+        updated_entries.append(updated_entry)
+        updated_entries.sort(key=lambda e: e.recorded_at, reverse=True)
     if not updated:
         await _show_edit_entries(
             callback.message,
@@ -541,9 +922,35 @@ async def edit_entry_datepicker(callback: CallbackQuery, state: FSMContext) -> N
         prefix=f"Entry updated: {recorded_at.date()} {float(weight):.1f} kg{fat_info}. Pick an entry to edit or delete",
         entries=updated_entries or None,
     )
+    get_dashboards(callback.message).schedule(callback.from_user.id)
     await callback.answer("Updated")
 
 
+@router.callback_query(F.data.startswith(f"{DATEPICKER_PREFIX}|jump|"))
+async def edit_entry_jump_datepicker(callback: CallbackQuery, state: FSMContext) -> None:
+    parsed = parse_datepicker_data(callback.data or "")
+    if not parsed or callback.message is None:
+        await callback.answer()
+        return
+    _, action, payload = parsed
+    if await state.get_state() != EditEntryState.jumping.state:
+        await callback.answer()
+        return
+    repo = get_repo(callback.message)
+    user_id = callback.from_user.id
+    if action == "nav":
+        await callback.message.edit_reply_markup(
+            reply_markup=await _datepicker(repo, user_id, "jump", month=date.fromisoformat(payload), list_month=True)
+        )
+        await callback.answer()
+        return
+    if action == "pick":
+        await _jump_to_day(callback.message, state, repo, user_id, date.fromisoformat(payload))
+    elif action == "month":
+        await _show_month_entries(callback.message, state, repo, user_id, date.fromisoformat(payload))
+    await callback.answer()
+
+
 @router.callback_query(F.data.startswith(f"{DUPLICATE_PREFIX}|add|"))
 async def add_entry_duplicate_decision(callback: CallbackQuery, state: FSMContext) -> None:
     parsed = parse_duplicate_decision(callback.data or "")
@@ -570,7 +977,7 @@ async def add_entry_duplicate_decision(callback: CallbackQuery, state: FSMContex
         await state.set_state(AddEntryState.date)
         await callback.message.answer(
             "Pick a different date.",
-            reply_markup=datepicker_keyboard(prefix="add", month=selected_date),
+            reply_markup=await _datepicker(get_repo(callback.message), callback.from_user.id, "add", month=selected_date),  # type: ignore[arg-type]
         )
         await callback.answer()
         return
@@ -586,24 +993,42 @@ async def add_entry_duplicate_decision(callback: CallbackQuery, state: FSMContex
         repo = get_repo(callback.message)
         selected_date = _selected_date_from_state(data)
         recorded_at = _combine_date(selected_date)
-        updated = await repo.update_entry(
-            entry_id=int(conflict_entry_id),
+        # Overwrites whatever is on that day now, even if it changed since the conflict was shown.
+        await repo.upsert_entry(
             user_id=callback.from_user.id,  # type: ignore[arg-type]
             recorded_at=recorded_at,
             weight_kg=float(weight),
             fat_pct=fat_pct if fat_pct is not None else None,
         )
         await state.clear()
-        if not updated:
-            await callback.message.answer("Could not replace existing entry.", reply_markup=await main_keyboard_for(callback))
-            await callback.answer()
-            return
         fat_info = "" if fat_pct is None else f" and fat {fat_pct:.1f}%"
         await callback.message.answer(
             f"Entry replaced for {recorded_at.date()}: {float(weight):.1f} kg{fat_info}",
             reply_markup=await main_keyboard_for(callback),
         )
+        get_dashboards(callback.message).schedule(callback.from_user.id)
         await callback.answer("Replaced")
+        return
+    if action == "sample":
+        repo = get_repo(callback.message)
+        selected_date = _selected_date_from_state(data)
+        # Another weigh-in for the same day: stored as a raw sample, the day's entry shows the latest one.
+        await repo.add_measurement(
+            user_id=callback.from_user.id,  # type: ignore[arg-type]
+            recorded_at=_combine_date(selected_date),
+            weight_kg=float(weight),
+            fat_pct=fat_pct if fat_pct is not None else None,
+            measured_at=now_utc(),
+        )
+        await state.clear()
+        fat_info = "" if fat_pct is None else f" and fat {fat_pct:.1f}%"
+        await callback.message.answer(
+            f"Measurement added for {selected_date}: {float(weight):.1f} kg{fat_info}. "
+            "Charts use the day's average.",
+            reply_markup=await main_keyboard_for(callback),
+        )
+        get_dashboards(callback.message).schedule(callback.from_user.id)
+        await callback.answer("Added")
 
 
 @router.callback_query(F.data.startswith(f"{DUPLICATE_PREFIX}|edit|"))
@@ -634,7 +1059,13 @@ async def edit_entry_duplicate_decision(callback: CallbackQuery, state: FSMConte
         await state.set_state(EditEntryState.date)
         await callback.message.answer(
             "Pick a different date.",
-            reply_markup=datepicker_keyboard(prefix="edit", month=selected_date, default_date=selected_date),
+            reply_markup=await _datepicker(
+                get_repo(callback.message),  # type: ignore[arg-type]
+                callback.from_user.id,
+                "edit",
+                month=selected_date,
+                default_date=selected_date,
+            ),
         )
         await callback.answer()
         return
@@ -646,7 +1077,7 @@ async def edit_entry_duplicate_decision(callback: CallbackQuery, state: FSMConte
             repo,
             page=page,
             prefix="Kept the existing entry. Pick an entry to edit or delete",
-            entries=data.get("entries") or None,
+            entries=_entries_from_state(data) or None,
         )
         await callback.answer()
         return
@@ -659,6 +1090,7 @@ async def edit_entry_duplicate_decision(callback: CallbackQuery, state: FSMConte
             recorded_at=recorded_at,
             weight_kg=float(weight),
             fat_pct=fat_pct if fat_pct is not None else None,
+            replace=True,
         )
         if not updated:
             await _show_edit_entries(
@@ -667,27 +1099,16 @@ async def edit_entry_duplicate_decision(callback: CallbackQuery, state: FSMConte
                 repo,
                 page=page,
                 prefix="Could not update entry. Pick an entry to edit or delete",
-                entries=data.get("entries") or None,
+                entries=_entries_from_state(data) or None,
             )
             await callback.answer()
             return
-        if int(conflict_entry_id) != int(entry_id):
-            await repo.delete_entry(entry_id=int(conflict_entry_id), user_id=callback.from_user.id)  # type: ignore[arg-type]
         fat_info = "" if fat_pct is None else f" and fat {fat_pct:.1f}%"
-        entries = data.get("entries") or []
+        entries = _entries_from_state(data)
         if entries:
-            entries = [e for e in entries if int(e["id"]) != int(entry_id) and int(e["id"]) != int(conflict_entry_id)]
-            entries.append(
-                {
-                    "id": int(entry_id),
-                    "user_id": callback.from_user.id,
-                    "recorded_at": recorded_at.isoformat(),
-                    "weight_kg": float(weight),
-                    "fat_pct": fat_pct if fat_pct is not None else None,
-                    "fat_weight_kg": (float(weight) * float(fat_pct) / 100) if fat_pct is not None else None,
-                }
-            )
-            entries.sort(key=lambda e: e.get("recorded_at"), reverse=True)
+            entries = [e for e in entries if e.id != int(entry_id) and e.id != int(conflict_entry_id)]
+            entries.append(Entry.create(int(entry_id), callback.from_user.id, recorded_at, float(weight), fat_pct))
+            entries.sort(key=lambda e: e.recorded_at, reverse=True)
         await _show_edit_entries(
             callback.message,
             state,
@@ -699,4 +1120,5 @@ async def edit_entry_duplicate_decision(callback: CallbackQuery, state: FSMConte
             ),
             entries=entries or None,
         )
+        get_dashboards(callback.message).schedule(callback.from_user.id)
         await callback.answer("Replaced")
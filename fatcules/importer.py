@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Any, Awaitable, Callable, Iterator, Optional, TextIO
+
+from .formatting import parse_float
+from .repository import Repository
+
+IMPORT_POLICIES = ("skip", "replace")
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 5
+
+DATE_FIELDS = ("date", "recorded_at", "day")
+WEIGHT_FIELDS = ("weight_kg", "weight")
+FAT_FIELDS = ("fat_pct", "fat", "body_fat")
+
+ImportRow = tuple[datetime, float, Optional[float]]
+ProgressCallback = Callable[["ImportResult"], Awaitable[None]]
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    inserted: int = 0
+    replaced: int = 0
+    skipped: int = 0
+    errors: list[str] = field(default_factory=list)
+    error_count: int = 0
+
+    def add_error(self, line: int, reason: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"row {line}: {reason}")
+
+
+def _pick(row: dict[str, Any], names: tuple[str, ...]) -> Any:
+    for name in names:
+        if name in row:
+            return row[name]
+    return None
+
+
+def _as_float(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return parse_float(str(value))
+
+
+def parse_import_row(row: dict[str, Any]) -> ImportRow | str:
+    normalized = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+    raw_date = _pick(normalized, DATE_FIELDS)
+    if raw_date is None or not str(raw_date).strip():
+        return "missing date"
+    try:
+        day = datetime.fromisoformat(str(raw_date).strip()).date()
+    except ValueError:
+        return f"bad date {raw_date!r}"
+    weight = _as_float(_pick(normalized, WEIGHT_FIELDS))
+    if weight is None or weight <= 0:
+        return "missing or invalid weight"
+    raw_fat = _pick(normalized, FAT_FIELDS)
+    fat_pct = None
+    if raw_fat is not None and str(raw_fat).strip():
+        fat_pct = _as_float(raw_fat)
+        if fat_pct is None or fat_pct <= 0 or fat_pct > 100:
+            return f"bad fat % {raw_fat!r}"
+    recorded_at = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+    return recorded_at, weight, fat_pct
+
+
+def iter_csv_rows(stream: TextIO) -> Iterator[tuple[int, dict[str, Any]]]:
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _iter_json_array(stream: TextIO, buffer: str, chunk_size: int) -> Iterator[tuple[int, Any]]:
+    decoder = json.JSONDecoder()
+    pos = buffer.index("[") + 1
+    index = 0
+    eof = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        index += 1
+        yield index, item
+        pos = end
+        if pos > chunk_size:
+            buffer = buffer[pos:]
+            pos = 0
+
+
+def iter_json_rows(stream: TextIO, chunk_size: int = 64 * 1024) -> Iterator[tuple[int, Any]]:
+    # Accepts a top-level JSON array (decoded incrementally) or JSON Lines.
+    head = stream.read(chunk_size)
+    stripped = head.lstrip()
+    if stripped.startswith("["):
+        yield from _iter_json_array(stream, stripped, chunk_size)
+        return
+    line_num = 0
+    pending = ""
+    while head:
+        lines = (pending + head).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            line_num += 1
+            if line.strip():
+                yield line_num, json.loads(line)
+        head = stream.read(chunk_size)
+    if pending.strip():
+        yield line_num + 1, json.loads(pending)
+
+
+async def import_entries(
+    repo: Repository,
+    user_id: int,
+    stream: TextIO,
+    fmt: str = "csv",
+    policy: str = "skip",
+    progress: ProgressCallback | None = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> ImportResult:
+    if policy not in IMPORT_POLICIES:
+        raise ValueError(f"Unknown duplicate policy: {policy}")
+    replace = policy == "replace"
+    rows = iter_json_rows(stream) if fmt == "json" else iter_csv_rows(stream)
+    result = ImportResult()
+    # One row per day within a chunk; earlier chunks are already in the DB and handled there.
+    chunk: dict[date, ImportRow] = {}
+    # Earliest day written so far: the trend is replayed from there once, after the last chunk.
+    since: date | None = None
+
+    async def flush() -> None:
+        nonlocal since
+        inserted, replaced, skipped = await repo.import_entries_chunk(
+            user_id, list(chunk.values()), replace=replace, refresh_trend=False
+        )
+        if inserted or replaced:
+            first = min(chunk)
+            since = first if since is None else min(since, first)
+        result.inserted += inserted
+        result.replaced += replaced
+        result.skipped += skipped
+        chunk.clear()
+        if progress is not None:
+            await progress(result)
+
+    try:
+        try:
+            for line, raw in rows:
+                result.rows += 1
+                if not isinstance(raw, dict):
+                    result.add_error(line, "expected an object")
+                    continue
+                parsed = parse_import_row(raw)
+                if isinstance(parsed, str):
+                    result.add_error(line, parsed)
+                    continue
+                day = parsed[0].date()
+                if day in chunk:
+                    result.skipped += 1
+                    if not replace:
+                        continue
+                chunk[day] = parsed
+                if len(chunk) >= chunk_size:
+                    await flush()
+        except (json.JSONDecodeError, csv.Error, UnicodeDecodeError) as exc:
+            result.add_error(result.rows + 1, f"unreadable file ({exc})")
+        if chunk:
+            await flush()
+    finally:
+        # Also when a chunk failed: the chunks committed before it still need their trend.
+        if since is not None:
+            await repo.finish_import(user_id, since)
+    return result
@@ -1,31 +1,44 @@
 from __future__ import annotations
 
 from datetime import date, timedelta
+from functools import lru_cache
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
 
+from .repository import Entry
+
 
 ADD_ENTRY = "Add entry"
 EDIT_ENTRY = "Edit entries"
 STATS = "Stats"
+STATS_TEXT = "Quick stats"
+CHARTS = "Charts"
 ADD_GOAL = "Add goal"
 EDIT_GOAL = "Edit goal"
 CANCEL = "Cancel"
 SKIP_FAT = "Skip fat %"
 DATEPICKER_PREFIX = "DP"
 DUPLICATE_PREFIX = "DUP"
+CHART_RANGE_PREFIX = "RNG"
 EDIT_PAGE_SIZE = 5
 EDIT_PREV = "◀ Prev"
 EDIT_NEXT = "Next ▶"
+EDIT_JUMP = "📅 Jump to date"
 DELETE_ICON = "🗑"
+ENTRY_DAY_MARK = "•"
+DATEPICKER_CACHE_SIZE = 256
+
+_datepicker_cache_day: date | None = None
 
 
+# Markups below are cached and shared between calls; treat them as read-only.
+@lru_cache(maxsize=None)
 def main_keyboard(goal_set: bool = False) -> ReplyKeyboardMarkup:
     goal_label = EDIT_GOAL if goal_set else ADD_GOAL
     return ReplyKeyboardMarkup(
         keyboard=[
             [KeyboardButton(text=ADD_ENTRY), KeyboardButton(text=EDIT_ENTRY)],
-            [KeyboardButton(text=STATS)],
+            [KeyboardButton(text=STATS), KeyboardButton(text=STATS_TEXT), KeyboardButton(text=CHARTS)],
             [KeyboardButton(text=goal_label)],
         ],
         resize_keyboard=True,
@@ -33,6 +46,7 @@ def main_keyboard(goal_set: bool = False) -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=None)
 def cancel_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[[KeyboardButton(text=CANCEL)]],
@@ -41,6 +55,7 @@ def cancel_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=None)
 def fat_pct_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[[KeyboardButton(text=SKIP_FAT)], [KeyboardButton(text=CANCEL)]],
@@ -73,10 +88,45 @@ def _callback(prefix: str, action: str, payload: str) -> str:
     return f"{DATEPICKER_PREFIX}|{prefix}|{action}|{payload}"
 
 
-def datepicker_keyboard(prefix: str, month: date | None = None, default_date: date | None = None) -> InlineKeyboardMarkup:
-    today = date.today()
-    current_month = _start_of_month(month or today)
-    header = [InlineKeyboardButton(text=current_month.strftime("%B %Y"), callback_data=_callback(prefix, "noop", "header"))]
+def datepicker_keyboard(
+    prefix: str,
+    month: date | None = None,
+    default_date: date | None = None,
+    today: date | None = None,
+    list_month: bool = False,
+    marked_days: frozenset[int] = frozenset(),
+) -> InlineKeyboardMarkup:
+    # `today` is the user's local date; it defaults to the server's.
+    # With `list_month` the month header becomes a button that sends the "month" action.
+    # `marked_days` are day numbers of the month that already have an entry.
+    global _datepicker_cache_day
+    server_today = date.today()
+    if _datepicker_cache_day != server_today:
+        # "Today" button points at yesterday in every cached markup once the day rolls over
+        _build_datepicker.cache_clear()
+        _datepicker_cache_day = server_today
+    today = today or server_today
+    return _build_datepicker(prefix, _start_of_month(month or today), default_date, today, list_month, marked_days)
+
+
+@lru_cache(maxsize=DATEPICKER_CACHE_SIZE)
+def _build_datepicker(
+    prefix: str,
+    current_month: date,
+    default_date: date | None,
+    today: date,
+    list_month: bool = False,
+    marked_days: frozenset[int] = frozenset(),
+) -> InlineKeyboardMarkup:
+    month_label = current_month.strftime("%B %Y")
+    if list_month:
+        header = [
+            InlineKeyboardButton(
+                text=f"📋 {month_label}", callback_data=_callback(prefix, "month", current_month.isoformat())
+            )
+        ]
+    else:
+        header = [InlineKeyboardButton(text=month_label, callback_data=_callback(prefix, "noop", "header"))]
 
     week_days = ["Mo", "Tu", "We", "Th", "Fr", "Sa", "Su"]
     weekday_row = [InlineKeyboardButton(text=day, callback_data=_callback(prefix, "noop", day.lower())) for day in week_days]
@@ -93,7 +143,7 @@ def datepicker_keyboard(prefix: str, month: date | None = None, default_date: da
         day_date = current_month.replace(day=day_num)
         current_row.append(
             InlineKeyboardButton(
-                text=str(day_num),
+                text=f"{day_num}{ENTRY_DAY_MARK}" if day_num in marked_days else str(day_num),
                 callback_data=_callback(prefix, "pick", day_date.isoformat()),
             )
         )
@@ -137,7 +187,13 @@ def parse_datepicker_data(data: str) -> tuple[str, str, str] | None:
     return prefix, action, payload
 
 
-def duplicate_date_keyboard(prefix: str) -> InlineKeyboardMarkup:
+def duplicate_date_keyboard(prefix: str, allow_sample: bool = False) -> InlineKeyboardMarkup:
+    sample_row = [
+        InlineKeyboardButton(
+            text="Add as another measurement",
+            callback_data=f"{DUPLICATE_PREFIX}|{prefix}|sample",
+        )
+    ]
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
@@ -146,6 +202,7 @@ def duplicate_date_keyboard(prefix: str) -> InlineKeyboardMarkup:
                     callback_data=f"{DUPLICATE_PREFIX}|{prefix}|replace",
                 )
             ],
+            *([sample_row] if allow_sample else []),
             [
                 InlineKeyboardButton(
                     text="Choose different date",
@@ -172,19 +229,15 @@ def parse_duplicate_decision(data: str) -> tuple[str, str] | None:
     return prefix, action
 
 
-def _entry_label(entry: dict) -> str:
-    recorded_at = entry.get("recorded_at")
-    weight = entry.get("weight_kg")
-    fat = entry.get("fat_pct")
-    date_text = recorded_at[:10] if isinstance(recorded_at, str) else str(recorded_at)
-    base = f"{date_text}: {float(weight):.1f} kg" if weight is not None else str(entry)
-    if fat is None:
+def _entry_label(entry: Entry) -> str:
+    base = f"{entry.day.isoformat()}: {entry.weight_kg:.1f} kg"
+    if entry.fat_pct is None:
         return base
-    return f"{base}, fat {float(fat):.1f}%"
+    return f"{base}, fat {entry.fat_pct:.1f}%"
 
 
 def edit_entries_keyboard(
-    entries: list[dict], page: int = 0, page_size: int = EDIT_PAGE_SIZE
+    entries: list[Entry], page: int = 0, page_size: int = EDIT_PAGE_SIZE
 ) -> ReplyKeyboardMarkup:
     total = len(entries)
     total_pages = max(1, (total + page_size - 1) // page_size)
@@ -202,6 +255,7 @@ def edit_entries_keyboard(
     nav_row: list[KeyboardButton] = []
     if page > 0:
         nav_row.append(KeyboardButton(text=EDIT_PREV))
+    nav_row.append(KeyboardButton(text=EDIT_JUMP))
     nav_row.append(KeyboardButton(text=CANCEL))
     if page < total_pages - 1:
         nav_row.append(KeyboardButton(text=EDIT_NEXT))
@@ -220,6 +274,8 @@ def parse_edit_selection_text(text: str) -> tuple[str, int] | None:
         return ("nav", -1)
     if text == CANCEL:
         return ("cancel", 0)
+    if text == EDIT_JUMP:
+        return ("jump", 0)
     if text.startswith(DELETE_ICON):
         stripped = text.replace(DELETE_ICON, "", 1).strip()
         try:
@@ -233,3 +289,24 @@ def parse_edit_selection_text(text: str) -> tuple[str, int] | None:
     except (ValueError, IndexError):
         return None
     return ("pick", idx)
+
+
+@lru_cache(maxsize=None)
+def chart_range_keyboard(ranges: tuple[str, ...], selected: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text=f"• {label}" if label == selected else label,
+                    callback_data=f"{CHART_RANGE_PREFIX}|{label}",
+                )
+                for label in ranges
+            ]
+        ]
+    )
+
+
+def parse_chart_range(data: str) -> str | None:
+    if not data or not data.startswith(f"{CHART_RANGE_PREFIX}|"):
+        return None
+    return data.split("|", maxsplit=1)[1]
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+from aiogram import BaseMiddleware
+
+if TYPE_CHECKING:
+    from aiogram import Dispatcher
+    from aiogram.types import TelegramObject
+
+    from .config import Settings
+
+LOG_FORMATS = ("json", "text")
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+# Structured attributes copied into JSON records when a log call (or the update context) sets them.
+EXTRA_FIELDS = ("user_id", "handler", "update_id", "latency_ms", "error", "suppressed")
+# Every handled update logs one record; these are sampled instead of rate limited.
+UPDATE_LOGGERS = ("fatcules.updates", "aiogram.event")
+MAX_RATE_KEYS = 4096
+
+update_logger = logging.getLogger("fatcules.updates")
+# Fields of the update being processed; asyncio tasks and to_thread calls inherit it.
+_update_context: ContextVar[Optional[dict[str, Any]]] = ContextVar("fatcules_update_context", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "message": record.getMessage(),
+        }
+        for name in EXTRA_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                payload[name] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class UpdateContextFilter(logging.Filter):
+    # Tags every record logged while an update is processed with its user and handler.
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _update_context.get()
+        if context:
+            for name, value in context.items():
+                if getattr(record, name, None) is None:
+                    setattr(record, name, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    # Keeps `sample_rate` of the per-update INFO records and at most `rate_limit` records per `window_s`
+    # for every other (logger, message template) below ERROR. The first record let through after a
+    # suppressed burst carries the number of dropped ones. Warnings from update loggers are never sampled.
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        rate_limit: int = 20,
+        window_s: float = 60.0,
+        sampled_loggers: tuple[str, ...] = UPDATE_LOGGERS,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rate_limit = rate_limit
+        self.window_s = window_s
+        self.sampled_loggers = sampled_loggers
+        self._clock = clock
+        self._rng = rng
+        self._windows: dict[tuple[str, Any], list[float]] = {}
+        self._lock = threading.Lock()
+        self.sampled_out = 0
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        if record.name in self.sampled_loggers:
+            if record.levelno >= logging.WARNING or self.sample_rate >= 1 or self._rng() < self.sample_rate:
+                return True
+            self.sampled_out += 1
+            return False
+        if self.rate_limit <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = self._clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.window_s:
+                if len(self._windows) >= MAX_RATE_KEYS:
+                    self._windows.clear()
+                dropped = int(window[2]) if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if dropped:
+                    record.suppressed = dropped
+                return True
+            if window[1] < self.rate_limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed += 1
+            return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    # Never blocks the caller: records that do not fit in the queue are counted and dropped.
+    def __init__(self, log_queue: queue.Queue[Any]):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener lives in this process, so only the message is rendered here (args may be mutated
+        # later); formatting, tracebacks included, happens on the listener thread.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LoggingSetup:
+    def __init__(self, handler: DroppingQueueHandler, listener: QueueListener, sampler: SamplingFilter):
+        self.handler = handler
+        self.listener = listener
+        self.sampler = sampler
+
+    def stop(self) -> None:
+        # Flushes what is queued; the handler is detached first so late records go to stderr directly.
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        if self.handler.dropped:
+            logging.getLogger(__name__).warning("Dropped %s log records, the log queue was full", self.handler.dropped)
+
+
+def build_formatter(log_format: str) -> logging.Formatter:
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format {log_format!r}, expected one of {', '.join(LOG_FORMATS)}")
+    if log_format == "json":
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def setup_logging(settings: Settings, stream: Any = None) -> LoggingSetup:
+    # Replaces the root handlers with a queue: log calls on the event loop only filter and enqueue,
+    # and a listener thread formats and writes the records.
+    output = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    output.setFormatter(build_formatter(settings.log_format))
+    handler = DroppingQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+    sampler = SamplingFilter(
+        sample_rate=settings.log_update_sample,
+        rate_limit=settings.log_rate_limit,
+        window_s=settings.log_rate_window_s,
+    )
+    handler.addFilter(UpdateContextFilter())
+    handler.addFilter(sampler)
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+        existing.close()
+    # Records rejected by level never reach the handler, so nothing is queued for them.
+    root.setLevel(settings.log_level)
+    root.addHandler(handler)
+    listener = QueueListener(handler.queue, output)
+    listener.start()
+    return LoggingSetup(handler, listener, sampler)
+
+
+class UpdateLogMiddleware(BaseMiddleware):
+    # Outer update middleware: one record per update with user, handler and latency. Updates slower
+    # than `slow_ms` are logged as warnings so sampling never hides them.
+    def __init__(self, slow_ms: float = 1000.0):
+        self.slow_ms = slow_ms
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        context: dict[str, Any] = {"user_id": user.id if user is not None else None, "handler": None}
+        token = _update_context.set(context)
+        started = time.perf_counter()
+        error: Optional[Exception] = None
+        try:
+            return await handler(event, data)
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            _update_context.reset(token)
+            latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            extra = {**context, "update_id": getattr(event, "update_id", None), "latency_ms": latency_ms}
+            if error is not None:
+                # The traceback is logged by aiogram (polling) or asyncio (workers); this adds the context.
+                extra["error"] = f"{type(error).__name__}: {error}"
+                update_logger.error("Update failed", extra=extra)
+            elif latency_ms >= self.slow_ms:
+                update_logger.warning("Slow update", extra=extra)
+            else:
+                update_logger.info("Update handled", extra=extra)
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    # Inner middleware: runs once a handler matched and records its name in the update context.
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        context = _update_context.get()
+        matched = data.get("handler")
+        if context is not None and matched is not None:
+            context["handler"] = getattr(matched.callback, "__name__", None)
+        return await handler(event, data)
+
+
+def install_update_logging(dp: Dispatcher, settings: Settings) -> None:
+    dp.update.outer_middleware(UpdateLogMiddleware(slow_ms=settings.log_slow_update_ms))
+    # Inner middlewares of the dispatcher also wrap handlers of included routers.
+    names = HandlerNameMiddleware()
+    dp.message.middleware(names)
+    dp.callback_query.middleware(names)
@@ -0,0 +1,526 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Optional
+
+from .formatting import user_timezone
+from .repository import EXPORT_CHUNK_SIZE, DuplicateDayError, Entry, SeriesPoint
+from .trend import TrendState, replay_trend
+
+ENTRY_COLUMNS = ("id", "user_id", "recorded_at", "weight_kg", "fat_pct", "fat_weight_kg")
+
+# (measured_at, weight_kg, fat_pct, fat_weight_kg)
+Sample = tuple[str, float, Optional[float], Optional[float]]
+
+
+@dataclass
+class _UserColumns:
+    # Parallel columns kept sorted by recorded_at (ISO strings sort like the SQLite TEXT column).
+    ids: list[int] = field(default_factory=list)
+    recorded_at: list[str] = field(default_factory=list)
+    weight_kg: list[float] = field(default_factory=list)
+    fat_pct: list[Optional[float]] = field(default_factory=list)
+    fat_weight_kg: list[Optional[float]] = field(default_factory=list)
+    trend: list[Optional[TrendState]] = field(default_factory=list)
+    # Intraday samples per entry, oldest first; without explicit samples the entry is its own single one.
+    samples: list[list[Sample]] = field(default_factory=list)
+    # local_day -> recorded_at of that day's entry, the UNIQUE (user_id, local_day) key of the SQLite
+    # backend. local_day is the wall-clock date of recorded_at, i.e. its first ten characters.
+    days: dict[str, str] = field(default_factory=dict)
+    # Bumped on every insert/remove, like EntryRepository.entries_version.
+    version: int = 0
+
+    def insert(
+        self,
+        entry_id: int,
+        recorded_at: str,
+        weight_kg: float,
+        fat_pct: Optional[float],
+        samples: Optional[list[Sample]] = None,
+        refresh: bool = True,
+    ) -> int:
+        fat_weight_kg = weight_kg * fat_pct / 100 if fat_pct is not None else None
+        idx = bisect_right(self.recorded_at, recorded_at)
+        self.ids.insert(idx, entry_id)
+        self.recorded_at.insert(idx, recorded_at)
+        self.weight_kg.insert(idx, weight_kg)
+        self.fat_pct.insert(idx, fat_pct)
+        self.fat_weight_kg.insert(idx, fat_weight_kg)
+        self.trend.insert(idx, None)
+        self.samples.insert(idx, samples or [(recorded_at, weight_kg, fat_pct, fat_weight_kg)])
+        self.days[recorded_at[:10]] = recorded_at
+        self.version += 1
+        if refresh:
+            self.refresh_trend(idx)
+        return idx
+
+    def remove(self, idx: int, refresh: bool = True) -> None:
+        del self.days[self.recorded_at[idx][:10]]
+        for column in (
+            self.ids,
+            self.recorded_at,
+            self.weight_kg,
+            self.fat_pct,
+            self.fat_weight_kg,
+            self.trend,
+            self.samples,
+        ):
+            del column[idx]
+        self.version += 1
+        if refresh:
+            self.refresh_trend(idx)
+
+    def refresh_trend(self, start: int) -> None:
+        # Same contract as the SQLite backend: replay from the entry before `start`.
+        state = self.trend[start - 1] if start > 0 else None
+        rows = (
+            (idx, datetime.fromisoformat(self.recorded_at[idx]), self.weight_kg[idx], self.fat_weight_kg[idx])
+            for idx in range(start, len(self.ids))
+        )
+        for idx, trend in replay_trend(state, rows):
+            self.trend[idx] = trend
+
+    def index_of(self, entry_id: int) -> Optional[int]:
+        try:
+            return self.ids.index(entry_id)
+        except ValueError:
+            return None
+
+    def row(self, idx: int, user_id: int) -> dict[str, Any]:
+        # Export rows keep the stored ISO string like the SQLite backend.
+        return {
+            "id": self.ids[idx],
+            "user_id": user_id,
+            "recorded_at": self.recorded_at[idx],
+            "weight_kg": self.weight_kg[idx],
+            "fat_pct": self.fat_pct[idx],
+            "fat_weight_kg": self.fat_weight_kg[idx],
+        }
+
+    def entry(self, idx: int, user_id: int) -> Entry:
+        return Entry(
+            self.ids[idx],
+            user_id,
+            datetime.fromisoformat(self.recorded_at[idx]),
+            self.weight_kg[idx],
+            self.fat_pct[idx],
+            self.fat_weight_kg[idx],
+        )
+
+    def day_index(self, day: date) -> Optional[int]:
+        recorded_at = self.days.get(day.isoformat())
+        return bisect_left(self.recorded_at, recorded_at) if recorded_at is not None else None
+
+    def day_range(self, start: date, end: date) -> list[int]:
+        # Indexes of entries whose local day is in [start, end], oldest first, like the SQLite local_day
+        # range scans. Short ranges are looked up day by day, long ones scanned.
+        span = (end - start).days + 1
+        if span > len(self.ids):
+            low, high = start.isoformat(), end.isoformat()
+            return [idx for idx, recorded_at in enumerate(self.recorded_at) if low <= recorded_at[:10] <= high]
+        found = (self.day_index(start + timedelta(days=offset)) for offset in range(max(0, span)))
+        return sorted(idx for idx in found if idx is not None)
+
+
+class MemoryRepository:
+    # Process-local backend for tests and benchmarks; data is lost when the process exits.
+    def __init__(self) -> None:
+        self._users: dict[int, dict[str, Any]] = {}
+        self._entries: dict[int, _UserColumns] = {}
+        self._notifications: dict[int, dict[str, Any]] = {}
+        self._next_id = 1
+
+    async def connect(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+    def _columns(self, user_id: int) -> _UserColumns:
+        columns = self._entries.get(user_id)
+        if columns is None:
+            columns = self._entries[user_id] = _UserColumns()
+        return columns
+
+    def _new_user(self, user_id: int) -> dict[str, Any]:
+        user = {
+            "id": user_id,
+            "height_cm": None,
+            "goal_weight_kg": None,
+            "goal_fat_pct": None,
+            "timezone": None,
+            "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self._users[user_id] = user
+        return user
+
+    async def get_user(self, user_id: int) -> Optional[dict[str, Any]]:
+        user = self._users.get(user_id)
+        return dict(user) if user else None
+
+    async def ensure_user(self, user_id: int) -> dict[str, Any]:
+        return dict(self._users.get(user_id) or self._new_user(user_id))
+
+    async def set_user_height(self, user_id: int, height_cm: float) -> None:
+        user = self._users.get(user_id) or self._new_user(user_id)
+        user["height_cm"] = height_cm
+
+    async def set_user_goal(self, user_id: int, weight_kg: float, fat_pct: float) -> None:
+        user = self._users.get(user_id) or self._new_user(user_id)
+        user["goal_weight_kg"] = weight_kg
+        user["goal_fat_pct"] = fat_pct
+
+    async def set_user_timezone(self, user_id: int, tz_name: Optional[str]) -> None:
+        user = self._users.get(user_id) or self._new_user(user_id)
+        user["timezone"] = tz_name
+
+    async def add_entry(
+        self, user_id: int, recorded_at: datetime, weight_kg: float, fat_pct: Optional[float]
+    ) -> int:
+        columns = self._columns(user_id)
+        existing = columns.day_index(recorded_at.date())
+        if existing is not None:
+            raise DuplicateDayError(columns.entry(existing, user_id))
+        entry_id = self._next_id
+        self._next_id += 1
+        columns.insert(entry_id, recorded_at.isoformat(), weight_kg, fat_pct)
+        return entry_id
+
+    async def upsert_entry(
+        self, user_id: int, recorded_at: datetime, weight_kg: float, fat_pct: Optional[float]
+    ) -> int:
+        columns = self._columns(user_id)
+        existing = columns.day_index(recorded_at.date())
+        if existing is None:
+            return await self.add_entry(user_id, recorded_at, weight_kg, fat_pct)
+        entry_id = columns.ids[existing]
+        columns.remove(existing)
+        columns.insert(entry_id, recorded_at.isoformat(), weight_kg, fat_pct)
+        return entry_id
+
+    async def add_measurement(
+        self,
+        user_id: int,
+        recorded_at: datetime,
+        weight_kg: float,
+        fat_pct: Optional[float],
+        measured_at: Optional[datetime] = None,
+    ) -> int:
+        columns = self._columns(user_id)
+        existing = columns.day_index(recorded_at.date())
+        fat_weight_kg = weight_kg * fat_pct / 100 if fat_pct is not None else None
+        sample = ((measured_at or datetime.now(timezone.utc)).isoformat(), weight_kg, fat_pct, fat_weight_kg)
+        if existing is None:
+            entry_id = self._next_id
+            self._next_id += 1
+            columns.insert(entry_id, recorded_at.isoformat(), weight_kg, fat_pct, samples=[sample])
+            return entry_id
+        entry_id = columns.ids[existing]
+        entry_recorded_at = columns.recorded_at[existing]
+        samples = columns.samples[existing]
+        samples.insert(bisect_right([item[0] for item in samples], sample[0]), sample)
+        # The entry mirrors the day's latest sample.
+        _, last_weight, last_fat_pct, _ = samples[-1]
+        columns.remove(existing)
+        columns.insert(entry_id, entry_recorded_at, last_weight, last_fat_pct, samples=samples)
+        return entry_id
+
+    async def import_entries_chunk(
+        self,
+        user_id: int,
+        rows: list[tuple[datetime, float, Optional[float]]],
+        replace: bool = False,
+        refresh_trend: bool = True,
+    ) -> tuple[int, int, int]:
+        if not rows:
+            return 0, 0, 0
+        columns = self._columns(user_id)
+        inserted = replaced = skipped = 0
+        written: list[date] = []
+        for recorded_at, weight_kg, fat_pct in rows:
+            existing = columns.day_index(recorded_at.date())
+            if existing is not None and not replace:
+                skipped += 1
+                continue
+            # Rows are written without replaying the trend; it is replayed once below or in finish_import.
+            if existing is None:
+                entry_id = self._next_id
+                self._next_id += 1
+                inserted += 1
+            else:
+                entry_id = columns.ids[existing]
+                columns.remove(existing, refresh=False)
+                replaced += 1
+            columns.insert(entry_id, recorded_at.isoformat(), weight_kg, fat_pct, refresh=False)
+            written.append(recorded_at.date())
+        if written and refresh_trend:
+            await self.finish_import(user_id, min(written))
+        return inserted, replaced, skipped
+
+    async def finish_import(self, user_id: int, since: date) -> None:
+        columns = self._entries.get(user_id)
+        if columns is None:
+            return
+        columns.refresh_trend(bisect_left(columns.recorded_at, since.isoformat()))
+        columns.version += 1
+
+    async def update_entry(
+        self,
+        entry_id: int,
+        user_id: int,
+        recorded_at: datetime,
+        weight_kg: float,
+        fat_pct: Optional[float],
+        replace: bool = False,
+    ) -> bool:
+        columns = self._entries.get(user_id)
+        idx = columns.index_of(entry_id) if columns else None
+        if columns is None or idx is None:
+            return False
+        conflict = columns.day_index(recorded_at.date())
+        if conflict is not None and conflict != idx:
+            if not replace:
+                raise DuplicateDayError(columns.entry(conflict, user_id))
+            columns.remove(conflict)
+            idx = columns.index_of(entry_id)
+            assert idx is not None
+        columns.remove(idx)
+        columns.insert(entry_id, recorded_at.isoformat(), weight_kg, fat_pct)
+        return True
+
+    async def get_entry_by_date(self, user_id: int, recorded_date: date) -> Optional[Entry]:
+        columns = self._entries.get(user_id)
+        if columns is None:
+            return None
+        idx = columns.day_index(recorded_date)
+        return columns.entry(idx, user_id) if idx is not None else None
+
+    async def delete_entry(self, entry_id: int, user_id: int) -> bool:
+        columns = self._entries.get(user_id)
+        idx = columns.index_of(entry_id) if columns else None
+        if columns is None or idx is None:
+            return False
+        columns.remove(idx)
+        return True
+
+    async def list_recent_entries(self, user_id: int, limit: int = 10) -> list[Entry]:
+        columns = self._entries.get(user_id)
+        if columns is None:
+            return []
+        count = len(columns.ids)
+        return [columns.entry(idx, user_id) for idx in range(count - 1, max(-1, count - 1 - limit), -1)]
+
+    async def get_entry_days(self, user_id: int, month: date) -> frozenset[int]:
+        columns = self._entries.get(user_id)
+        if columns is None:
+            return frozenset()
+        start = month.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return frozenset(int(columns.recorded_at[idx][8:10]) for idx in columns.day_range(start, end))
+
+    async def list_entries_between(self, user_id: int, start: date, end: date) -> list[Entry]:
+        columns = self._entries.get(user_id)
+        if columns is None:
+            return []
+        return [columns.entry(idx, user_id) for idx in reversed(columns.day_range(start, end))]
+
+    async def get_trend(self, user_id: int) -> Optional[TrendState]:
+        columns = self._entries.get(user_id)
+        return columns.trend[-1] if columns and columns.trend else None
+
+    async def get_trend_series(self, user_id: int, since: Optional[datetime] = None) -> list[TrendState]:
+        columns = self._entries.get(user_id)
+        if columns is None:
+            return []
+        start = bisect_left(columns.recorded_at, since.isoformat()) if since is not None else 0
+        return [trend for trend in columns.trend[start:] if trend is not None]
+
+    async def entries_version(self, user_id: int) -> int:
+        columns = self._entries.get(user_id)
+        return columns.version if columns else 0
+
+    async def get_fat_weight_series(self, user_id: int, since: Optional[date] = None) -> list[SeriesPoint]:
+        columns = self._entries.get(user_id)
+        if columns is None:
+            return []
+        start = bisect_left(columns.recorded_at, since.isoformat()) if since is not None else 0
+        series = []
+        for recorded_at, samples in zip(columns.recorded_at[start:], columns.samples[start:]):
+            fat_weights = [sample[3] for sample in samples if sample[3] is not None]
+            if fat_weights:
+                series.append(
+                    SeriesPoint(
+                        datetime.fromisoformat(f"{recorded_at[:10]}T00:00:00+00:00"),
+                        sum(sample[1] for sample in samples) / len(samples),
+                        sum(fat_weights) / len(fat_weights),
+                    )
+                )
+        return series
+
+    async def get_daily_series(self, user_id: int, since: Optional[date] = None) -> list[SeriesPoint]:
+        columns = self._entries.get(user_id)
+        if columns is None:
+            return []
+        start = bisect_left(columns.recorded_at, since.isoformat()) if since is not None else 0
+        series = []
+        for recorded_at, samples in zip(columns.recorded_at[start:], columns.samples[start:]):
+            fat_weights = [sample[3] for sample in samples if sample[3] is not None]
+            series.append(
+                SeriesPoint(
+                    datetime.fromisoformat(f"{recorded_at[:10]}T00:00:00+00:00"),
+                    sum(sample[1] for sample in samples) / len(samples),
+                    sum(fat_weights) / len(fat_weights) if fat_weights else None,
+                )
+            )
+        return series
+
+    async def get_latest_fat_weight(self, user_id: int) -> Optional[float]:
+        columns = self._entries.get(user_id)
+        if columns is None:
+            return None
+        return next((value for value in reversed(columns.fat_weight_kg) if value is not None), None)
+
+    async def get_latest_weight(self, user_id: int) -> Optional[float]:
+        columns = self._entries.get(user_id)
+        if columns is None or not columns.weight_kg:
+            return None
+        return columns.weight_kg[-1]
+
+    async def iter_users(
+        self, user_id: Optional[int] = None, chunk_size: int = EXPORT_CHUNK_SIZE
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        user_ids = sorted(self._users) if user_id is None else [user_id] if user_id in self._users else []
+        for start in range(0, len(user_ids), chunk_size):
+            yield [dict(self._users[uid]) for uid in user_ids[start : start + chunk_size]]
+
+    async def iter_entries(
+        self,
+        user_id: Optional[int] = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+        include_profile: bool = False,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        user_ids = sorted(self._entries) if user_id is None else [user_id] if user_id in self._entries else []
+        chunk: list[dict[str, Any]] = []
+        for uid in user_ids:
+            columns = self._entries[uid]
+            profile = self._users.get(uid, {})
+            for idx in range(len(columns.ids)):
+                row = columns.row(idx, uid)
+                if include_profile:
+                    row.update(
+                        height_cm=profile.get("height_cm"),
+                        goal_weight_kg=profile.get("goal_weight_kg"),
+                        goal_fat_pct=profile.get("goal_fat_pct"),
+                    )
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    def _notification(self, user_id: int) -> dict[str, Any]:
+        settings = self._notifications.get(user_id)
+        if settings is None:
+            settings = self._notifications[user_id] = {
+                "user_id": user_id,
+                "reminder_hour": None,
+                "weekly_report": 0,
+                "last_reminder_on": None,
+                "last_report_on": None,
+            }
+        return settings
+
+    async def get_notification_settings(self, user_id: int) -> Optional[dict[str, Any]]:
+        settings = self._notifications.get(user_id)
+        return dict(settings) if settings else None
+
+    async def set_reminder_hour(self, user_id: int, hour: Optional[int]) -> None:
+        self._notification(user_id)["reminder_hour"] = hour
+
+    async def set_weekly_report(self, user_id: int, enabled: bool) -> None:
+        self._notification(user_id)["weekly_report"] = int(enabled)
+
+    async def disable_notifications(self, user_id: int) -> None:
+        if user_id in self._notifications:
+            self._notifications[user_id].update(reminder_hour=None, weekly_report=0)
+
+    async def due_reminders(self, now: datetime, limit: int = 500) -> list[tuple[int, date]]:
+        due: list[tuple[int, date]] = []
+        for user_id in sorted(self._notifications):
+            settings = self._notifications[user_id]
+            hour = settings["reminder_hour"]
+            if hour is None:
+                continue
+            local = now.astimezone(user_timezone(self._users.get(user_id)))
+            today = local.date()
+            last = settings["last_reminder_on"]
+            if hour > local.hour or (last is not None and last >= today.isoformat()):
+                continue
+            columns = self._entries.get(user_id)
+            if columns is not None and columns.day_index(today) is not None:
+                continue
+            due.append((user_id, today))
+            if len(due) >= limit:
+                break
+        return due
+
+    async def mark_reminded(self, user_ids: list[int], day: date) -> None:
+        for user_id in user_ids:
+            if user_id in self._notifications:
+                self._notifications[user_id]["last_reminder_on"] = day.isoformat()
+
+    async def iter_weekly_report_rows(
+        self, since: date, until: date, chunk_size: int = EXPORT_CHUNK_SIZE
+    ) -> AsyncIterator[list[Entry]]:
+        chunk: list[Entry] = []
+        for user_id in sorted(self._notifications):
+            settings = self._notifications[user_id]
+            last = settings["last_report_on"]
+            columns = self._entries.get(user_id)
+            if not settings["weekly_report"] or (last is not None and last >= until.isoformat()) or columns is None:
+                continue
+            for idx in columns.day_range(since, until - timedelta(days=1)):
+                chunk.append(columns.entry(idx, user_id))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    async def mark_reported(self, user_ids: list[int], day: date) -> None:
+        for user_id in user_ids:
+            if user_id in self._notifications:
+                self._notifications[user_id]["last_report_on"] = day.isoformat()
+
+    async def active_users(self, since: datetime, limit: int = 500, shards: int = 1, shard: int = 0) -> list[int]:
+        latest = [
+            (columns.recorded_at[-1], user_id)
+            for user_id, columns in self._entries.items()
+            if columns.recorded_at and columns.recorded_at[-1] >= since.isoformat() and user_id % shards == shard
+        ]
+        return [user_id for _, user_id in sorted(latest, reverse=True)[:limit]]
+
+    async def usage_stats(self, since: date) -> dict[str, Any]:
+        start = datetime.combine(since, datetime.min.time(), tzinfo=timezone.utc).isoformat()
+        per_day: dict[str, set[int]] = {}
+        entries_per_day: dict[str, int] = {}
+        history_counts: dict[int, int] = {}
+        for user_id, columns in self._entries.items():
+            if columns.ids:
+                history_counts[len(columns.ids)] = history_counts.get(len(columns.ids), 0) + 1
+            for recorded_at in columns.recorded_at[bisect_left(columns.recorded_at, start) :]:
+                day = recorded_at[:10]
+                per_day.setdefault(day, set()).add(user_id)
+                entries_per_day[day] = entries_per_day.get(day, 0) + 1
+        return {
+            "days": [
+                {"day": day, "users": len(per_day[day]), "entries": entries_per_day[day]} for day in sorted(per_day)
+            ],
+            "history_counts": history_counts,
+            "total_users": len(self._users),
+            "total_entries": sum(n * users for n, users in history_counts.items()),
+            "db_size_bytes": None,
+        }
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, NamedTuple, Optional, Protocol, runtime_checkable
+
+from .trend import TrendState
+
+STORAGE_BACKENDS = ("sqlite", "memory")
+EXPORT_CHUNK_SIZE = 500
+
+
+class Entry(NamedTuple):
+    # One `entries` row, parsed once where it is read. Tuples carry no per-row __dict__ or key strings,
+    # so long histories and the edit lists kept in FSM state stay small.
+    id: int
+    user_id: int
+    recorded_at: datetime
+    weight_kg: float
+    fat_pct: Optional[float]
+    fat_weight_kg: Optional[float]
+
+    @classmethod
+    def create(
+        cls, entry_id: int, user_id: int, recorded_at: datetime, weight_kg: float, fat_pct: Optional[float]
+    ) -> Entry:
+        # With the derived fat weight the repositories store.
+        fat_weight_kg = weight_kg * fat_pct / 100 if fat_pct is not None else None
+        return cls(entry_id, user_id, recorded_at, weight_kg, fat_pct, fat_weight_kg)
+
+    @property
+    def day(self) -> date:
+        return self.recorded_at.date()
+
+
+class SeriesPoint(NamedTuple):
+    # One day of chart data: the day's mean weight and fat weight (None on days without fat %).
+    recorded_at: datetime
+    weight_kg: float
+    fat_weight_kg: Optional[float]
+
+
+class DuplicateDayError(ValueError):
+    # Raised when a write would give a user two entries for one day; carries the entry already there.
+    def __init__(self, existing: Optional[Entry]):
+        day = existing.day.isoformat() if existing is not None else "that day"
+        super().__init__(f"An entry already exists for {day}")
+        self.existing = existing
+
+
+@runtime_checkable
+class Repository(Protocol):
+    # Everything handlers, importer and exporter need from storage. Entries come back as Entry records,
+    # chart data as SeriesPoint; profile, settings and export rows are plain dicts keyed like the SQLite columns.
+
+    async def connect(self) -> Any: ...
+
+    async def close(self) -> None: ...
+
+    async def get_user(self, user_id: int) -> Optional[dict[str, Any]]: ...
+
+    async def ensure_user(self, user_id: int) -> dict[str, Any]: ...
+
+    async def set_user_height(self, user_id: int, height_cm: float) -> None: ...
+
+    async def set_user_goal(self, user_id: int, weight_kg: float, fat_pct: float) -> None: ...
+
+    async def set_user_timezone(self, user_id: int, tz_name: Optional[str]) -> None: ...
+
+    async def add_entry(
+        self, user_id: int, recorded_at: datetime, weight_kg: float, fat_pct: Optional[float]
+    ) -> int: ...
+
+    async def upsert_entry(
+        self, user_id: int, recorded_at: datetime, weight_kg: float, fat_pct: Optional[float]
+    ) -> int: ...
+
+    async def add_measurement(
+        self,
+        user_id: int,
+        recorded_at: datetime,
+        weight_kg: float,
+        fat_pct: Optional[float],
+        measured_at: Optional[datetime] = None,
+    ) -> int: ...
+
+    async def import_entries_chunk(
+        self,
+        user_id: int,
+        rows: list[tuple[datetime, float, Optional[float]]],
+        replace: bool = False,
+        refresh_trend: bool = True,
+    ) -> tuple[int, int, int]: ...
+
+    async def finish_import(self, user_id: int, since: date) -> None: ...
+
+    async def update_entry(
+        self,
+        entry_id: int,
+        user_id: int,
+        recorded_at: datetime,
+        weight_kg: float,
+        fat_pct: Optional[float],
+        replace: bool = False,
+    ) -> bool: ...
+
+    async def get_entry_by_date(self, user_id: int, recorded_date: date) -> Optional[Entry]: ...
+
+    async def delete_entry(self, entry_id: int, user_id: int) -> bool: ...
+
+    async def list_recent_entries(self, user_id: int, limit: int = 10) -> list[Entry]: ...
+
+    async def get_entry_days(self, user_id: int, month: date) -> frozenset[int]: ...
+
+    async def list_entries_between(self, user_id: int, start: date, end: date) -> list[Entry]: ...
+
+    async def entries_version(self, user_id: int) -> int: ...
+
+    async def get_fat_weight_series(self, user_id: int, since: Optional[date] = None) -> list[SeriesPoint]: ...
+
+    async def get_daily_series(self, user_id: int, since: Optional[date] = None) -> list[SeriesPoint]: ...
+
+    async def get_latest_fat_weight(self, user_id: int) -> Optional[float]: ...
+
+    async def get_latest_weight(self, user_id: int) -> Optional[float]: ...
+
+    def iter_users(self, user_id: Optional[int] = None, chunk_size: int = ...) -> AsyncIterator[list[dict[str, Any]]]: ...
+
+    def iter_entries(
+        self,
+        user_id: Optional[int] = None,
+        chunk_size: int = ...,
+        include_profile: bool = False,
+    ) -> AsyncIterator[list[dict[str, Any]]]: ...
+
+    async def get_notification_settings(self, user_id: int) -> Optional[dict[str, Any]]: ...
+
+    async def set_reminder_hour(self, user_id: int, hour: Optional[int]) -> None: ...
+
+    async def set_weekly_report(self, user_id: int, enabled: bool) -> None: ...
+
+    async def disable_notifications(self, user_id: int) -> None: ...
+
+    async def due_reminders(self, now: datetime, limit: int = 500) -> list[tuple[int, date]]: ...
+
+    async def mark_reminded(self, user_ids: list[int], day: date) -> None: ...
+
+    def iter_weekly_report_rows(
+        self, since: date, until: date, chunk_size: int = ...
+    ) -> AsyncIterator[list[Entry]]: ...
+
+    async def mark_reported(self, user_ids: list[int], day: date) -> None: ...
+
+    async def active_users(self, since: datetime, limit: int = 500, shards: int = 1, shard: int = 0) -> list[int]: ...
+
+    async def usage_stats(self, since: date) -> dict[str, Any]: ...
+
+    async def get_trend(self, user_id: int) -> Optional[TrendState]: ...
+
+    async def get_trend_series(self, user_id: int, since: Optional[datetime] = None) -> list[TrendState]: ...
+
+
+def create_repository(backend: str, db_path: Path, **options: Any) -> Repository:
+    # options are backend specific (e.g. profile cache sizing for sqlite)
+    if backend == "sqlite":
+        from .db import EntryRepository
+
+        return EntryRepository(db_path, **options)
+    if backend == "memory":
+        from .memory import MemoryRepository
+
+        return MemoryRepository()
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.types import BufferedInputFile
+
+from .formatting import format_weekly_report, now_utc
+from .repository import Entry, Repository
+from .stats import build_weekly_chart, parse_series
+from .throttling import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_INTERVAL = 60.0
+NOTIFY_BATCH_SIZE = 100
+# Stays below the Bot API's ~30 msg/s so interactive replies keep some of the budget.
+NOTIFY_SEND_RATE = 20.0
+RENDER_CONCURRENCY = 4
+REPORT_WEEKDAY = 0  # Monday
+REPORT_HOUR = 9
+REPORT_DAYS = 7
+
+REMINDER_TEXT = "Reminder: you have not logged today's weight yet. Tap Add entry when you're ready."
+
+
+@dataclass
+class NotificationMetrics:
+    reminders_sent: int = 0
+    reports_sent: int = 0
+    failures: int = 0
+    unsubscribed: int = 0
+
+
+class NotificationScheduler:
+    def __init__(
+        self,
+        bot: Bot,
+        repo: Repository,
+        interval_s: float = SCHEDULER_INTERVAL,
+        batch_size: int = NOTIFY_BATCH_SIZE,
+        send_rate: float = NOTIFY_SEND_RATE,
+        report_hour: int = REPORT_HOUR,
+        clock: Callable[[], datetime] = now_utc,
+    ):
+        self.bot = bot
+        self.repo = repo
+        self.interval_s = interval_s
+        self.batch_size = batch_size
+        self.report_hour = report_hour
+        self.clock = clock
+        self.metrics = NotificationMetrics()
+        self._bucket = TokenBucket(send_rate)
+        self._render_slots = asyncio.Semaphore(RENDER_CONCURRENCY)
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def _deliver(self, user_id: int, send: Callable[[], Awaitable[Any]]) -> bool:
+        wait = self._bucket.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            await send()
+        except TelegramForbiddenError:
+            # The user blocked the bot; stop scheduling messages for them.
+            self.metrics.unsubscribed += 1
+            await self.repo.disable_notifications(user_id)
+            return False
+        except Exception as exc:  # noqa: BLE001 - one bad chat must not stop the batch
+            self.metrics.failures += 1
+            logger.warning("Notification to %s failed - %s: %s", user_id, type(exc).__name__, exc)
+            return False
+        return True
+
+    async def send_reminders(self, now: datetime) -> int:
+        sent = 0
+        while True:
+            due = await self.repo.due_reminders(now, limit=self.batch_size)
+            if not due:
+                return sent
+            batch_sent = 0
+            by_day: dict[date, list[int]] = {}
+            for user_id, day in due:
+                if await self._deliver(user_id, lambda: self.bot.send_message(user_id, REMINDER_TEXT)):
+                    batch_sent += 1
+                by_day.setdefault(day, []).append(user_id)
+            # Marked per batch, with each user's local day, so a restart resumes after the last delivered batch.
+            for day, user_ids in by_day.items():
+                await self.repo.mark_reminded(user_ids, day)
+            self.metrics.reminders_sent += batch_sent
+            sent += batch_sent
+
+    def reports_due(self, now: datetime) -> bool:
+        return now.weekday() == REPORT_WEEKDAY and now.hour >= self.report_hour
+
+    async def _render(self, entries: list[Entry]) -> Optional[bytes]:
+        series = parse_series(entries)
+        if len(series) < 2:
+            return None
+        async with self._render_slots:
+            buffer = await asyncio.to_thread(build_weekly_chart, series)
+        return buffer.getvalue()
+
+    async def _send_report_batch(self, since: date, until: date, batch: dict[int, list[Entry]]) -> int:
+        # Charts render concurrently off the event loop; delivery is then paced one message at a time.
+        charts = await asyncio.gather(*(self._render(entries) for entries in batch.values()))
+        sent = 0
+        for (user_id, entries), chart in zip(batch.items(), charts):
+            text = format_weekly_report(since, until - timedelta(days=1), entries)
+            if chart is None:
+                send = lambda user_id=user_id, text=text: self.bot.send_message(user_id, text)
+            else:
+                photo = BufferedInputFile(chart, filename="weekly.png")
+                send = lambda user_id=user_id, text=text, photo=photo: self.bot.send_photo(user_id, photo, caption=text)
+            if await self._deliver(user_id, send):
+                sent += 1
+        await self.repo.mark_reported(list(batch), until)
+        self.metrics.reports_sent += sent
+        return sent
+
+    async def send_weekly_reports(self, now: datetime) -> int:
+        until = now.date()
+        since = until - timedelta(days=REPORT_DAYS)
+        sent = 0
+        batch: dict[int, list[Entry]] = {}
+        # Rows arrive ordered by user, so a batch is flushed only once the next user's rows begin.
+        async for rows in self.repo.iter_weekly_report_rows(since, until):
+            for row in rows:
+                user_id = row.user_id
+                if user_id not in batch and len(batch) >= self.batch_size:
+                    sent += await self._send_report_batch(since, until, batch)
+                    batch = {}
+                batch.setdefault(user_id, []).append(row)
+        if batch:
+            sent += await self._send_report_batch(since, until, batch)
+        return sent
+
+    async def run_once(self, now: Optional[datetime] = None) -> None:
+        now = now or self.clock()
+        await self.send_reminders(now)
+        if self.reports_due(now):
+            await self.send_weekly_reports(now)
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                self.metrics.failures += 1
+                logger.exception("Notification run failed")
+            await asyncio.sleep(self.interval_s)
+
+    def start(self) -> asyncio.Task[None]:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever(), name="notifications")
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Optional
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods.base import TelegramType
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.methods import TelegramMethod
+
+    from .config import Settings
+
+UPLOAD_METHODS = ("sendPhoto", "sendDocument", "sendMediaGroup", "editMessageMedia")
+
+
+class TunedAiohttpSession(AiohttpSession):
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 15.0,
+        dns_cache_ttl: Optional[int] = 3600,
+        timeout: float = 60.0,
+        method_timeouts: Optional[dict[str, float]] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(limit=limit, timeout=timeout, **kwargs)
+        self._connector_init.update(
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=dns_cache_ttl,
+            use_dns_cache=dns_cache_ttl is not None and dns_cache_ttl > 0,
+        )
+        self.method_timeouts = dict(method_timeouts or {})
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: Optional[int] = None,
+    ) -> TelegramType:
+        # An explicit request_timeout (e.g. long polling's getUpdates) always wins.
+        if timeout is None:
+            timeout = self.method_timeouts.get(method.__api_method__)  # type: ignore[assignment]
+        return await super().make_request(bot, method, timeout=timeout)
+
+
+def build_session(settings: Settings, **kwargs: Any) -> TunedAiohttpSession:
+    method_timeouts = {name: settings.http_upload_timeout_s for name in UPLOAD_METHODS}
+    method_timeouts.update(settings.http_method_timeouts)
+    return TunedAiohttpSession(
+        limit=settings.http_pool_size,
+        limit_per_host=settings.http_pool_per_host,
+        keepalive_timeout=settings.http_keepalive_s,
+        dns_cache_ttl=settings.http_dns_cache_s,
+        timeout=settings.http_timeout_s,
+        method_timeouts=method_timeouts,
+        **kwargs,
+    )
@@ -10,6 +10,7 @@ class AddEntryState(StatesGroup):
 
 class EditEntryState(StatesGroup):
     choosing_entry = State()
+    jumping = State()
     weight = State()
     fat_pct = State()
     date = State()
@@ -23,3 +24,7 @@ class SetHeightState(StatesGroup):
 class GoalState(StatesGroup):
     weight = State()
     fat_pct = State()
+
+
+class ImportState(StatesGroup):
+    waiting_file = State()
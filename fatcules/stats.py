@@ -1,24 +1,34 @@
 from __future__ import annotations
 
 import io
+from dataclasses import dataclass
 from datetime import date, datetime, timedelta, timezone
 import math
-from typing import Iterable, Sequence
+from statistics import NormalDist
+from typing import TYPE_CHECKING, Iterable, Sequence
 
 import matplotlib
+import numpy as np
 
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt  # noqa: E402
+from matplotlib.axes import Axes  # noqa: E402
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
 from matplotlib.patches import Wedge
+from PIL import Image
 
+from .gauges import draw_gauge
+from .repository import Entry, SeriesPoint
+from .trend import TrendState
 
-def parse_series(raw_entries: Iterable[dict]) -> list[tuple[datetime, float]]:
-    series: list[tuple[datetime, float]] = []
-    for item in raw_entries:
-        recorded_at = datetime.fromisoformat(item["recorded_at"])
-        fat_weight = float(item["fat_weight_kg"])
-        series.append((recorded_at, fat_weight))
-    return series
+if TYPE_CHECKING:
+    # Annotation only: importing pyplot at runtime would set up its global figure state in every process.
+    import matplotlib.pyplot as plt
+
+
+def parse_series(points: Iterable[SeriesPoint | Entry]) -> list[tuple[datetime, float]]:
+    # Dates arrive pre-parsed; this only picks the fat weight out of rows that have one.
+    return [(point.recorded_at, point.fat_weight_kg) for point in points if point.fat_weight_kg is not None]
 
 
 def average_daily_drop(series: Sequence[tuple[datetime, float]], days: int) -> float | None:
@@ -75,23 +85,34 @@ def weighted_average_daily_fat_loss(
     return sum(weighted_values) / sum(raw_weights)  
 
 
+def weekly_deltas(series: Sequence[tuple[datetime, float]], weeks: int = 4) -> list[tuple[date, float]]:
+    # Change between the last readings of consecutive ISO weeks, oldest first.
+    week_last: dict[date, tuple[datetime, float]] = {}
+    for dt, value in series:
+        week_start = dt.date() - timedelta(days=dt.weekday())
+        current = week_last.get(week_start)
+        if current is None or dt >= current[0]:
+            week_last[week_start] = (dt, value)
+    ordered = sorted(week_last.items())
+    deltas = [
+        (week_start, value - ordered[idx - 1][1][1])
+        for idx, (week_start, (_, value)) in enumerate(ordered)
+        if idx > 0
+    ]
+    return deltas[-weeks:] if weeks > 0 else []
+
+
 def build_plot(series: Sequence[tuple[datetime, float]], summary: str) -> io.BytesIO:
     # Deprecated in favor of dashboard gauges; kept for compatibility.
     return build_dashboard({}, series)
 
 
-def compute_fat_loss_rate(raw_entries: Sequence[dict], target_days: int) -> float | None:
-    if len(raw_entries) < 2:
+def compute_fat_loss_rate(points: Sequence[SeriesPoint | Entry], target_days: int) -> float | None:
+    if len(points) < 2:
         return None
-    parsed: list[tuple[datetime, float, float]] = []
-    for item in raw_entries:
-        if item.get("fat_weight_kg") is None or item.get("weight_kg") is None:
-            continue
-        try:
-            recorded_at = datetime.fromisoformat(item["recorded_at"])
-        except Exception:
-            continue
-        parsed.append((recorded_at, float(item["fat_weight_kg"]), float(item["weight_kg"])))
+    parsed = [
+        (point.recorded_at, point.fat_weight_kg, point.weight_kg) for point in points if point.fat_weight_kg is not None
+    ]
     if len(parsed) < 2:
         return None
     parsed.sort(key=lambda x: x[0])
@@ -122,9 +143,12 @@ def project_goal_date(
     *,
     window_days: int = 30,
     now: datetime | None = None,
+    trend: TrendState | None = None,
 ) -> tuple[date | None, str | None]:
     if goal_fat_weight is None:
         return None, "goal not set"
+    if trend is not None and trend.fat is not None and trend.fat_recorded_at is not None:
+        return _project_from_trend(trend, goal_fat_weight, window_days, now or datetime.now(timezone.utc))
     if not series:
         return None, "not enough recent fat % data to project"
     now_dt = now or datetime.now(timezone.utc)
@@ -148,6 +172,139 @@ def project_goal_date(
     expected = now_dt + timedelta(days=days_needed)
     return expected.date(), None
 
+
+def _project_from_trend(
+    trend: TrendState, goal_fat_weight: float, window_days: int, now_dt: datetime
+) -> tuple[date | None, str | None]:
+    # The filtered level and slope replace the raw latest reading and interval slopes.
+    fat = trend.fat
+    assert fat is not None and trend.fat_recorded_at is not None
+    if fat.count < 2 or trend.fat_recorded_at < now_dt - timedelta(days=window_days):
+        return None, "not enough recent fat % data to project"
+    daily_loss = -fat.slope
+    if daily_loss <= 0:
+        return None, "fat trend is rising or flat"
+    remaining = fat.level - goal_fat_weight
+    if remaining <= 0:
+        return now_dt.date(), None
+    expected = trend.fat_recorded_at + timedelta(days=remaining / daily_loss)
+    return max(expected.date(), now_dt.date()), None
+
+
+REGRESSION_METHODS = ("theil_sen", "least_squares")
+PROJECTION_WINDOW_DAYS = 60
+PROJECTION_CONFIDENCE = 0.8
+# Theil-Sen looks at every pair of points; longer windows are thinned to this many points first.
+THEIL_SEN_MAX_POINTS = 400
+PROJECTION_MAX_DAYS = 365
+DASHBOARD_DPI = 150
+# "pillow" composites gauges drawn by fatcules.gauges instead of matplotlib wedges.
+GAUGE_STYLES = ("matplotlib", "pillow")
+
+
+@dataclass(frozen=True)
+class GoalProjection:
+    expected: date | None = None
+    optimistic: date | None = None
+    pessimistic: date | None = None
+    level: float | None = None
+    slope: float | None = None  # kg/day, negative while losing fat
+    slope_low: float | None = None
+    slope_high: float | None = None
+    reason: str | None = None
+
+
+def _theil_sen(x: np.ndarray, y: np.ndarray, z: float) -> tuple[float, float, float, float]:
+    if len(x) > THEIL_SEN_MAX_POINTS:
+        keep = np.linspace(0, len(x) - 1, THEIL_SEN_MAX_POINTS).round().astype(int)
+        x, y = x[keep], y[keep]
+    i, j = np.triu_indices(len(x), k=1)
+    dx = x[j] - x[i]
+    valid = dx != 0
+    slopes = np.sort((y[j] - y[i])[valid] / dx[valid])
+    if slopes.size == 0:
+        raise ValueError("all readings share one timestamp")
+    slope = float(np.median(slopes))
+    intercept = float(np.median(y - slope * x))
+    # Sen's rank-based interval: order statistics around the median pairwise slope.
+    n = len(x)
+    spread = z * math.sqrt(n * (n - 1) * (2 * n + 5) / 18)
+    low = int(max(0, math.floor((slopes.size - spread) / 2)))
+    high = int(min(slopes.size - 1, math.ceil((slopes.size + spread) / 2)))
+    return slope, intercept, float(slopes[low]), float(slopes[high])
+
+
+def _least_squares(x: np.ndarray, y: np.ndarray, z: float) -> tuple[float, float, float, float]:
+    x_mean = x.mean()
+    sxx = float(((x - x_mean) ** 2).sum())
+    if sxx == 0:
+        raise ValueError("all readings share one timestamp")
+    slope = float(((x - x_mean) * (y - y.mean())).sum() / sxx)
+    intercept = float(y.mean() - slope * x_mean)
+    residuals = y - (intercept + slope * x)
+    dof = max(1, len(x) - 2)
+    stderr = math.sqrt(float((residuals**2).sum()) / dof / sxx)
+    return slope, intercept, slope - z * stderr, slope + z * stderr
+
+
+def _days_to_goal(level: float, goal: float, slope: float, now_dt: datetime) -> date | None:
+    if slope >= 0:
+        return None
+    return (now_dt + timedelta(days=(level - goal) / -slope)).date()
+
+
+def project_goal_range(
+    series: Sequence[tuple[datetime, float]],
+    goal_fat_weight: float | None,
+    *,
+    window_days: int = PROJECTION_WINDOW_DAYS,
+    method: str = "theil_sen",
+    confidence: float = PROJECTION_CONFIDENCE,
+    now: datetime | None = None,
+) -> GoalProjection:
+    if method not in REGRESSION_METHODS:
+        raise ValueError(f"Unknown regression method: {method}")
+    if goal_fat_weight is None:
+        return GoalProjection(reason="goal not set")
+    now_dt = now or datetime.now(timezone.utc)
+    cutoff = now_dt - timedelta(days=window_days)
+    recent = sorted((dt, value) for dt, value in series if dt >= cutoff)
+    if len(recent) < 3:
+        return GoalProjection(reason="not enough recent fat % data to project")
+    # Days relative to now, so the intercept is today's fitted level.
+    x = np.fromiter(((dt - now_dt).total_seconds() / 86400 for dt, _ in recent), dtype=float, count=len(recent))
+    y = np.fromiter((value for _, value in recent), dtype=float, count=len(recent))
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    fit = _theil_sen if method == "theil_sen" else _least_squares
+    try:
+        slope, level, slope_low, slope_high = fit(x, y, z)
+    except ValueError:
+        return GoalProjection(reason="not enough recent fat % data to project")
+    if level <= goal_fat_weight:
+        today = now_dt.date()
+        return GoalProjection(today, today, today, level, slope, slope_low, slope_high)
+    if slope >= 0:
+        return GoalProjection(level=level, slope=slope, slope_low=slope_low, slope_high=slope_high, reason="fat trend is rising or flat")
+    return GoalProjection(
+        expected=_days_to_goal(level, goal_fat_weight, slope, now_dt),
+        optimistic=_days_to_goal(level, goal_fat_weight, slope_low, now_dt),
+        # None when the slow end of the range does not reach the goal at all.
+        pessimistic=_days_to_goal(level, goal_fat_weight, slope_high, now_dt),
+        level=level,
+        slope=slope,
+        slope_low=slope_low,
+        slope_high=slope_high,
+    )
+
+
+def trend_overlay(trends: Sequence[TrendState]) -> list[tuple[datetime, float]]:
+    # Smoothed fat weight at each entry that had a fat reading.
+    return [
+        (trend.recorded_at, trend.fat.level)
+        for trend in trends
+        if trend.fat is not None and trend.fat_recorded_at == trend.recorded_at
+    ]
+
 # Do not change this method
 def _draw_gauge(ax: plt.Axes, label: str, rate: float | None) -> None:
     ax.set_aspect("equal")
@@ -196,19 +353,58 @@ def _draw_gauge(ax: plt.Axes, label: str, rate: float | None) -> None:
     ax.text(0.5, 0.1, "{:.2f}".format(rate * 100) + "%", ha="center", va="center", fontsize=16, fontweight="bold", color="#333")
 
 
+def _draw_projection_band(ax: Axes, projection: GoalProjection, goal_fat_weight: float, start: datetime) -> None:
+    if projection.level is None or projection.slope_low is None or projection.slope_high is None:
+        return
+    if projection.expected is None or projection.level <= goal_fat_weight:
+        return
+    end_date = projection.pessimistic or projection.expected + (projection.expected - start.date())
+    horizon = min(max((end_date - start.date()).days, 1), PROJECTION_MAX_DAYS)
+    days = np.linspace(0, horizon, 50)
+    times = [start + timedelta(days=float(day)) for day in days]
+    fast = np.maximum(projection.level + projection.slope_low * days, goal_fat_weight)
+    slow = np.maximum(projection.level + projection.slope_high * days, goal_fat_weight)
+    ax.fill_between(times, fast, slow, color="#2ca02c", alpha=0.18, linewidth=0, label="Projected range")
+    ax.plot(times, np.maximum(projection.level + projection.slope * days, goal_fat_weight), linestyle=":", color="#2ca02c")
+    ax.set_xlim(right=times[-1])
+
+
+def _reserve_gauge(ax: Axes, label: str) -> None:
+    # Lays the axes out exactly like _draw_gauge (title, aspect and autoscaled limits) but leaves the
+    # wedges and value to the Pillow renderer.
+    ax.set_aspect("equal")
+    ax.axis("off")
+    ax.set_title(label, fontsize=16, pad=10, color="#333")
+    red_end_angle = 310 + 280 * 0.25
+    ax.add_patch(Wedge((0.5, 0.5), 0.5, red_end_angle, 590, width=0.18, visible=False))
+    ax.add_patch(Wedge((0.5, 0.5), 0.5, 310, red_end_angle, width=0.18, visible=False))
+
+
 def build_dashboard(
     fat_loss_rates: dict[int, float | None],
     series: Sequence[tuple[datetime, float]] | None = None,
     goal_fat_weight: float | None = None,
+    trend: Sequence[tuple[datetime, float]] | None = None,
+    projection: GoalProjection | None = None,
+    gauge_style: str = "matplotlib",
 ) -> io.BytesIO:
-    fig = plt.figure(figsize=(8, 11))
+    if gauge_style not in GAUGE_STYLES:
+        raise ValueError(f"Unknown gauge style: {gauge_style}")
+    fast_gauges = gauge_style == "pillow"
+    # Bare Figure rather than pyplot: background prerenders and user requests may render in parallel threads.
+    # The Pillow path draws the canvas at output resolution so gauges can be composited in pixel space.
+    fig = Figure(figsize=(8, 11), dpi=DASHBOARD_DPI if fast_gauges else None)
+    canvas = FigureCanvasAgg(fig)
     fig.patch.set_facecolor("white")
     gs = fig.add_gridspec(2, 2, height_ratios=[1.2, 1], hspace=0.55)
 
     gauges = [fig.add_subplot(gs[0, 0]), fig.add_subplot(gs[0, 1])]
     labels = [("7-day fat loss rate", fat_loss_rates.get(7)), ("30-day fat loss rate", fat_loss_rates.get(30))]
     for ax, (label, rate) in zip(gauges, labels):
-        _draw_gauge(ax, label, rate)
+        if fast_gauges:
+            _reserve_gauge(ax, label)
+        else:
+            _draw_gauge(ax, label, rate)
 
     line_ax = fig.add_subplot(gs[1, :])
     if series:
@@ -216,8 +412,15 @@ def build_dashboard(
         values = [val for _, val in series]
         line_ax.plot(dates, values, marker="o", linewidth=2, color="#1f77b4")
         line_ax.set_xlim(min(dates), max(dates))
+        if projection is not None and goal_fat_weight is not None:
+            _draw_projection_band(line_ax, projection, goal_fat_weight, max(dates))
+        if trend:
+            line_ax.plot(
+                [dt for dt, _ in trend], [val for _, val in trend], linewidth=2.5, color="#ff7f0e", alpha=0.8, label="Trend"
+            )
         if goal_fat_weight is not None:
             line_ax.axhline(goal_fat_weight, linestyle="--", color="#8a8a8a", linewidth=1.5, label="Goal fat weight")
+        if trend or goal_fat_weight is not None or projection is not None:
             line_ax.legend(loc="upper right")
         line_ax.grid(True, linestyle="--", alpha=0.4)
         line_ax.set_xlabel("Date")
@@ -230,7 +433,66 @@ def build_dashboard(
 
     buffer = io.BytesIO()
     fig.tight_layout()
-    fig.savefig(buffer, format="png", dpi=150, facecolor=fig.get_facecolor())
-    plt.close(fig)
+    if not fast_gauges:
+        fig.savefig(buffer, format="png", dpi=DASHBOARD_DPI, facecolor=fig.get_facecolor())
+        buffer.seek(0)
+        return buffer
+    canvas.draw()
+    image = Image.frombuffer("RGBA", canvas.get_width_height(), canvas.buffer_rgba(), "raw", "RGBA", 0, 1).convert("RGB")
+    height = image.height
+    font_px = 16 * DASHBOARD_DPI / 72
+    for ax, (_, rate) in zip(gauges, labels):
+        # Display coordinates have y pointing up; Pillow's point down.
+        cx, cy = ax.transData.transform((0.5, 0.5))
+        radius = ax.transData.transform((1.0, 0.5))[0] - cx
+        draw_gauge(image, (cx, height - cy), radius, rate, font_px)
+    image.save(buffer, format="PNG", dpi=(DASHBOARD_DPI, DASHBOARD_DPI))
+    buffer.seek(0)
+    return buffer
+
+
+def build_weekly_chart(series: Sequence[tuple[datetime, float]], title: str = "Fat weight this week") -> io.BytesIO:
+    # Uses a bare Figure instead of pyplot so several reports can render in worker threads at once.
+    fig = Figure(figsize=(6, 3.5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    dates = [dt for dt, _ in series]
+    values = [val for _, val in series]
+    ax.plot(dates, values, marker="o", linewidth=2, color="#1f77b4")
+    ax.grid(True, linestyle="--", alpha=0.4)
+    ax.set_ylabel("Fat weight (kg)")
+    ax.set_title(title, fontsize=12, color="#333")
+    fig.autofmt_xdate(rotation=25, ha="right")
+    buffer = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buffer, format="png", dpi=100)
+    buffer.seek(0)
+    return buffer
+
+
+def build_metric_chart(
+    series: Sequence[tuple[datetime, float]],
+    title: str,
+    ylabel: str,
+    goal: float | None = None,
+    color: str = "#1f77b4",
+) -> io.BytesIO:
+    # One album chart; a bare Figure like build_weekly_chart so the album renders its charts in parallel threads.
+    fig = Figure(figsize=(8, 4.5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    dates = [dt for dt, _ in series]
+    values = [val for _, val in series]
+    ax.plot(dates, values, marker="o", markersize=3, linewidth=2, color=color)
+    if goal is not None:
+        ax.axhline(goal, linestyle="--", color="#8a8a8a", linewidth=1.5, label="Goal")
+        ax.legend(loc="upper right")
+    ax.grid(True, linestyle="--", alpha=0.4)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title, fontsize=12, color="#333")
+    fig.autofmt_xdate(rotation=25, ha="right")
+    buffer = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buffer, format="png", dpi=120)
     buffer.seek(0)
     return buffer
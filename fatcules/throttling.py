@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods.base import TelegramType
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.methods import Response, TelegramMethod
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_RATE = 30.0
+PER_CHAT_RATE = 1.0
+MAX_RETRIES = 3
+MAX_CHAT_BUCKETS = 10_000
+THROTTLE_THRESHOLD_S = 0.001
+
+# Lower value is served first when requests compete for the global budget.
+METHOD_PRIORITIES: dict[str, int] = {
+    "answerCallbackQuery": 0,
+    "sendMessage": 1,
+    "editMessageText": 1,
+    "editMessageReplyMarkup": 1,
+    "editMessageCaption": 1,
+    "deleteMessage": 1,
+    "sendChatAction": 1,
+    "sendPhoto": 2,
+    "sendDocument": 2,
+    "sendMediaGroup": 2,
+    "editMessageMedia": 2,
+}
+# Replies to a button press do not post into the chat, so the per-chat limit does not apply.
+CHAT_EXEMPT_METHODS = {"answerCallbackQuery"}
+
+
+@dataclass
+class ThrottleMetrics:
+    requests: int = 0
+    throttled: int = 0
+    total_delay_s: float = 0.0
+    max_delay_s: float = 0.0
+    retries: int = 0
+    retry_delay_s: float = 0.0
+
+    def record_delay(self, delay: float) -> None:
+        self.requests += 1
+        if delay < THROTTLE_THRESHOLD_S:
+            return
+        self.throttled += 1
+        self.total_delay_s += delay
+        self.max_delay_s = max(self.max_delay_s, delay)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        # Takes a token (possibly going into debt) and returns how long the caller must wait for it.
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def refund(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def block(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def idle(self) -> bool:
+        now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
+
+
+class PriorityLimiter:
+    # Global token bucket whose waiters are released in priority order rather than arrival order.
+    def __init__(self, rate: float):
+        self.bucket = TokenBucket(rate)
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._counter = itertools.count()
+        self._pump: Optional[asyncio.Task[None]] = None
+
+    async def acquire(self, priority: int) -> None:
+        if not self._waiters:
+            if self.bucket.reserve() <= 0:
+                return
+            self.bucket.refund()
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run())
+        await future
+
+    async def _run(self) -> None:
+        while self._waiters:
+            # Wait for the token first so a request that arrives meanwhile can still jump the queue.
+            wait = self.bucket.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            while self._waiters:
+                _, _, future = heapq.heappop(self._waiters)
+                if not future.done():
+                    future.set_result(None)
+                    break
+            else:
+                self.bucket.refund()
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    def __init__(
+        self,
+        global_rate: float = GLOBAL_RATE,
+        per_chat_rate: float = PER_CHAT_RATE,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.global_limiter = PriorityLimiter(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.max_retries = max_retries
+        self.metrics = ThrottleMetrics()
+        self._chat_buckets: dict[Any, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= MAX_CHAT_BUCKETS:
+                self._chat_buckets = {key: value for key, value in self._chat_buckets.items() if not value.idle()}
+            bucket = TokenBucket(self.per_chat_rate, capacity=1.0)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        api_method = getattr(method, "__api_method__", "")
+        priority = METHOD_PRIORITIES.get(api_method)
+        if priority is None:
+            # getUpdates, getFile and friends are not flood-limited.
+            return await make_request(bot, method)
+        chat_id = None if api_method in CHAT_EXEMPT_METHODS else getattr(method, "chat_id", None)
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            if chat_id is not None:
+                chat_wait = self._chat_bucket(chat_id).reserve()
+                if chat_wait > 0:
+                    await asyncio.sleep(chat_wait)
+            await self.global_limiter.acquire(priority)
+            self.metrics.record_delay(time.monotonic() - started)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as exc:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                self.metrics.retries += 1
+                self.metrics.retry_delay_s += exc.retry_after
+                logger.warning("Flood control on %s (chat %s), retrying in %ss", api_method, chat_id, exc.retry_after)
+                if chat_id is not None:
+                    self._chat_bucket(chat_id).block(exc.retry_after)
+                else:
+                    self.global_limiter.bucket.block(exc.retry_after)
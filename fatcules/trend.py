@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+# Local linear trend Kalman filter: the state is (level kg, slope kg/day) and readings are level + noise.
+# Variances are in kg^2; day-to-day scale readings swing by roughly half a kilo.
+WEIGHT_NOISE = 0.25
+FAT_NOISE = 0.36
+# How quickly the underlying rate of change may drift (kg^2/day^3).
+SLOPE_DRIFT = 1e-4
+INITIAL_SLOPE_VARIANCE = 0.01
+
+TrendRow = tuple[int, datetime, float, Optional[float]]
+
+
+@dataclass(frozen=True)
+class KalmanTrend:
+    level: float
+    slope: float
+    p00: float
+    p01: float
+    p11: float
+    count: int = 1
+
+    @classmethod
+    def start(cls, value: float, noise: float) -> KalmanTrend:
+        return cls(level=value, slope=0.0, p00=noise, p01=0.0, p11=INITIAL_SLOPE_VARIANCE)
+
+    def step(self, dt_days: float, value: float, noise: float) -> KalmanTrend:
+        dt = max(dt_days, 0.0)
+        # Predict: level moves along the slope; uncertainty grows with the gap since the last reading.
+        level = self.level + self.slope * dt
+        p00 = self.p00 + dt * (2 * self.p01 + dt * self.p11) + SLOPE_DRIFT * dt**3 / 3
+        p01 = self.p01 + dt * self.p11 + SLOPE_DRIFT * dt**2 / 2
+        p11 = self.p11 + SLOPE_DRIFT * dt
+        # Update with the new reading.
+        innovation = value - level
+        s = p00 + noise
+        k0 = p00 / s
+        k1 = p01 / s
+        return KalmanTrend(
+            level=level + k0 * innovation,
+            slope=self.slope + k1 * innovation,
+            p00=(1 - k0) * p00,
+            p01=(1 - k0) * p01,
+            p11=p11 - k1 * p01,
+            count=self.count + 1,
+        )
+
+    def to_list(self) -> list[float]:
+        return [self.level, self.slope, self.p00, self.p01, self.p11, self.count]
+
+    @classmethod
+    def from_list(cls, values: list[float]) -> KalmanTrend:
+        level, slope, p00, p01, p11, count = values
+        return cls(level, slope, p00, p01, p11, int(count))
+
+
+@dataclass(frozen=True)
+class TrendState:
+    # Filter state right after folding in the entry recorded at `recorded_at`.
+    recorded_at: datetime
+    weight: KalmanTrend
+    fat: Optional[KalmanTrend] = None
+    fat_recorded_at: Optional[datetime] = None
+
+    def advance(self, recorded_at: datetime, weight_kg: float, fat_weight_kg: Optional[float]) -> TrendState:
+        weight = self.weight.step(_days_between(self.recorded_at, recorded_at), weight_kg, WEIGHT_NOISE)
+        fat, fat_recorded_at = self.fat, self.fat_recorded_at
+        if fat_weight_kg is not None:
+            if fat is None or fat_recorded_at is None:
+                fat = KalmanTrend.start(fat_weight_kg, FAT_NOISE)
+            else:
+                fat = fat.step(_days_between(fat_recorded_at, recorded_at), fat_weight_kg, FAT_NOISE)
+            fat_recorded_at = recorded_at
+        return TrendState(recorded_at, weight, fat, fat_recorded_at)
+
+    def dumps(self) -> str:
+        return json.dumps(
+            {
+                "at": self.recorded_at.isoformat(),
+                "w": self.weight.to_list(),
+                "f": self.fat.to_list() if self.fat is not None else None,
+                "fat_at": self.fat_recorded_at.isoformat() if self.fat_recorded_at is not None else None,
+            },
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def loads(cls, raw: str) -> TrendState:
+        data = json.loads(raw)
+        return cls(
+            recorded_at=datetime.fromisoformat(data["at"]),
+            weight=KalmanTrend.from_list(data["w"]),
+            fat=KalmanTrend.from_list(data["f"]) if data["f"] is not None else None,
+            fat_recorded_at=datetime.fromisoformat(data["fat_at"]) if data["fat_at"] is not None else None,
+        )
+
+
+def _days_between(start: datetime, end: datetime) -> float:
+    return (end - start).total_seconds() / 86400
+
+
+def start_trend(recorded_at: datetime, weight_kg: float, fat_weight_kg: Optional[float]) -> TrendState:
+    fat = KalmanTrend.start(fat_weight_kg, FAT_NOISE) if fat_weight_kg is not None else None
+    return TrendState(
+        recorded_at=recorded_at,
+        weight=KalmanTrend.start(weight_kg, WEIGHT_NOISE),
+        fat=fat,
+        fat_recorded_at=recorded_at if fat is not None else None,
+    )
+
+
+def replay_trend(state: Optional[TrendState], rows: Iterable[TrendRow]) -> list[tuple[int, TrendState]]:
+    # Folds entries (oldest first) into `state`, returning the state after each entry id.
+    states: list[tuple[int, TrendState]] = []
+    for entry_id, recorded_at, weight_kg, fat_weight_kg in rows:
+        if state is None:
+            state = start_trend(recorded_at, weight_kg, fat_weight_kg)
+        else:
+            state = state.advance(recorded_at, weight_kg, fat_weight_kg)
+        states.append((entry_id, state))
+    return states
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import signal
+from multiprocessing.context import SpawnProcess
+from multiprocessing.queues import Queue
+from typing import Any, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.types import Update
+
+from .config import Settings
+from .logs import install_update_logging, setup_logging
+from .repository import create_repository
+from .session import build_session
+from .throttling import RateLimitMiddleware
+
+logger = logging.getLogger(__name__)
+
+POLLING_TIMEOUT = 30
+SUPERVISE_INTERVAL = 1.0
+SHUTDOWN_TIMEOUT = 30.0
+RESTART_BACKOFF_MAX = 30.0
+
+
+def update_user_id(update: Update) -> Optional[int]:
+    try:
+        event = update.event
+    except Exception:  # unknown update type
+        return None
+    user = getattr(event, "from_user", None) or getattr(event, "user", None)
+    if user is None:
+        return None
+    return user.id
+
+
+def shard_for(update: Update, workers: int) -> int:
+    # A fixed user -> worker mapping keeps each user's FSM state and write order inside one process.
+    user_id = update_user_id(update)
+    if user_id is None:
+        return 0
+    return user_id % workers
+
+
+def global_rate_share(settings: Settings) -> float:
+    # The Bot API flood limit is per bot token. In sharded mode the front process also sends (scheduled
+    # notifications), so the budget is split between the workers and the front.
+    if settings.workers <= 1:
+        return settings.rate_limit_global
+    return settings.rate_limit_global / (settings.workers + 1)
+
+
+def encode_update(update: Update) -> str:
+    return update.model_dump_json(exclude_unset=True)
+
+
+def decode_update(raw: str, bot: Bot) -> Update:
+    return Update.model_validate_json(raw, context={"bot": bot})
+
+
+async def _worker_loop(index: int, settings: Settings, queue: Queue[Optional[str]]) -> None:
+    # Imported here so the spawn-started child builds its own router and handlers.
+    from .dashboard import start_dashboards
+    from .handlers import router
+
+    repo = create_repository(settings.storage_backend, settings.database_path, **settings.repository_options())
+    await repo.connect()
+    bot = Bot(
+        token=settings.bot_token,
+        session=build_session(settings),
+        default=DefaultBotProperties(parse_mode="HTML"),
+    )
+    bot.session.middleware(
+        RateLimitMiddleware(global_rate=global_rate_share(settings), per_chat_rate=settings.rate_limit_per_chat)
+    )
+    setattr(bot, "repo", repo)
+    setattr(bot, "admin_ids", settings.admin_ids)
+    prewarmer = start_dashboards(bot, repo, settings, shard=index)
+    dp = Dispatcher()
+    install_update_logging(dp, settings)
+    dp.include_router(router)
+    loop = asyncio.get_running_loop()
+    pending: set[asyncio.Task[Any]] = set()
+    logger.info("Worker %s started", index)
+    try:
+        while True:
+            raw = await loop.run_in_executor(None, queue.get)
+            if raw is None:
+                break
+            task = asyncio.create_task(dp.feed_update(bot, decode_update(raw, bot)))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending, timeout=SHUTDOWN_TIMEOUT)
+    finally:
+        if prewarmer is not None:
+            await prewarmer.stop()
+        await bot.session.close()
+        await repo.close()
+        logger.info("Worker %s stopped", index)
+
+
+def worker_main(index: int, settings: Settings, queue: Queue[Optional[str]]) -> None:
+    # Ctrl+C reaches the whole process group; workers drain via the front's sentinel instead.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Each spawned worker has its own listener thread writing to the inherited stderr.
+    logs = setup_logging(settings)
+    try:
+        asyncio.run(_worker_loop(index, settings, queue))
+    finally:
+        logs.stop()
+
+
+class WorkerPool:
+    def __init__(self, settings: Settings, workers: int):
+        self.settings = settings
+        self.workers = workers
+        self._ctx = multiprocessing.get_context("spawn")
+        # Queues belong to the front process, so updates for a crashed worker wait for its replacement.
+        self.queues: list[Queue[Optional[str]]] = [self._ctx.Queue() for _ in range(workers)]
+        self.processes: list[Optional[SpawnProcess]] = [None] * workers
+        self.restarts = [0] * workers
+        self._stopping = False
+
+    def _spawn(self, index: int) -> None:
+        process = self._ctx.Process(
+            target=worker_main,
+            args=(index, self.settings, self.queues[index]),
+            name=f"fatcules-worker-{index}",
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            self._spawn(index)
+
+    def dispatch(self, update: Update) -> None:
+        self.queues[shard_for(update, self.workers)].put(encode_update(update))
+
+    async def supervise(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(SUPERVISE_INTERVAL)
+            for index, process in enumerate(self.processes):
+                if self._stopping or process is None or process.is_alive():
+                    continue
+                self.restarts[index] += 1
+                delay = min(RESTART_BACKOFF_MAX, 2 ** min(self.restarts[index], 5))
+                logger.warning("Worker %s exited with code %s, restarting in %ss", index, process.exitcode, delay)
+                self.processes[index] = None
+                asyncio.get_running_loop().call_later(delay, self._respawn, index)
+
+    def _respawn(self, index: int) -> None:
+        if not self._stopping and self.processes[index] is None:
+            self._spawn(index)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for queue in self.queues:
+            queue.put(None)
+        loop = asyncio.get_running_loop()
+        for process in self.processes:
+            if process is None:
+                continue
+            await loop.run_in_executor(None, process.join, SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                logger.warning("Worker %s did not stop in time, terminating", process.name)
+                process.terminate()
+
+
+async def run_sharded(settings: Settings) -> None:
+    # Front process: long-polls Telegram and forwards each update to the worker owning its user.
+    loop = asyncio.get_running_loop()
+    current = asyncio.current_task()
+    if current is not None:
+        loop.add_signal_handler(signal.SIGTERM, current.cancel)
+    pool = WorkerPool(settings, settings.workers)
+    pool.start()
+    supervisor = asyncio.create_task(pool.supervise())
+    bot = Bot(token=settings.bot_token, session=build_session(settings))
+    # Wait longer than the long-poll itself so an idle poll is not reported as a timeout.
+    request_timeout = int(bot.session.timeout + POLLING_TIMEOUT)
+    offset: Optional[int] = None
+    backoff = 1.0
+    try:
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=POLLING_TIMEOUT, request_timeout=request_timeout)
+            except Exception as exc:  # noqa: BLE001 - keep polling through network errors
+                logger.error("Failed to fetch updates - %s: %s", type(exc).__name__, exc)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+                continue
+            backoff = 1.0
+            for update in updates:
+                pool.dispatch(update)
+                offset = update.update_id + 1
+    finally:
+        supervisor.cancel()
+        await pool.stop()
+        await bot.session.close()
@@ -1,29 +1,103 @@
 import asyncio
-import logging
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 
+from fatcules.backup import BackupScheduler
 from fatcules.config import Settings
-from fatcules.db import EntryRepository
+from fatcules.dashboard import start_dashboards
 from fatcules.handlers import router
+from fatcules.logs import install_update_logging, setup_logging
+from fatcules.repository import Repository, create_repository
+from fatcules.scheduler import NotificationScheduler
+from fatcules.session import build_session
+from fatcules.throttling import RateLimitMiddleware
+from fatcules.workers import global_rate_share, run_sharded
 
 
 async def main() -> None:
-    logging.basicConfig(level=logging.INFO)
     settings = Settings.from_env()
-    repo = EntryRepository(settings.database_path)
+    logs = setup_logging(settings)
+    try:
+        await _serve(settings)
+    finally:
+        logs.stop()
+
+
+async def _serve(settings: Settings) -> None:
+    if settings.workers > 1 and settings.storage_backend == "memory":
+        raise RuntimeError("The memory storage backend cannot be shared between workers")
+    repo = create_repository(settings.storage_backend, settings.database_path, **settings.repository_options())
     await repo.connect()
+    backups = _start_backups(settings)
+    bot = _build_bot(settings)
+    notifications = _start_notifications(settings, bot, repo)
+    try:
+        if settings.workers > 1:
+            # Workers open their own connections; the front keeps one only for scheduled notifications.
+            await run_sharded(settings)
+        else:
+            await _run_single(settings, bot, repo)
+    finally:
+        if notifications is not None:
+            await notifications.stop()
+        if backups is not None:
+            await backups.stop()
+        await bot.session.close()
+        await repo.close()
 
+
+def _start_backups(settings: Settings) -> BackupScheduler | None:
+    if settings.backup_interval_minutes <= 0:
+        return None
+    backups = BackupScheduler(
+        settings.database_path,
+        settings.backup_dir,
+        interval_s=settings.backup_interval_minutes * 60,
+        keep=settings.backup_keep,
+        compress=settings.backup_compress,
+    )
+    backups.start()
+    return backups
+
+
+def _start_notifications(settings: Settings, bot: Bot, repo: Repository) -> NotificationScheduler | None:
+    if not settings.notifications_enabled:
+        return None
+    notifications = NotificationScheduler(
+        bot,
+        repo,
+        send_rate=settings.notify_send_rate,
+        report_hour=settings.weekly_report_hour,
+    )
+    notifications.start()
+    return notifications
+
+
+def _build_bot(settings: Settings) -> Bot:
     bot = Bot(
         token=settings.bot_token,
+        session=build_session(settings),
         default=DefaultBotProperties(parse_mode="HTML"),
     )
+    bot.session.middleware(
+        RateLimitMiddleware(global_rate=global_rate_share(settings), per_chat_rate=settings.rate_limit_per_chat)
+    )
+    return bot
+
+
+async def _run_single(settings: Settings, bot: Bot, repo: Repository) -> None:
     setattr(bot, "repo", repo)  # expose repository to handlers
+    setattr(bot, "admin_ids", settings.admin_ids)
+    prewarmer = start_dashboards(bot, repo, settings)
     dp = Dispatcher()
+    install_update_logging(dp, settings)
     dp.include_router(router)
-
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        if prewarmer is not None:
+            await prewarmer.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from fatcules.repository import STORAGE_BACKENDS, Repository, create_repository
+
+
+class RepositoryTestCase(unittest.IsolatedAsyncioTestCase):
+    backend = "sqlite"
+    repo: Repository
+
+    async def asyncSetUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = create_repository(self.backend, Path(self.tmpdir.name) / "test.db")
+        await self.repo.connect()
+
+    async def asyncTearDown(self) -> None:
+        await self.repo.close()
+        self.tmpdir.cleanup()
+
+
+def for_each_backend(cls: type[RepositoryTestCase]) -> type[RepositoryTestCase]:
+    # Adds a copy of the test case for every other backend to the defining module.
+    module = sys.modules[cls.__module__]
+    for backend in STORAGE_BACKENDS:
+        if backend == cls.backend:
+            continue
+        name = f"{cls.__name__}_{backend}"
+        setattr(module, name, type(name, (cls,), {"backend": backend, "__module__": cls.__module__}))
+    return cls
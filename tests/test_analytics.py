@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+import unittest
+
+from fatcules.analytics import UsageAnalytics, bucket_history
+from fatcules.formatting import now_utc
+from tests.backends import RepositoryTestCase, for_each_backend
+
+
+@for_each_backend
+class UsageStatsTests(RepositoryTestCase):
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        today = now_utc().replace(hour=8, minute=0, second=0, microsecond=0)
+        for user_id in (1, 2, 3):
+            await self.repo.ensure_user(user_id)
+        for offset in range(3):
+            await self.repo.add_entry(user_id=1, recorded_at=today - timedelta(days=offset), weight_kg=80.0, fat_pct=20.0)
+        await self.repo.add_entry(user_id=2, recorded_at=today, weight_kg=70.0, fat_pct=None)
+        await self.repo.add_entry(user_id=2, recorded_at=today - timedelta(days=40), weight_kg=71.0, fat_pct=None)
+        self.today = today.date()
+
+    async def test_aggregates_per_day_and_history(self) -> None:
+        stats = await self.repo.usage_stats(self.today - timedelta(days=1))
+
+        self.assertEqual(
+            stats["days"],
+            [
+                {"day": (self.today - timedelta(days=1)).isoformat(), "users": 1, "entries": 1},
+                {"day": self.today.isoformat(), "users": 2, "entries": 2},
+            ],
+        )
+        self.assertEqual(stats["history_counts"], {3: 1, 2: 1})
+        self.assertEqual(stats["total_users"], 3)
+        self.assertEqual(stats["total_entries"], 5)
+        if self.backend == "sqlite":
+            self.assertGreater(stats["db_size_bytes"], 0)
+
+    async def test_results_are_cached_until_refresh(self) -> None:
+        analytics = UsageAnalytics(self.repo)
+        first = await analytics.get(7)
+        await self.repo.add_entry(user_id=3, recorded_at=datetime.now(timezone.utc), weight_kg=60.0, fat_pct=None)
+
+        self.assertIs(await analytics.get(7), first)
+        refreshed = await analytics.get(7, refresh=True)
+        self.assertEqual(refreshed.total_entries, first.total_entries + 1)
+        self.assertEqual(refreshed.history[0], ("0", 0))
+
+
+class BucketHistoryTests(unittest.TestCase):
+    def test_buckets(self) -> None:
+        buckets = bucket_history({1: 2, 5: 1, 7: 1, 31: 1, 400: 3}, total_users=10)
+
+        self.assertEqual(
+            buckets,
+            [("0", 2), ("1", 2), ("2-7", 2), ("8-30", 0), ("31-90", 1), ("91-365", 0), ("366+", 3)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import gzip
+import os
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from fatcules.backup import BackupScheduler
+from fatcules.db import EntryRepository
+
+
+class BackupSchedulerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = Path(os.path.join(self.tmpdir.name, "test.db"))
+        self.backup_dir = Path(self.tmpdir.name) / "backups"
+        self.repo = EntryRepository(self.db_path)
+        await self.repo.connect()
+        await self.repo.add_entry(user_id=1, recorded_at=datetime(2024, 1, 1, tzinfo=timezone.utc), weight_kg=80.0, fat_pct=20.0)
+
+    async def asyncTearDown(self) -> None:
+        await self.repo.close()
+        self.tmpdir.cleanup()
+
+    async def test_backup_copies_database(self) -> None:
+        scheduler = BackupScheduler(self.db_path, self.backup_dir, interval_s=60, compress=False)
+
+        result = await scheduler.run_once()
+
+        self.assertTrue(result.path.exists())
+        self.assertEqual(result.size_bytes, result.path.stat().st_size)
+        self.assertGreaterEqual(result.duration_s, 0)
+        with sqlite3.connect(result.path) as conn:
+            self.assertEqual(conn.execute("SELECT weight_kg FROM entries").fetchall(), [(80.0,)])
+
+    async def test_backup_finishes_under_concurrent_writes(self) -> None:
+        scheduler = BackupScheduler(self.db_path, self.backup_dir, interval_s=60, compress=False)
+        start = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+        async def write_steadily() -> int:
+            day = 0
+            while not backup.done():
+                await self.repo.add_entry(user_id=2, recorded_at=start + timedelta(days=day), weight_kg=70.0, fat_pct=None)
+                day += 1
+                await asyncio.sleep(0)
+            return day
+
+        backup = asyncio.create_task(scheduler.run_once())
+        written = await asyncio.wait_for(write_steadily(), timeout=10)
+        result = await backup
+
+        self.assertGreater(written, 0)
+        with sqlite3.connect(result.path) as conn:
+            self.assertEqual(conn.execute("PRAGMA integrity_check").fetchone(), ("ok",))
+            self.assertEqual(conn.execute("SELECT weight_kg FROM entries WHERE user_id = 1").fetchall(), [(80.0,)])
+
+    async def test_compressed_snapshots_are_rotated(self) -> None:
+        scheduler = BackupScheduler(self.db_path, self.backup_dir, interval_s=60, keep=2, compress=True)
+
+        for _ in range(3):
+            last = await scheduler.run_once()
+
+        snapshots = scheduler.snapshots()
+        self.assertEqual(len(snapshots), 2)
+        self.assertEqual(snapshots[-1], last.path)
+        self.assertTrue(last.path.name.endswith(".db.gz"))
+        self.assertTrue(gzip.decompress(last.path.read_bytes()).startswith(b"SQLite format 3"))
+        self.assertEqual(len(scheduler.history), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
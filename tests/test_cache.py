@@ -0,0 +1,37 @@
+import unittest
+
+from fatcules.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TTLCacheTests(unittest.TestCase):
+    def test_entries_expire(self) -> None:
+        clock = FakeClock()
+        cache: TTLCache[int, str] = TTLCache(maxsize=10, ttl_s=5, clock=clock)
+        cache.set(1, "a")
+        clock.now = 4.9
+        self.assertEqual(cache.get(1), "a")
+        clock.now = 5.0
+        self.assertIsNone(cache.get(1))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_least_recently_used_is_evicted(self) -> None:
+        cache: TTLCache[int, str] = TTLCache(maxsize=2, ttl_s=60)
+        cache.set(1, "a")
+        cache.set(2, "b")
+        cache.get(1)
+        cache.set(3, "c")
+        self.assertIn(1, cache)
+        self.assertNotIn(2, cache)
+        self.assertEqual(len(cache), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
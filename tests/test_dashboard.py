@@ -0,0 +1,144 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+import unittest
+
+from fatcules.dashboard import DashboardPrewarmer, DashboardRenderer, RenderPool, album_series, build_summary
+from fatcules.formatting import now_utc
+from fatcules.keyboards import chart_range_keyboard, parse_chart_range
+from fatcules.repository import SeriesPoint
+from tests.backends import RepositoryTestCase, for_each_backend
+
+
+@for_each_backend
+class DashboardRendererTests(RepositoryTestCase):
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        self.today = now_utc().replace(hour=0, minute=0, second=0, microsecond=0)
+        # One reading a week for a year and a half.
+        for week in range(80):
+            await self.repo.add_entry(
+                user_id=1, recorded_at=self.today - timedelta(weeks=week), weight_kg=80.0 + week / 10, fat_pct=20.0
+            )
+
+    async def test_ranges_bound_the_series_query(self) -> None:
+        month = await self.repo.get_fat_weight_series(1, since=(self.today - timedelta(days=30)).date())
+        self.assertEqual(len(month), 5)
+        self.assertEqual(len(await self.repo.get_trend_series(1, since=self.today - timedelta(days=30))), 5)
+
+        summary = await build_summary(self.repo, 1, since=(self.today - timedelta(days=60)).date())
+        assert summary is not None
+        full = await build_summary(self.repo, 1)
+        assert full is not None
+        self.assertEqual(len(summary.series), 9)
+        self.assertEqual(len(full.series), 80)
+        # Rates only look 30 days back, so the bounded summary says the same.
+        self.assertEqual(summary.text, full.text)
+
+    async def test_renders_are_cached_until_entries_change(self) -> None:
+        renderer = DashboardRenderer(self.repo)
+
+        month = await renderer.render(1, "1M")
+        assert month is not None and month.image is not None
+        self.assertEqual(month.image[:8], b"\x89PNG\r\n\x1a\n")
+        self.assertIs(await renderer.render(1, "1M"), month)
+
+        await self.repo.add_entry(user_id=1, recorded_at=self.today - timedelta(days=1), weight_kg=79.0, fat_pct=19.0)
+        self.assertIsNot(await renderer.render(1, "1M"), month)
+
+        await self.repo.set_user_goal(1, 75.0, 15.0)
+        self.assertIn("Goal: 75.0 kg", (await renderer.render(1, "1M")).caption)  # type: ignore[union-attr]
+
+    async def test_empty_range(self) -> None:
+        await self.repo.add_entry(
+            user_id=2, recorded_at=self.today - timedelta(days=200), weight_kg=70.0, fat_pct=15.0
+        )
+        renderer = DashboardRenderer(self.repo)
+
+        self.assertIsNone(await renderer.render(2, "1M"))
+        self.assertIsNone(await renderer.render(3))
+        with self.assertRaises(ValueError):
+            await renderer.render(2, "2W")
+
+    async def test_concurrent_requests_share_one_render(self) -> None:
+        renderer = DashboardRenderer(self.repo)
+
+        first, second = await asyncio.gather(renderer.render(1, "3M"), renderer.render(1, "3M"))
+
+        self.assertIs(first, second)
+
+    async def test_prewarmer_renders_recently_active_users(self) -> None:
+        await self.repo.add_entry(user_id=2, recorded_at=self.today - timedelta(days=60), weight_kg=70.0, fat_pct=15.0)
+        await self.repo.add_entry(user_id=3, recorded_at=self.today, weight_kg=60.0, fat_pct=None)
+        since = self.today - timedelta(days=7)
+        self.assertEqual(sorted(await self.repo.active_users(since)), [1, 3])
+        self.assertEqual(await self.repo.active_users(since, shards=2, shard=0), [])
+        renderer = DashboardRenderer(self.repo)
+        prewarmer = DashboardPrewarmer(renderer, idle_s=0)
+
+        # User 3 has no fat % to plot and user 2 has not weighed in lately.
+        self.assertEqual(await prewarmer.run_once(), 1)
+        self.assertEqual(await prewarmer.run_once(), 0)
+        self.assertIsNotNone(await renderer.render(1))
+        self.assertEqual(renderer.prerendered, 1)
+
+        await self.repo.add_entry(user_id=1, recorded_at=self.today - timedelta(days=1), weight_kg=79.0, fat_pct=19.0)
+        self.assertEqual(await prewarmer.run_once(), 1)
+
+    async def test_album_charts_are_cached_individually(self) -> None:
+        renderer = DashboardRenderer(self.repo)
+
+        album = await renderer.render_album(1, "3M")
+        # No height yet, so no BMI chart.
+        self.assertEqual([chart.name for chart in album], ["weight", "fat_pct", "fat_weight"])
+        self.assertTrue(all(chart.image[:8] == b"\x89PNG\r\n\x1a\n" for chart in album))
+
+        await self.repo.set_user_height(1, 180.0)
+        with_bmi = await renderer.render_album(1, "3M")
+        self.assertEqual([chart.name for chart in with_bmi], ["weight", "fat_pct", "fat_weight", "bmi"])
+        self.assertEqual(await renderer.render_album(1, "3M"), with_bmi)
+        self.assertIs((await renderer.render_album(1, "3M"))[3], with_bmi[3])
+
+
+class RenderPoolTests(unittest.IsolatedAsyncioTestCase):
+    async def test_abandoned_renders_keep_their_slot(self) -> None:
+        pool = RenderPool(threads=1)
+        release = threading.Event()
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await pool.run(0.05, release.wait)
+        # The timed-out render still runs, so the next one gives up waiting for a thread.
+        with self.assertRaises(asyncio.TimeoutError):
+            await pool.run(0.05, lambda: "late")
+
+        release.set()
+        self.assertEqual(await pool.run(1.0, lambda: "done"), "done")
+
+
+class AlbumSeriesTests(unittest.TestCase):
+    def test_splits_one_fetch_into_charts(self) -> None:
+        rows = [
+            SeriesPoint(datetime(2024, 1, 1, tzinfo=timezone.utc), 80.0, 16.0),
+            SeriesPoint(datetime(2024, 1, 2, tzinfo=timezone.utc), 79.0, None),
+        ]
+
+        series = album_series(rows, {"height_cm": 200.0, "goal_weight_kg": 75.0, "goal_fat_pct": 15.0})
+
+        self.assertEqual(len(series["weight"][0]), 2)
+        self.assertEqual([value for _, value in series["fat_pct"][0]], [20.0])
+        self.assertEqual(series["fat_weight"][1], 11.25)
+        self.assertEqual(series["bmi"][0][0][1], 20.0)
+        self.assertEqual(list(album_series(rows[1:], {}).keys()), ["weight"])
+
+
+class ChartRangeKeyboardTests(unittest.TestCase):
+    def test_selected_range_is_marked(self) -> None:
+        kb = chart_range_keyboard(("1M", "All"), "All")
+
+        self.assertEqual([button.text for button in kb.inline_keyboard[0]], ["1M", "• All"])
+        self.assertEqual(parse_chart_range(kb.inline_keyboard[0][0].callback_data or ""), "1M")
+        self.assertIsNone(parse_chart_range("DP|add|pick|2024-01-01"))
+
+
+if __name__ == "__main__":
+    unittest.main()
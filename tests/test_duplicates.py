@@ -1,24 +1,14 @@
-from datetime import datetime, timezone
-import os
-import tempfile
+from datetime import date, datetime, timedelta, timezone
+import sqlite3
 import unittest
 from pathlib import Path
 
-from fatcules.db import EntryRepository
+from fatcules.repository import DuplicateDayError
+from tests.backends import RepositoryTestCase, for_each_backend
 
 
-class EntryRepositoryDuplicateTests(unittest.IsolatedAsyncioTestCase):
-    async def asyncSetUp(self) -> None:
-        self.tmpdir = tempfile.TemporaryDirectory()
-        db_path = os.path.join(self.tmpdir.name, "test.db")
-        self.repo = EntryRepository(Path(db_path))  # type: ignore[arg-type]
-        await self.repo.connect()
-
-    async def asyncTearDown(self) -> None:
-        if self.repo._conn:
-            await self.repo._conn.close()
-        self.tmpdir.cleanup()
-
+@for_each_backend
+class EntryRepositoryDuplicateTests(RepositoryTestCase):
     async def test_get_entry_by_date_finds_entry(self) -> None:
         recorded = datetime(2024, 1, 2, 12, tzinfo=timezone.utc)
         await self.repo.add_entry(user_id=1, recorded_at=recorded, weight_kg=80.0, fat_pct=20.0)
@@ -27,8 +17,52 @@ class EntryRepositoryDuplicateTests(unittest.IsolatedAsyncioTestCase):
 
         self.assertIsNotNone(found)
         assert found is not None
-        self.assertEqual(found["weight_kg"], 80.0)
-        self.assertEqual(datetime.fromisoformat(found["recorded_at"]).date(), recorded.date())
+        self.assertEqual(found.weight_kg, 80.0)
+        self.assertEqual(found.day, recorded.date())
+
+    async def test_day_lookups_use_local_day(self) -> None:
+        # 00:30 on Jan 2 at UTC+2 is still Jan 1 in UTC; every backend files it under Jan 2.
+        recorded = datetime(2024, 1, 2, 0, 30, tzinfo=timezone(timedelta(hours=2)))
+        await self.repo.add_entry(user_id=1, recorded_at=recorded, weight_kg=80.0, fat_pct=None)
+
+        found = await self.repo.get_entry_by_date(1, date(2024, 1, 2))
+        self.assertEqual(found.recorded_at if found else None, recorded)
+        self.assertIsNone(await self.repo.get_entry_by_date(1, date(2024, 1, 1)))
+        self.assertEqual(await self.repo.get_entry_days(1, date(2024, 1, 1)), {2})
+        self.assertEqual(len(await self.repo.list_entries_between(1, date(2024, 1, 2), date(2024, 1, 2))), 1)
+        with self.assertRaises(DuplicateDayError):
+            await self.repo.add_entry(user_id=1, recorded_at=datetime(2024, 1, 2, tzinfo=timezone.utc), weight_kg=81.0, fat_pct=None)
+
+    async def test_list_entries_between_reaches_old_months(self) -> None:
+        for month in range(1, 13):
+            for day in (1, 15, 28):
+                await self.repo.add_entry(
+                    user_id=1, recorded_at=datetime(2023, month, day, tzinfo=timezone.utc), weight_kg=80.0, fat_pct=None
+                )
+        await self.repo.add_entry(user_id=2, recorded_at=datetime(2023, 3, 2, tzinfo=timezone.utc), weight_kg=60.0, fat_pct=None)
+
+        march = await self.repo.list_entries_between(1, date(2023, 3, 1), date(2023, 3, 31))
+
+        self.assertEqual([row.day for row in march], [date(2023, 3, 28), date(2023, 3, 15), date(2023, 3, 1)])
+        self.assertEqual(await self.repo.list_entries_between(1, date(2024, 1, 1), date(2024, 1, 31)), [])
+
+    async def test_entry_days_follow_writes(self) -> None:
+        march = date(2024, 3, 1)
+        entry_id = await self.repo.add_entry(
+            user_id=1, recorded_at=datetime(2024, 3, 5, tzinfo=timezone.utc), weight_kg=80.0, fat_pct=None
+        )
+        self.assertEqual(await self.repo.get_entry_days(1, march), {5})
+
+        await self.repo.add_entry(user_id=1, recorded_at=datetime(2024, 3, 9, tzinfo=timezone.utc), weight_kg=80.0, fat_pct=None)
+        await self.repo.update_entry(entry_id, 1, datetime(2024, 4, 2, tzinfo=timezone.utc), 79.0, None)
+        self.assertEqual(await self.repo.get_entry_days(1, date(2024, 3, 20)), {9})
+        self.assertEqual(await self.repo.get_entry_days(1, date(2024, 4, 1)), {2})
+
+        await self.repo.import_entries_chunk(1, [(datetime(2024, 3, 31, tzinfo=timezone.utc), 78.0, None)])
+        await self.repo.delete_entry(entry_id, 1)
+        self.assertEqual(await self.repo.get_entry_days(1, march), {9, 31})
+        self.assertEqual(await self.repo.get_entry_days(1, date(2024, 4, 1)), frozenset())
+        self.assertEqual(await self.repo.get_entry_days(2, march), frozenset())
 
     async def test_replace_flow_updates_conflict(self) -> None:
         day1 = datetime(2024, 1, 1, tzinfo=timezone.utc)
@@ -37,25 +71,120 @@ class EntryRepositoryDuplicateTests(unittest.IsolatedAsyncioTestCase):
         conflict_id = await self.repo.add_entry(user_id=1, recorded_at=day2, weight_kg=70.0, fat_pct=15.0)
         entry_id = await self.repo.add_entry(user_id=1, recorded_at=day1, weight_kg=72.0, fat_pct=16.0)
 
+        with self.assertRaises(DuplicateDayError) as ctx:
+            await self.repo.update_entry(entry_id=entry_id, user_id=1, recorded_at=day2, weight_kg=75.0, fat_pct=14.0)
+        self.assertEqual(ctx.exception.existing.id, conflict_id)  # type: ignore[union-attr]
+
         updated = await self.repo.update_entry(
             entry_id=entry_id,
             user_id=1,
             recorded_at=day2,
             weight_kg=75.0,
             fat_pct=14.0,
+            replace=True,
         )
         self.assertTrue(updated)
-        self.assertTrue(await self.repo.delete_entry(entry_id=conflict_id, user_id=1))
+        # The conflicting entry is removed by the same operation.
+        self.assertFalse(await self.repo.delete_entry(entry_id=conflict_id, user_id=1))
 
         final = await self.repo.get_entry_by_date(user_id=1, recorded_date=day2.date())
         self.assertIsNotNone(final)
         assert final is not None
-        self.assertEqual(final["id"], entry_id)
-        self.assertEqual(final["weight_kg"], 75.0)
+        self.assertEqual(final.id, entry_id)
+        self.assertEqual(final.weight_kg, 75.0)
         # only one entry should remain
         all_entries = await self.repo.list_recent_entries(user_id=1, limit=10)
         self.assertEqual(len(all_entries), 1)
 
+    async def test_add_entry_rejects_second_entry_for_day(self) -> None:
+        first = await self.repo.add_entry(
+            user_id=1, recorded_at=datetime(2024, 1, 2, tzinfo=timezone.utc), weight_kg=80.0, fat_pct=None
+        )
+
+        with self.assertRaises(DuplicateDayError) as ctx:
+            await self.repo.add_entry(
+                user_id=1, recorded_at=datetime(2024, 1, 2, 18, tzinfo=timezone.utc), weight_kg=81.0, fat_pct=None
+            )
+
+        self.assertEqual(ctx.exception.existing.id, first)  # type: ignore[union-attr]
+        # Other users and days are unaffected.
+        await self.repo.add_entry(user_id=2, recorded_at=datetime(2024, 1, 2, tzinfo=timezone.utc), weight_kg=60.0, fat_pct=None)
+        self.assertEqual(len(await self.repo.list_recent_entries(user_id=1)), 1)
+
+    async def test_upsert_overwrites_in_place(self) -> None:
+        day = datetime(2024, 1, 2, tzinfo=timezone.utc)
+        entry_id = await self.repo.upsert_entry(user_id=1, recorded_at=day, weight_kg=80.0, fat_pct=20.0)
+
+        self.assertEqual(await self.repo.upsert_entry(user_id=1, recorded_at=day, weight_kg=79.0, fat_pct=None), entry_id)
+
+        entry = await self.repo.get_entry_by_date(user_id=1, recorded_date=day.date())
+        assert entry is not None
+        self.assertEqual((entry.weight_kg, entry.fat_pct, entry.fat_weight_kg), (79.0, None, None))
+        self.assertEqual((await self.repo.get_trend(1)).weight.level, 79.0)
+
+    async def test_timezone_is_stored_on_profile(self) -> None:
+        await self.repo.ensure_user(1)
+        await self.repo.set_user_timezone(1, "Europe/Berlin")
+
+        self.assertEqual((await self.repo.get_user(1))["timezone"], "Europe/Berlin")  # type: ignore[index]
+
+
+class DuplicateTransactionTests(RepositoryTestCase):
+    async def test_duplicates_do_not_roll_back_pending_writes(self) -> None:
+        day = datetime(2024, 1, 2, tzinfo=timezone.utc)
+        await self.repo.add_entry(user_id=1, recorded_at=day, weight_kg=80.0, fat_pct=None)
+        other = await self.repo.add_entry(user_id=1, recorded_at=datetime(2024, 1, 3, tzinfo=timezone.utc), weight_kg=79.0, fat_pct=None)
+        conn = await self.repo.connect()  # type: ignore[attr-defined]
+        # An uncommitted write that happens to share the connection.
+        await conn.execute("INSERT INTO users (id, height_cm) VALUES (2, 180)")
+
+        with self.assertRaises(DuplicateDayError):
+            await self.repo.add_entry(user_id=1, recorded_at=day, weight_kg=81.0, fat_pct=None)
+        with self.assertRaises(DuplicateDayError):
+            await self.repo.update_entry(other, 1, day, 79.0, None)
+
+        cursor = await conn.execute("SELECT height_cm FROM users WHERE id = 2")
+        self.assertEqual(tuple(await cursor.fetchone()), (180.0,))
+
+
+class LocalDayMigrationTests(RepositoryTestCase):
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        await self.repo.close()
+        # Recreate the database with the pre-local_day schema and a racy duplicate.
+        self.db_path = Path(self.tmpdir.name) / "test.db"
+        self.db_path.unlink()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "CREATE TABLE entries (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, "
+                "recorded_at TEXT NOT NULL, weight_kg REAL NOT NULL, fat_pct REAL, fat_weight_kg REAL, "
+                "created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+            )
+            conn.executemany(
+                "INSERT INTO entries (user_id, recorded_at, weight_kg) VALUES (?, ?, ?)",
+                [(1, "2024-01-01T00:00:00+00:00", 80.0), (1, "2024-01-02T00:00:00+00:00", 79.0), (1, "2024-01-02T00:00:00+00:00", 78.5)],
+            )
+
+    async def test_backfills_local_day_and_keeps_duplicates(self) -> None:
+        with self.assertLogs("fatcules.db", "WARNING"):
+            await self.repo.connect()
+
+        entry = await self.repo.get_entry_by_date(1, date(2024, 1, 2))
+        assert entry is not None
+        self.assertEqual(entry.weight_kg, 78.5)
+        self.assertEqual(len(await self.repo.list_recent_entries(1)), 2)
+        self.assertEqual((await self.repo.get_trend(1)).weight.count, 2)
+        conn = await self.repo.connect()
+        # The older duplicate survives, both as a conflict row and as an extra sample of the kept entry.
+        cursor = await conn.execute("SELECT id, entry_id, weight_kg FROM entries_conflicts")
+        self.assertEqual([tuple(row) for row in await cursor.fetchall()], [(2, entry.id, 79.0)])
+        cursor = await conn.execute("SELECT weight_kg FROM measurements WHERE entry_id = ? ORDER BY id", (entry.id,))
+        self.assertEqual([row[0] for row in await cursor.fetchall()], [79.0, 78.5])
+        cursor = await conn.execute("SELECT local_day, samples, weight_last FROM daily_rollups ORDER BY local_day")
+        self.assertEqual([tuple(row) for row in await cursor.fetchall()], [("2024-01-01", 1, 80.0), ("2024-01-02", 2, 78.5)])
+        with self.assertRaises(DuplicateDayError):
+            await self.repo.add_entry(user_id=1, recorded_at=datetime(2024, 1, 1, tzinfo=timezone.utc), weight_kg=1.0, fat_pct=None)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+import json
+from types import SimpleNamespace
+import unittest
+from unittest.mock import AsyncMock, Mock
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from fatcules.handlers import _entries_from_state, _show_edit_entries, edit_entry_choose
+from fatcules.keyboards import DELETE_ICON
+from fatcules.memory import MemoryRepository
+from fatcules.repository import Entry
+
+
+class EditStateTests(unittest.IsolatedAsyncioTestCase):
+    async def test_entries_in_fsm_data_survive_json(self) -> None:
+        state = FSMContext(MemoryStorage(), StorageKey(bot_id=1, chat_id=7, user_id=7))
+        message = SimpleNamespace(from_user=SimpleNamespace(id=7), answer=AsyncMock())
+        entries = [
+            Entry.create(2, 7, datetime(2024, 1, 2, tzinfo=timezone.utc), 80.0, 20.0),
+            Entry.create(1, 7, datetime(2024, 1, 1, tzinfo=timezone.utc), 81.0, None),
+        ]
+
+        await _show_edit_entries(message, state, repo=None, entries=entries)  # type: ignore[arg-type]
+
+        data = json.loads(json.dumps(await state.get_data()))
+        self.assertEqual(_entries_from_state(data), entries)
+
+    async def test_delete_schedules_dashboard_prerender(self) -> None:
+        repo = MemoryRepository()
+        await repo.add_entry(7, datetime(2024, 1, 2, tzinfo=timezone.utc), 80.0, None)
+        newest = await repo.add_entry(7, datetime(2024, 1, 3, tzinfo=timezone.utc), 79.0, None)
+        dashboards = SimpleNamespace(schedule=Mock())
+        state = FSMContext(MemoryStorage(), StorageKey(bot_id=1, chat_id=7, user_id=7))
+        message = SimpleNamespace(
+            text=f"{DELETE_ICON}1",
+            from_user=SimpleNamespace(id=7),
+            bot=SimpleNamespace(repo=repo, dashboards=dashboards),
+            answer=AsyncMock(),
+        )
+        await _show_edit_entries(message, state, repo)  # type: ignore[arg-type]
+        message.answer.reset_mock()
+
+        await edit_entry_choose(message, state)  # type: ignore[arg-type]
+
+        self.assertNotIn(newest, [entry.id for entry in await repo.list_recent_entries(7)])
+        dashboards.schedule.assert_called_once_with(7)
+
+
+if __name__ == "__main__":
+    unittest.main()
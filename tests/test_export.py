@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+import csv
+import gzip
+import io
+import json
+from types import SimpleNamespace
+import unittest
+from unittest import mock
+
+from fatcules.exporter import export_data
+from fatcules.handlers import export_command
+from tests.backends import RepositoryTestCase, for_each_backend
+
+
+@for_each_backend
+class ExportTests(RepositoryTestCase):
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for day in range(3):
+            await self.repo.add_entry(user_id=1, recorded_at=start + timedelta(days=day), weight_kg=80.0 - day, fat_pct=20.0)
+        await self.repo.add_entry(user_id=2, recorded_at=start, weight_kg=60.0, fat_pct=None)
+        await self.repo.set_user_height(1, 180.0)
+        await self.repo.set_user_goal(1, 75.0, 15.0)
+
+    async def test_csv_export_is_gzipped_and_scoped_to_user(self) -> None:
+        out = io.BytesIO()
+        count = await export_data(self.repo, out, fmt="csv", user_id=1)
+
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(out.getvalue()).decode("utf-8"))))
+        self.assertEqual(count, 3)
+        self.assertEqual([row["weight_kg"] for row in rows], ["80.0", "79.0", "78.0"])
+        self.assertEqual(rows[0]["height_cm"], "180.0")
+        self.assertEqual(rows[0]["goal_fat_pct"], "15.0")
+
+    async def test_export_filename_uses_users_local_day(self) -> None:
+        await self.repo.set_user_timezone(1, "Pacific/Kiritimati")
+        message = SimpleNamespace(
+            text="/export",
+            from_user=SimpleNamespace(id=1),
+            bot=SimpleNamespace(repo=self.repo),
+            message=None,
+            answer=mock.AsyncMock(),
+            answer_document=mock.AsyncMock(),
+        )
+        state = SimpleNamespace(clear=mock.AsyncMock())
+
+        # Still Jan 1 in UTC, already Jan 2 at UTC+14.
+        with mock.patch("fatcules.formatting.now_utc", return_value=datetime(2024, 1, 1, 12, tzinfo=timezone.utc)):
+            await export_command(message, state)  # type: ignore[arg-type]
+
+        document = message.answer_document.await_args.args[0]
+        self.assertEqual(document.filename, "fatcules-1-2024-01-02.csv.gz")
+
+    async def test_json_export_streams_all_users_in_small_chunks(self) -> None:
+        out = io.BytesIO()
+        chunks = []
+        async for rows in self.repo.iter_entries(chunk_size=2):
+            chunks.append(len(rows))
+        self.assertEqual(chunks, [2, 2])
+
+        count = await export_data(self.repo, out, fmt="json")
+
+        payload = json.loads(gzip.decompress(out.getvalue()))
+        self.assertEqual(count, 4)
+        self.assertEqual([user["id"] for user in payload["users"]], [1])
+        self.assertEqual([entry["user_id"] for entry in payload["entries"]], [1, 1, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
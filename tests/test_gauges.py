@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+import unittest
+import warnings
+
+import numpy as np
+from PIL import Image
+
+from fatcules.gauges import gauge_tile
+from fatcules.stats import build_dashboard
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def render(rates: dict, gauge_style: str) -> np.ndarray:
+    series = [(START + timedelta(days=day), 20.0 - 0.05 * day) for day in range(60)]
+    with warnings.catch_warnings():
+        # The gauge axes are not tight_layout compatible.
+        warnings.simplefilter("ignore", UserWarning)
+        image = build_dashboard(rates, series, gauge_style=gauge_style)
+    return np.asarray(Image.open(image).convert("RGB"), dtype=float)
+
+
+class PillowGaugeTests(unittest.TestCase):
+    def test_matches_matplotlib_gauges(self) -> None:
+        for rates in ({7: 0.4, 30: 0.9}, {7: 0.0, 30: 1.3}):
+            with self.subTest(rates=rates):
+                expected = render(rates, "matplotlib")
+                actual = render(rates, "pillow")
+
+                self.assertEqual(actual.shape, expected.shape)
+                # Compare the gauge row only; the chart below is matplotlib in both.
+                gauges = slice(0, expected.shape[0] // 2)
+                difference = np.abs(actual[gauges] - expected[gauges])
+                self.assertLess(difference.mean(), 2.0)
+                # Antialiasing and text hinting differ along edges, but almost every pixel agrees.
+                self.assertLess((difference.max(axis=2) > 64).mean(), 0.01)
+
+    def test_tile_without_rate_is_just_the_background(self) -> None:
+        empty = gauge_tile(None, 50)
+        full = gauge_tile(1.0, 50)
+
+        self.assertEqual(empty.size, full.size)
+        self.assertLess(np.asarray(empty)[..., 3].mean(), np.asarray(full)[..., 3].mean())
+
+    def test_unknown_style(self) -> None:
+        with self.assertRaises(ValueError):
+            build_dashboard({7: 0.5, 30: 0.5}, gauge_style="svg")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import asyncio
+from datetime import date, datetime, timezone
+import io
+import json
+import unittest
+from unittest import mock
+
+from fatcules.importer import import_entries, iter_json_rows, parse_import_row
+from tests.backends import RepositoryTestCase, for_each_backend
+
+
+class ImportParsingTests(unittest.TestCase):
+    def test_parse_import_row(self) -> None:
+        recorded_at, weight, fat = parse_import_row({"Date": "2024-01-02", "Weight": "80,5", "fat_pct": ""})  # type: ignore[misc]
+        self.assertEqual(recorded_at.date(), date(2024, 1, 2))
+        self.assertEqual(weight, 80.5)
+        self.assertIsNone(fat)
+        self.assertEqual(parse_import_row({"date": "nope", "weight_kg": "80"}), "bad date 'nope'")
+        self.assertEqual(parse_import_row({"date": "2024-01-02"}), "missing or invalid weight")
+        self.assertEqual(parse_import_row({"date": "2024-01-02", "weight_kg": 80, "fat_pct": 140}), "bad fat % 140")
+
+    def test_json_array_is_decoded_incrementally(self) -> None:
+        items = [{"date": f"2024-01-{day:02d}", "weight_kg": 80 + day} for day in range(1, 29)]
+        rows = list(iter_json_rows(io.StringIO(json.dumps(items, indent=2)), chunk_size=16))
+        self.assertEqual([row for _, row in rows], items)
+
+    def test_json_lines(self) -> None:
+        text = '{"date": "2024-01-01", "weight_kg": 80}\n\n{"date": "2024-01-02", "weight_kg": 81}'
+        rows = list(iter_json_rows(io.StringIO(text), chunk_size=8))
+        self.assertEqual([line for line, _ in rows], [1, 3])
+
+
+@for_each_backend
+class ImportRepositoryTests(RepositoryTestCase):
+    async def test_csv_import_in_chunks_with_skip_policy(self) -> None:
+        await self.repo.add_entry(user_id=1, recorded_at=datetime.fromisoformat("2024-01-02T00:00:00+00:00"), weight_kg=70.0, fat_pct=None)
+        csv_text = "date,weight_kg,fat_pct\n" + "\n".join(
+            [
+                "2024-01-01,80,20",
+                "2024-01-02,81,",
+                "2024-01-03,bad,",
+                "2024-01-04,82,19.5",
+                "2024-01-04,83,19",
+                "2024-01-05,84,",
+            ]
+        )
+        progress: list[int] = []
+
+        async def report(result) -> None:
+            progress.append(result.rows)
+
+        result = await import_entries(self.repo, 1, io.StringIO(csv_text), policy="skip", progress=report, chunk_size=2)
+
+        self.assertEqual(result.rows, 6)
+        self.assertEqual(result.inserted, 3)
+        self.assertEqual(result.skipped, 2)
+        self.assertEqual(result.error_count, 1)
+        self.assertIn("row 4", result.errors[0])
+        self.assertGreaterEqual(len(progress), 2)
+        kept = await self.repo.get_entry_by_date(1, date(2024, 1, 2))
+        assert kept is not None
+        self.assertEqual(kept.weight_kg, 70.0)
+        first_dup = await self.repo.get_entry_by_date(1, date(2024, 1, 4))
+        assert first_dup is not None
+        self.assertEqual(first_dup.weight_kg, 82.0)
+        self.assertAlmostEqual(first_dup.fat_weight_kg, 82.0 * 19.5 / 100)
+
+    async def test_json_import_replace_policy(self) -> None:
+        await self.repo.add_entry(user_id=1, recorded_at=datetime.fromisoformat("2024-01-02T00:00:00+00:00"), weight_kg=70.0, fat_pct=None)
+        payload = json.dumps(
+            [
+                {"date": "2024-01-02", "weight_kg": 81, "fat_pct": 20},
+                {"date": "2024-01-03T08:30:00", "weight_kg": 80.5},
+            ]
+        )
+
+        result = await import_entries(self.repo, 1, io.StringIO(payload), fmt="json", policy="replace")
+
+        self.assertEqual((result.inserted, result.replaced, result.skipped), (1, 1, 0))
+        entries = await self.repo.list_recent_entries(user_id=1, limit=10)
+        self.assertEqual([e.weight_kg for e in entries], [80.5, 81.0])
+
+
+class ImportTransactionTests(RepositoryTestCase):
+    async def test_trend_is_replayed_once_per_import(self) -> None:
+        lines = "\n".join(f"2024-01-{day:02d},{80 + day}" for day in range(28, 0, -1))
+        refresh_trend = mock.AsyncMock(wraps=self.repo._refresh_trend)  # type: ignore[attr-defined]
+
+        with mock.patch.object(self.repo, "_refresh_trend", refresh_trend):
+            result = await import_entries(self.repo, 1, io.StringIO(f"date,weight_kg\n{lines}"), chunk_size=5)
+
+        self.assertEqual(result.inserted, 28)
+        refresh_trend.assert_awaited_once()
+        self.assertEqual(refresh_trend.await_args.args[1:], (1, "2024-01-01"))
+
+    async def test_failed_chunk_keeps_other_users_writes(self) -> None:
+        refresh_trend = self.repo._refresh_trend  # type: ignore[attr-defined]
+
+        async def failing_refresh(conn, user_id, since) -> None:
+            # Yields mid-transaction so the other user's add_entry gets a chance to interleave.
+            await asyncio.sleep(0.01)
+            if user_id == 1:
+                raise RuntimeError("import failed")
+            await refresh_trend(conn, user_id, since)
+
+        day = datetime(2024, 1, 2, tzinfo=timezone.utc)
+        with mock.patch.object(self.repo, "_refresh_trend", failing_refresh):
+            imported, added = await asyncio.gather(
+                self.repo.import_entries_chunk(1, [(day, 80.0, None)]),
+                self.repo.add_entry(user_id=2, recorded_at=day, weight_kg=60.0, fat_pct=None),
+                return_exceptions=True,
+            )
+
+        self.assertIsInstance(imported, RuntimeError)
+        self.assertIsInstance(added, int)
+        await self.repo.close()
+        await self.repo.connect()
+        self.assertIsNone(await self.repo.get_entry_by_date(1, day.date()))
+        self.assertIsNotNone(await self.repo.get_entry_by_date(2, day.date()))
+
+
+if __name__ == "__main__":
+    unittest.main()
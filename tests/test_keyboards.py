@@ -1,17 +1,25 @@
+from datetime import date, datetime, timezone
 import unittest
+from unittest.mock import patch
 
+from fatcules import keyboards
 from fatcules.keyboards import (
+    EDIT_JUMP,
     EDIT_NEXT,
     EDIT_PREV,
+    datepicker_keyboard,
     edit_entries_keyboard,
+    main_keyboard,
+    parse_datepicker_data,
     parse_edit_selection_text,
 )
+from fatcules.repository import Entry
 
 
 class EditKeyboardTests(unittest.TestCase):
     def test_paginated_keyboard_limits_entries(self) -> None:
         entries = [
-            {"recorded_at": f"2024-01-0{i}T00:00:00+00:00", "weight_kg": 70 + i, "fat_pct": None}
+            Entry(i, 1, datetime(2024, 1, i, tzinfo=timezone.utc), 70.0 + i, None, None)
             for i in range(1, 9)
         ]
         kb = edit_entries_keyboard(entries, page=0, page_size=3)
@@ -33,10 +41,11 @@ class EditKeyboardTests(unittest.TestCase):
         self.assertEqual(parse_edit_selection_text("3. 2024-01-03: 73.0 kg"), ("pick", 2))
         self.assertEqual(parse_edit_selection_text("🗑3"), ("delete", 2))
         self.assertEqual(parse_edit_selection_text("Cancel"), ("cancel", 0))
+        self.assertEqual(parse_edit_selection_text(EDIT_JUMP), ("jump", 0))
 
     def test_second_page_numbering_and_nav(self) -> None:
         entries = [
-            {"recorded_at": f"2024-01-{i:02d}T00:00:00+00:00", "weight_kg": 70 + i, "fat_pct": None}
+            Entry(i, 1, datetime(2024, 1, i, tzinfo=timezone.utc), 70.0 + i, None, None)
             for i in range(1, 9)
         ]
         kb = edit_entries_keyboard(entries, page=1, page_size=3)
@@ -49,5 +58,51 @@ class EditKeyboardTests(unittest.TestCase):
         self.assertIn("Cancel", nav_texts)
 
 
+class DatepickerCacheTests(unittest.TestCase):
+    def test_same_month_is_served_from_cache(self) -> None:
+        first = datepicker_keyboard("add", month=date(2024, 3, 15))
+        second = datepicker_keyboard("add", month=date(2024, 3, 1))
+        self.assertIs(first, second)
+        self.assertIsNot(first, datepicker_keyboard("edit", month=date(2024, 3, 1)))
+        self.assertIsNot(first, datepicker_keyboard("add", month=date(2024, 3, 1), default_date=date(2024, 3, 2)))
+
+    def test_month_header_lists_entries_when_requested(self) -> None:
+        plain = datepicker_keyboard("jump", month=date(2024, 3, 15))
+        listing = datepicker_keyboard("jump", month=date(2024, 3, 15), list_month=True)
+
+        self.assertIsNot(plain, listing)
+        header = listing.inline_keyboard[0][0]
+        self.assertEqual(parse_datepicker_data(header.callback_data or ""), ("jump", "month", "2024-03-01"))
+        self.assertEqual(parse_datepicker_data(plain.inline_keyboard[0][0].callback_data or "")[1], "noop")
+
+    def test_marked_days_are_flagged(self) -> None:
+        kb = datepicker_keyboard("add", month=date(2024, 3, 1), marked_days=frozenset({5}))
+        texts = [button.text for row in kb.inline_keyboard for button in row]
+
+        self.assertIn("5•", texts)
+        self.assertIn("6", texts)
+        self.assertIsNot(kb, datepicker_keyboard("add", month=date(2024, 3, 1)))
+
+    def test_cache_invalidated_when_day_changes(self) -> None:
+        class FakeDate(date):
+            current = date(2024, 3, 10)
+
+            @classmethod
+            def today(cls) -> date:
+                return cls.current
+
+        with patch.object(keyboards, "date", FakeDate):
+            before = datepicker_keyboard("add", month=date(2024, 3, 1))
+            FakeDate.current = date(2024, 3, 11)
+            after = datepicker_keyboard("add", month=date(2024, 3, 1))
+        self.assertIsNot(before, after)
+        today_button = after.inline_keyboard[-1][1]
+        self.assertEqual(parse_datepicker_data(today_button.callback_data or ""), ("add", "pick", "2024-03-11"))
+
+    def test_static_keyboards_are_reused(self) -> None:
+        self.assertIs(main_keyboard(goal_set=True), main_keyboard(goal_set=True))
+        self.assertIsNot(main_keyboard(goal_set=True), main_keyboard(goal_set=False))
+
+
 if __name__ == "__main__":
     unittest.main()
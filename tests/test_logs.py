@@ -0,0 +1,148 @@
+import io
+import json
+import logging
+import queue
+import unittest
+from pathlib import Path
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, Update
+
+from fatcules.config import Settings
+from fatcules.logs import (
+    DroppingQueueHandler,
+    JsonFormatter,
+    SamplingFilter,
+    UpdateContextFilter,
+    build_formatter,
+    install_update_logging,
+    setup_logging,
+)
+
+
+def make_record(name: str = "fatcules.test", level: int = logging.INFO, msg: str = "hello %s", **extra) -> logging.LogRecord:
+    record = logging.LogRecord(name, level, __file__, 1, msg, ("world",), None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def make_settings(**overrides) -> Settings:
+    return Settings(bot_token="42:TEST", database_path=Path("unused.db"), **overrides)
+
+
+class JsonFormatterTests(unittest.TestCase):
+    def test_structured_fields(self) -> None:
+        line = JsonFormatter().format(make_record(user_id=7, handler="stats", latency_ms=12.5))
+        payload = json.loads(line)
+
+        self.assertEqual(payload["message"], "hello world")
+        self.assertEqual(payload["level"], "INFO")
+        self.assertEqual(payload["logger"], "fatcules.test")
+        self.assertEqual((payload["user_id"], payload["handler"], payload["latency_ms"]), (7, "stats", 12.5))
+        self.assertNotIn("error", payload)
+
+    def test_unknown_format(self) -> None:
+        with self.assertRaises(ValueError):
+            build_formatter("xml")
+
+
+class SamplingFilterTests(unittest.TestCase):
+    def test_update_records_are_sampled_but_warnings_kept(self) -> None:
+        draws = iter([0.05, 0.5, 0.95])
+        sampler = SamplingFilter(sample_rate=0.1, rng=lambda: next(draws))
+
+        kept = [sampler.filter(make_record("fatcules.updates")) for _ in range(3)]
+
+        self.assertEqual(kept, [True, False, False])
+        self.assertEqual(sampler.sampled_out, 2)
+        self.assertTrue(sampler.filter(make_record("fatcules.updates", logging.WARNING)))
+
+    def test_rate_limit_reports_suppressed_records(self) -> None:
+        now = [0.0]
+        sampler = SamplingFilter(rate_limit=2, window_s=10, clock=lambda: now[0])
+
+        kept = [sampler.filter(make_record(level=logging.WARNING)) for _ in range(5)]
+        self.assertEqual(kept, [True, True, False, False, False])
+        # Other messages and errors have their own budget.
+        self.assertTrue(sampler.filter(make_record(msg="other")))
+        self.assertTrue(sampler.filter(make_record(level=logging.ERROR)))
+
+        now[0] = 10.0
+        record = make_record(level=logging.WARNING)
+        self.assertTrue(sampler.filter(record))
+        self.assertEqual(record.suppressed, 3)
+
+
+class QueueLoggingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        root = logging.getLogger()
+        self.addCleanup(setattr, root, "handlers", root.handlers[:])
+        self.addCleanup(root.setLevel, root.level)
+
+    def test_records_are_written_by_the_listener(self) -> None:
+        stream = io.StringIO()
+        logs = setup_logging(make_settings(log_rate_limit=0), stream=stream)
+        try:
+            logging.getLogger("fatcules.test").info("queued %s", "record", extra={"user_id": 3})
+            logging.getLogger("fatcules.test").debug("below level")
+        finally:
+            logs.stop()
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([(line["message"], line["user_id"]) for line in lines], [("queued record", 3)])
+
+    def test_full_queue_drops_instead_of_blocking(self) -> None:
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+
+        handler.handle(make_record())
+        handler.handle(make_record())
+
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(handler.dropped, 1)
+
+
+class UpdateLoggingTests(unittest.IsolatedAsyncioTestCase):
+    async def test_update_record_has_user_handler_and_latency(self) -> None:
+        router = Router()
+
+        @router.message()
+        async def show_stats(message: Message) -> None:
+            logging.getLogger("fatcules.handlers").info("inside handler")
+
+        dp = Dispatcher()
+        install_update_logging(dp, make_settings())
+        dp.include_router(router)
+        update = Update.model_validate(
+            {
+                "update_id": 5,
+                "message": {
+                    "message_id": 1,
+                    "date": 0,
+                    "chat": {"id": 11, "type": "private"},
+                    "from": {"id": 11, "is_bot": False, "first_name": "T"},
+                    "text": "Stats",
+                },
+            }
+        )
+        records: list[logging.LogRecord] = []
+        capture = logging.Handler()
+        capture.emit = records.append  # type: ignore[method-assign]
+        capture.addFilter(UpdateContextFilter())
+        logger = logging.getLogger("fatcules")
+        logger.addHandler(capture)
+        self.addCleanup(logger.removeHandler, capture)
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.INFO)
+
+        await dp.feed_update(Bot("42:TEST"), update)
+
+        inside, handled = records
+        self.assertEqual((inside.user_id, inside.handler), (11, "show_stats"))  # type: ignore[attr-defined]
+        self.assertEqual(handled.getMessage(), "Update handled")
+        self.assertEqual((handled.user_id, handled.handler, handled.update_id), (11, "show_stats", 5))  # type: ignore[attr-defined]
+        self.assertGreaterEqual(handled.latency_ms, 0)  # type: ignore[attr-defined]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta, timezone
+import unittest
+
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+
+from fatcules.scheduler import REMINDER_TEXT, NotificationScheduler
+from fatcules.stats import build_weekly_chart
+from tests.backends import RepositoryTestCase, for_each_backend
+
+MONDAY = datetime(2024, 1, 8, 10, tzinfo=timezone.utc)
+
+
+class FakeBot:
+    def __init__(self, blocked: set[int] | None = None):
+        self.blocked = blocked or set()
+        self.messages: list[tuple[int, str]] = []
+        self.photos: list[tuple[int, str]] = []
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        if chat_id in self.blocked:
+            raise TelegramForbiddenError(method=SendMessage(chat_id=chat_id, text=text), message="Forbidden: bot was blocked")
+        self.messages.append((chat_id, text))
+
+    async def send_photo(self, chat_id: int, photo, caption: str) -> None:
+        self.photos.append((chat_id, caption))
+
+
+@for_each_backend
+class NotificationSchedulerTests(RepositoryTestCase):
+    def scheduler(self, bot: FakeBot, batch_size: int = 100) -> NotificationScheduler:
+        return NotificationScheduler(bot, self.repo, batch_size=batch_size, send_rate=1000)  # type: ignore[arg-type]
+
+    async def test_reminders_skip_users_who_logged_today(self) -> None:
+        for user_id in (1, 2, 3):
+            await self.repo.set_reminder_hour(user_id, 9)
+        await self.repo.set_reminder_hour(4, 20)
+        await self.repo.add_entry(user_id=2, recorded_at=MONDAY.replace(hour=7), weight_kg=80.0, fat_pct=20.0)
+        bot = FakeBot()
+
+        sent = await self.scheduler(bot, batch_size=1).send_reminders(MONDAY)
+
+        self.assertEqual(sent, 2)
+        self.assertEqual(bot.messages, [(1, REMINDER_TEXT), (3, REMINDER_TEXT)])
+        # Already reminded today, so a second run sends nothing.
+        self.assertEqual(await self.scheduler(bot).send_reminders(MONDAY + timedelta(hours=1)), 0)
+        tuesday = (MONDAY + timedelta(days=1)).date()
+        self.assertEqual(await self.repo.due_reminders(MONDAY + timedelta(days=1)), [(1, tuesday), (2, tuesday), (3, tuesday)])
+
+    async def test_reminder_hour_is_local_time(self) -> None:
+        # MONDAY 10:00 UTC is 19:00 in Tokyo and 02:00 in Los Angeles.
+        for user_id, zone in ((1, "Asia/Tokyo"), (2, "America/Los_Angeles"), (3, None)):
+            await self.repo.ensure_user(user_id)
+            await self.repo.set_user_timezone(user_id, zone)
+            await self.repo.set_reminder_hour(user_id, 9)
+
+        due = await self.repo.due_reminders(MONDAY)
+
+        self.assertEqual(due, [(1, MONDAY.date()), (3, MONDAY.date())])
+        # An entry for the Tokyo user's local Monday.
+        await self.repo.add_entry(user_id=1, recorded_at=datetime(2024, 1, 8, tzinfo=timezone.utc), weight_kg=80.0, fat_pct=None)
+        self.assertEqual(await self.repo.due_reminders(MONDAY), [(3, MONDAY.date())])
+        # 09:00 in Los Angeles is 17:00 UTC; it is still Monday there.
+        self.assertEqual(await self.repo.due_reminders(MONDAY.replace(hour=17)), [(2, MONDAY.date()), (3, MONDAY.date())])
+
+    async def test_blocked_user_is_unsubscribed(self) -> None:
+        await self.repo.set_reminder_hour(5, 0)
+        await self.repo.set_weekly_report(5, True)
+        scheduler = self.scheduler(FakeBot(blocked={5}))
+
+        await scheduler.send_reminders(MONDAY)
+
+        self.assertEqual(scheduler.metrics.unsubscribed, 1)
+        settings = await self.repo.get_notification_settings(5)
+        self.assertIsNone(settings["reminder_hour"])
+        self.assertEqual(settings["weekly_report"], 0)
+
+    async def test_weekly_reports_cover_previous_week_once(self) -> None:
+        for user_id in (1, 2, 3):
+            await self.repo.set_weekly_report(user_id, user_id != 3)
+            for day in range(1, 8):
+                recorded_at = datetime(2024, 1, day, tzinfo=timezone.utc)
+                await self.repo.add_entry(user_id=user_id, recorded_at=recorded_at, weight_kg=80.0 - day / 10, fat_pct=20.0)
+        # Outside the reported week.
+        await self.repo.add_entry(user_id=1, recorded_at=MONDAY, weight_kg=70.0, fat_pct=20.0)
+        bot = FakeBot()
+        scheduler = self.scheduler(bot, batch_size=1)
+
+        self.assertTrue(scheduler.reports_due(MONDAY))
+        sent = await scheduler.send_weekly_reports(MONDAY)
+
+        self.assertEqual(sent, 2)
+        self.assertEqual([chat_id for chat_id, _ in bot.photos], [1, 2])
+        self.assertIn("Entries logged: 7", bot.photos[0][1])
+        self.assertIn("79.9 → 79.3 kg", bot.photos[0][1])
+        self.assertEqual(await scheduler.send_weekly_reports(MONDAY + timedelta(hours=1)), 0)
+
+    async def test_weekly_rows_survive_writes_between_chunks(self) -> None:
+        for user_id in (1, 2, 3):
+            await self.repo.set_weekly_report(user_id, True)
+            for day in range(1, 4):
+                recorded_at = datetime(2024, 1, day, tzinfo=timezone.utc)
+                await self.repo.add_entry(user_id=user_id, recorded_at=recorded_at, weight_kg=80.0, fat_pct=20.0)
+        since, until = MONDAY.date() - timedelta(days=7), MONDAY.date()
+
+        seen = []
+        async for rows in self.repo.iter_weekly_report_rows(since, until, chunk_size=2):
+            self.assertLessEqual(len(rows), 2)
+            seen.extend((row.user_id, row.recorded_at.day) for row in rows)
+            # The scheduler marks finished users between chunks.
+            await self.repo.mark_reported(sorted({user_id for user_id, _ in seen})[:-1], until)
+
+        self.assertEqual(seen, [(user_id, day) for user_id in (1, 2, 3) for day in range(1, 4)])
+
+
+class WeeklyChartTests(unittest.TestCase):
+    def test_chart_is_png(self) -> None:
+        series = [(datetime(2024, 1, day, tzinfo=timezone.utc), 16.0 - day / 10) for day in range(1, 8)]
+
+        self.assertEqual(build_weekly_chart(series).getvalue()[:8], b"\x89PNG\r\n\x1a\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+from pathlib import Path
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import GetUpdates, SendMessage, SendPhoto
+
+from fatcules.config import Settings, _parse_method_timeouts
+from fatcules.session import build_session
+
+
+class SessionConfigTests(unittest.IsolatedAsyncioTestCase):
+    def test_parse_method_timeouts(self) -> None:
+        self.assertEqual(_parse_method_timeouts("sendMessage=10, answerCallbackQuery=2.5,bad"), {"sendMessage": 10.0, "answerCallbackQuery": 2.5})
+        self.assertEqual(_parse_method_timeouts(""), {})
+
+    async def test_per_method_timeouts(self) -> None:
+        settings = Settings(
+            bot_token="42:x",
+            database_path=Path("unused.db"),
+            http_pool_size=8,
+            http_keepalive_s=30,
+            http_timeout_s=20,
+            http_upload_timeout_s=90,
+            http_method_timeouts={"sendMessage": 5},
+        )
+        session = build_session(settings)
+        self.assertEqual(session._connector_init["limit"], 8)
+        self.assertEqual(session._connector_init["keepalive_timeout"], 30)
+        self.assertEqual(session.timeout, 20)
+
+        with patch.object(AiohttpSession, "make_request", new=AsyncMock()) as parent:
+            await session.make_request(None, SendPhoto(chat_id=1, photo="id"))  # type: ignore[arg-type]
+            await session.make_request(None, SendMessage(chat_id=1, text="hi"))  # type: ignore[arg-type]
+            await session.make_request(None, GetUpdates(), timeout=50)  # type: ignore[arg-type]
+            await session.make_request(None, GetUpdates())  # type: ignore[arg-type]
+        timeouts = [call.kwargs["timeout"] for call in parent.await_args_list]
+        self.assertEqual(timeouts, [90, 5, 50, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
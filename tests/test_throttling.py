@@ -0,0 +1,82 @@
+import asyncio
+import time
+import unittest
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, GetUpdates, SendMessage
+
+from fatcules.throttling import PriorityLimiter, RateLimitMiddleware
+
+
+class RateLimitMiddlewareTests(unittest.IsolatedAsyncioTestCase):
+    async def test_per_chat_limit_spaces_messages(self) -> None:
+        middleware = RateLimitMiddleware(global_rate=1000, per_chat_rate=20)
+        sent: list[tuple[int, float]] = []
+
+        async def make_request(bot, method):
+            sent.append((method.chat_id, time.monotonic()))
+            return True
+
+        await asyncio.gather(
+            *(middleware(make_request, None, SendMessage(chat_id=chat, text="hi")) for chat in (1, 1, 1, 2))  # type: ignore[arg-type]
+        )
+
+        chat_one = [at for chat, at in sent if chat == 1]
+        self.assertGreaterEqual(chat_one[-1] - chat_one[0], 0.09)
+        self.assertEqual(middleware.metrics.requests, 4)
+        self.assertGreaterEqual(middleware.metrics.throttled, 2)
+
+    async def test_retry_after_is_retried(self) -> None:
+        middleware = RateLimitMiddleware(global_rate=1000, per_chat_rate=1000)
+        calls = 0
+
+        async def make_request(bot, method):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise TelegramRetryAfter(method=method, message="Flood", retry_after=0)
+            return "ok"
+
+        result = await middleware(make_request, None, SendMessage(chat_id=1, text="hi"))  # type: ignore[arg-type]
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(calls, 2)
+        self.assertEqual(middleware.metrics.retries, 1)
+
+    async def test_unlimited_methods_pass_through(self) -> None:
+        middleware = RateLimitMiddleware(global_rate=0.001)
+
+        async def make_request(bot, method):
+            return []
+
+        self.assertEqual(await middleware(make_request, None, GetUpdates()), [])  # type: ignore[arg-type]
+        self.assertEqual(middleware.metrics.requests, 0)
+
+    async def test_callback_answers_skip_chat_limit(self) -> None:
+        middleware = RateLimitMiddleware(global_rate=1000, per_chat_rate=0.001)
+
+        async def make_request(bot, method):
+            return True
+
+        await middleware(make_request, None, AnswerCallbackQuery(callback_query_id="1"))  # type: ignore[arg-type]
+        await middleware(make_request, None, AnswerCallbackQuery(callback_query_id="2"))  # type: ignore[arg-type]
+        self.assertEqual(middleware.metrics.throttled, 0)
+
+
+class PriorityLimiterTests(unittest.IsolatedAsyncioTestCase):
+    async def test_higher_priority_waiters_go_first(self) -> None:
+        limiter = PriorityLimiter(rate=50)
+        limiter.bucket.tokens = 0
+        order: list[str] = []
+
+        async def take(name: str, priority: int) -> None:
+            await limiter.acquire(priority)
+            order.append(name)
+
+        await asyncio.gather(take("photo", 2), take("photo2", 2), take("callback", 0))
+
+        self.assertEqual(order[0], "callback")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+import io
+import json
+import unittest
+from unittest import mock
+
+from fatcules.db import EntryRepository
+from fatcules.importer import import_entries
+from fatcules.stats import project_goal_date, trend_overlay
+from fatcules.trend import TrendState, replay_trend
+from tests.backends import RepositoryTestCase, for_each_backend
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def linear_rows(days: int, noise: float = 0.0) -> list[tuple[int, datetime, float, float]]:
+    # Loses 0.1 kg of fat per day with an alternating +/- noise on top.
+    return [
+        (day, START + timedelta(days=day), 80.0 - 0.1 * day, 20.0 - 0.1 * day + (noise if day % 2 else -noise))
+        for day in range(days)
+    ]
+
+
+class KalmanTrendTests(unittest.TestCase):
+    def test_recovers_slope_through_noise(self) -> None:
+        state = replay_trend(None, linear_rows(60, noise=0.6))[-1][1]
+
+        self.assertAlmostEqual(state.fat.slope, -0.1, delta=0.02)
+        self.assertAlmostEqual(state.fat.level, 20.0 - 0.1 * 59, delta=0.5)
+        self.assertEqual(state.fat.count, 60)
+
+    def test_state_round_trips(self) -> None:
+        state = replay_trend(None, linear_rows(3))[-1][1]
+
+        self.assertEqual(TrendState.loads(state.dumps()), state)
+
+    def test_projection_uses_trend(self) -> None:
+        states = [trend for _, trend in replay_trend(None, linear_rows(30, noise=0.6))]
+        now = START + timedelta(days=29)
+
+        projected, reason = project_goal_date([], 15.0, now=now, trend=states[-1])
+
+        self.assertIsNone(reason)
+        # ~2.1 kg left at ~0.1 kg/day.
+        self.assertAlmostEqual((projected - now.date()).days, 21, delta=6)
+        self.assertEqual(len(trend_overlay(states)), 30)
+
+
+@for_each_backend
+class TrendPersistenceTests(RepositoryTestCase):
+    async def add(self, day: int, fat_pct: float | None = 20.0) -> int:
+        return await self.repo.add_entry(
+            user_id=1, recorded_at=START + timedelta(days=day), weight_kg=80.0 - day * 0.2, fat_pct=fat_pct
+        )
+
+    async def assert_matches_full_replay(self) -> None:
+        entries = sorted(await self.repo.list_recent_entries(1, limit=100), key=lambda row: (row.recorded_at, row.id))
+        rows = [
+            (row.id, row.recorded_at, row.weight_kg, row.fat_weight_kg)
+            for row in entries
+        ]
+        expected = [trend for _, trend in replay_trend(None, rows)]
+        self.assertEqual(await self.repo.get_trend_series(1), expected)
+        self.assertEqual(await self.repo.get_trend(1), expected[-1] if expected else None)
+
+    async def test_state_follows_appends_edits_and_deletes(self) -> None:
+        ids = [await self.add(day) for day in (0, 2, 4, 6)]
+        await self.add(5, fat_pct=None)
+        await self.assert_matches_full_replay()
+
+        # Backfilled and edited entries replay the history after them.
+        await self.add(1)
+        await self.repo.update_entry(ids[1], 1, START + timedelta(days=7), 79.0, 19.0)
+        await self.assert_matches_full_replay()
+
+        await self.repo.delete_entry(ids[0], 1)
+        await self.assert_matches_full_replay()
+
+    async def test_backdated_edit_replays_in_batches(self) -> None:
+        ids = [await self.add(day) for day in range(2, 9)]
+
+        with mock.patch("fatcules.db.TREND_REPLAY_BATCH", 2):
+            await self.add(0)
+            await self.repo.update_entry(ids[3], 1, START + timedelta(days=1), 79.0, 19.0)
+            await self.assert_matches_full_replay()
+
+    async def test_import_updates_trend(self) -> None:
+        await self.add(10)
+        rows = [(START + timedelta(days=day), 80.0 - day * 0.1, 20.0) for day in range(5)]
+
+        await self.repo.import_entries_chunk(1, rows)
+
+        await self.assert_matches_full_replay()
+        self.assertIsNone(await self.repo.get_trend(2))
+
+    async def test_reverse_ordered_import_replays_once_at_the_end(self) -> None:
+        await self.add(20)
+        items = [{"date": (START + timedelta(days=day)).date().isoformat(), "weight_kg": 80 - day * 0.1} for day in range(12)]
+
+        result = await import_entries(self.repo, 1, io.StringIO(json.dumps(items[::-1])), fmt="json", chunk_size=5)
+
+        self.assertEqual(result.inserted, 12)
+        await self.assert_matches_full_replay()
+
+
+class LegacyTrendTests(RepositoryTestCase):
+    async def test_missing_states_are_rebuilt(self) -> None:
+        for day in range(3):
+            await self.repo.add_entry(user_id=1, recorded_at=START + timedelta(days=day), weight_kg=80.0, fat_pct=20.0)
+        assert isinstance(self.repo, EntryRepository)
+        conn = await self.repo.connect()
+        await conn.execute("UPDATE entries SET trend_state = NULL")
+        await conn.commit()
+
+        await self.repo.add_entry(user_id=1, recorded_at=START + timedelta(days=3), weight_kg=80.0, fat_pct=20.0)
+
+        self.assertEqual((await self.repo.get_trend(1)).weight.count, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,24 +1,64 @@
-import os
 from datetime import datetime, timezone
 import tempfile
 import unittest
 from pathlib import Path
 
 from fatcules.db import EntryRepository
+from tests.backends import RepositoryTestCase, for_each_backend
 
 
-class UserRepositoryTests(unittest.IsolatedAsyncioTestCase):
+class EnsureUserWriteTests(unittest.IsolatedAsyncioTestCase):
     async def asyncSetUp(self) -> None:
         self.tmpdir = tempfile.TemporaryDirectory()
-        db_path = os.path.join(self.tmpdir.name, "test.db")
-        self.repo = EntryRepository(Path(db_path))  # type: ignore[arg-type]
-        await self.repo.connect()
+        self.db_path = Path(self.tmpdir.name) / "test.db"
 
     async def asyncTearDown(self) -> None:
-        if self.repo._conn:
-            await self.repo._conn.close()
         self.tmpdir.cleanup()
 
+    async def test_existing_users_are_not_rewritten(self) -> None:
+        setup = EntryRepository(self.db_path)
+        await setup.ensure_user(1)
+        await setup.close()
+
+        repo = EntryRepository(self.db_path, profile_cache_size=0)
+        conn = await repo.connect()
+        statements: list[str] = []
+        await conn.set_trace_callback(statements.append)
+        await repo.ensure_user(1)
+        self.assertFalse(any(s.startswith(("INSERT", "COMMIT")) for s in statements))
+
+        await repo.ensure_user(2)
+        self.assertEqual(sum(1 for s in statements if s == "COMMIT"), 1)
+        statements.clear()
+        await repo.ensure_user(2)
+        self.assertFalse(any(s.startswith(("INSERT", "COMMIT")) for s in statements))
+        await repo.close()
+
+
+class ProfileCacheTests(RepositoryTestCase):
+    async def test_cached_profile_skips_sql_and_tracks_writes(self) -> None:
+        await self.repo.ensure_user(1)
+        statements: list[str] = []
+        conn = await self.repo.connect()
+        await conn.set_trace_callback(statements.append)
+
+        await self.repo.ensure_user(1)
+        await self.repo.get_user(1)
+        self.assertEqual(statements, [])
+
+        await self.repo.set_user_goal(1, 70.0, 15.0)
+        await self.repo.set_user_height(1, 175.0)
+        statements.clear()
+        user = await self.repo.ensure_user(1)
+        self.assertEqual(statements, [])
+        self.assertEqual((user["goal_weight_kg"], user["goal_fat_pct"], user["height_cm"]), (70.0, 15.0, 175.0))
+
+        user["height_cm"] = 1.0
+        self.assertEqual((await self.repo.get_user(1))["height_cm"], 175.0)  # type: ignore[index]
+
+
+@for_each_backend
+class UserRepositoryTests(RepositoryTestCase):
     async def test_ensure_user_creates_row(self) -> None:
         user = await self.repo.ensure_user(123)
         self.assertEqual(user["id"], 123)
@@ -2,8 +2,26 @@ import math
 from datetime import datetime, timedelta, timezone
 import unittest
 
-from fatcules.formatting import format_stats_summary, parse_float, parse_height_cm
-from fatcules.stats import average_daily_drop, build_dashboard, compute_fat_loss_rate, parse_series, project_goal_date
+from fatcules.formatting import (
+    format_goal_projection,
+    format_stats_summary,
+    format_trend_text,
+    local_today,
+    parse_float,
+    parse_height_cm,
+    parse_timezone,
+    sparkline,
+)
+from fatcules.repository import SeriesPoint
+from fatcules.stats import (
+    average_daily_drop,
+    build_dashboard,
+    compute_fat_loss_rate,
+    parse_series,
+    project_goal_date,
+    project_goal_range,
+    weekly_deltas,
+)
 
 
 class TestParsing(unittest.TestCase):
@@ -40,16 +58,14 @@ class TestStats(unittest.TestCase):
 
     def test_parse_series(self) -> None:
         now = datetime.now(timezone.utc)
-        iso = now.isoformat()
-        parsed = parse_series([{"recorded_at": iso, "fat_weight_kg": 10.5}])
-        self.assertEqual(len(parsed), 1)
-        self.assertEqual(parsed[0][1], 10.5)
+        parsed = parse_series([SeriesPoint(now, 70.0, 10.5), SeriesPoint(now, 70.0, None)])
+        self.assertEqual(parsed, [(now, 10.5)])
 
     def test_compute_fat_loss_rate(self) -> None:
         now = datetime.now(timezone.utc)
         entries = [
-            {"recorded_at": (now - timedelta(days=8)).isoformat(), "fat_weight_kg": 12.0, "weight_kg": 80.0},
-            {"recorded_at": now.isoformat(), "fat_weight_kg": 10.0, "weight_kg": 78.0},
+            SeriesPoint(now - timedelta(days=8), 80.0, 12.0),
+            SeriesPoint(now, 78.0, 10.0),
         ]
         rate = compute_fat_loss_rate(entries, 7)
         expected = (12.0 - 10.0) / (80.0 - 78.0)
@@ -57,7 +73,7 @@ class TestStats(unittest.TestCase):
 
     def test_compute_fat_loss_rate_not_enough(self) -> None:
         now = datetime.now(timezone.utc)
-        entries = [{"recorded_at": now.isoformat(), "fat_weight_kg": 10.0, "weight_kg": 78.0}]
+        entries = [SeriesPoint(now, 78.0, 10.0)]
         self.assertIsNone(compute_fat_loss_rate(entries, 7))
 
     def test_build_dashboard_returns_image(self) -> None:
@@ -79,6 +95,38 @@ class TestFormatting(unittest.TestCase):
         self.assertIn("Goal: 80.0 kg @ 20.0% (fat 16.00 kg)", summary)
         self.assertIn("Expected day of achieving goal: 2024-06-01", summary)
 
+    def test_sparkline_scales_to_range(self) -> None:
+        self.assertEqual(sparkline([1.0, 2.0, 3.0]), "▁▅█")
+        self.assertEqual(sparkline([5.0, 5.0]), "▅▅")
+        self.assertEqual(sparkline([]), "")
+
+    def test_format_trend_text(self) -> None:
+        text = format_trend_text([12.0, 11.5], [(datetime(2024, 1, 8).date(), -0.5)])
+        self.assertIn("Fat weight trend (2 pts): █▁", text)
+        self.assertIn("12.00 → 11.50 kg", text)
+        self.assertIn("- week of 2024-01-08: -0.50 kg", text)
+
+
+class WeeklyDeltaTests(unittest.TestCase):
+    def test_uses_last_reading_of_each_week(self) -> None:
+        # 2024-01-01 is a Monday
+        series = [
+            (datetime(2024, 1, 1, tzinfo=timezone.utc), 13.0),
+            (datetime(2024, 1, 5, tzinfo=timezone.utc), 12.5),
+            (datetime(2024, 1, 9, tzinfo=timezone.utc), 12.0),
+            (datetime(2024, 1, 16, tzinfo=timezone.utc), 12.2),
+        ]
+        deltas = weekly_deltas(series)
+        self.assertEqual([week.isoformat() for week, _ in deltas], ["2024-01-08", "2024-01-15"])
+        self.assertTrue(math.isclose(deltas[0][1], -0.5))
+        self.assertTrue(math.isclose(deltas[1][1], 0.2))
+
+    def test_limits_number_of_weeks(self) -> None:
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        series = [(start + timedelta(weeks=i), 20.0 - i) for i in range(10)]
+        self.assertEqual(len(weekly_deltas(series, weeks=3)), 3)
+        self.assertEqual(weekly_deltas(series[:1]), [])
+
 
 class GoalProjectionTests(unittest.TestCase):
     def test_average_is_same_regardless_of_input_order(self) -> None:
@@ -134,5 +182,62 @@ class GoalProjectionTests(unittest.TestCase):
         self.assertEqual(reason, "not enough recent fat % data to project")
 
 
+class TimezoneTests(unittest.TestCase):
+    def test_parse_timezone(self) -> None:
+        self.assertEqual(parse_timezone(" Europe/Berlin "), "Europe/Berlin")
+        self.assertEqual(parse_timezone("utc"), "UTC")
+        self.assertIsNone(parse_timezone("Mars/Olympus"))
+        self.assertIsNone(parse_timezone("../etc"))
+
+    def test_local_today_follows_user_zone(self) -> None:
+        now = datetime.now(timezone.utc)
+        self.assertEqual(local_today({"timezone": None}), now.date())
+        self.assertEqual(local_today({"timezone": "Pacific/Kiritimati"}), (now + timedelta(hours=14)).date())
+
+
+class GoalRangeTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = datetime(2024, 5, 10, tzinfo=timezone.utc)
+        # -0.1 kg/day with up to +/-0.3 kg of day-to-day noise and one outlier.
+        self.series = [
+            (self.now - timedelta(days=day), 15.0 + 0.1 * day + 0.3 * math.sin(day * 1.7)) for day in range(40)
+        ]
+        self.series[5] = (self.series[5][0], 25.0)
+
+    def test_theil_sen_range_brackets_expected_date(self) -> None:
+        projection = project_goal_range(self.series, 12.0, now=self.now)
+
+        self.assertIsNone(projection.reason)
+        self.assertAlmostEqual(projection.slope, -0.1, delta=0.01)
+        self.assertLessEqual(projection.slope_low, projection.slope)
+        self.assertLessEqual(projection.slope, projection.slope_high)
+        self.assertLessEqual(projection.optimistic, projection.expected)
+        self.assertLessEqual(projection.expected, projection.pessimistic)
+        self.assertAlmostEqual((projection.expected - self.now.date()).days, 30, delta=3)
+
+    def test_outlier_pulls_least_squares_more_than_theil_sen(self) -> None:
+        robust = project_goal_range(self.series, 12.0, now=self.now)
+        ols = project_goal_range(self.series, 12.0, now=self.now, method="least_squares")
+
+        self.assertGreater(abs(ols.level - 15.0), abs(robust.level - 15.0))
+        self.assertGreater(ols.slope_high - ols.slope_low, 0)
+
+    def test_rising_trend_and_short_series(self) -> None:
+        rising = [(self.now - timedelta(days=day), 15.0 - 0.1 * day) for day in range(10)]
+
+        self.assertEqual(project_goal_range(rising, 12.0, now=self.now).reason, "fat trend is rising or flat")
+        self.assertEqual(
+            project_goal_range(rising[:2], 12.0, now=self.now).reason, "not enough recent fat % data to project"
+        )
+
+    def test_band_is_drawn_and_formatted(self) -> None:
+        projection = project_goal_range(self.series, 12.0, now=self.now)
+        text = format_goal_projection(projection.expected, None, projection)
+
+        self.assertIn(f"likely {projection.optimistic.isoformat()} – {projection.pessimistic.isoformat()}", text)
+        image = build_dashboard({7: 0.1, 30: 0.2}, sorted(self.series), 12.0, projection=projection)
+        self.assertGreater(len(image.getvalue()), 0)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from pathlib import Path
+
+from aiogram import Bot
+from aiogram.types import Update
+
+from fatcules.config import Settings
+
+from fatcules.workers import decode_update, encode_update, global_rate_share, shard_for, update_user_id
+
+
+def make_update(update_id: int, user_id: int) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "T"},
+                "text": "Stats",
+            },
+        }
+    )
+
+
+class ShardingTests(unittest.TestCase):
+    def test_updates_for_a_user_land_on_one_shard(self) -> None:
+        self.assertEqual(update_user_id(make_update(1, 42)), 42)
+        shards = {shard_for(make_update(i, 42), 4) for i in range(10)}
+        self.assertEqual(shards, {42 % 4})
+        self.assertEqual(shard_for(make_update(1, 7), 4), 3)
+
+    def test_callback_queries_use_sender(self) -> None:
+        update = Update.model_validate(
+            {
+                "update_id": 2,
+                "callback_query": {
+                    "id": "cb",
+                    "chat_instance": "c",
+                    "from": {"id": 9, "is_bot": False, "first_name": "T"},
+                    "data": "DP|add|noop|pad",
+                },
+            }
+        )
+        self.assertEqual(shard_for(update, 4), 1)
+
+    def test_round_trip_binds_bot(self) -> None:
+        bot = Bot(token="42:TEST")
+        decoded = decode_update(encode_update(make_update(5, 42)), bot)
+        self.assertEqual(decoded.update_id, 5)
+        assert decoded.message is not None
+        self.assertEqual(decoded.message.text, "Stats")
+        self.assertIs(decoded.message.bot, bot)
+
+
+class RateShareTests(unittest.TestCase):
+    def test_front_process_gets_a_share(self) -> None:
+        settings = Settings(bot_token="42:TEST", database_path=Path("unused.db"), rate_limit_global=30.0, workers=2)
+        self.assertEqual(global_rate_share(settings), 10.0)
+
+    def test_single_process_keeps_full_budget(self) -> None:
+        settings = Settings(bot_token="42:TEST", database_path=Path("unused.db"), rate_limit_global=30.0)
+        self.assertEqual(global_rate_share(settings), 30.0)
+
+
+if __name__ == "__main__":
+    unittest.main()